@@ -0,0 +1,37 @@
+"""Add updated_at column to vpn_profiles.
+
+Rendered preset configs are cached by profile id and updated_at. Safe for
+databases where the bot already created the column via init_db().
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e8b2f6a1c37"
+down_revision: Union[str, Sequence[str], None] = "9c4e7a2d1b63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _get_vpn_profiles_columns() -> set[str]:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("vpn_profiles"):
+        return set()
+    return {col["name"] for col in inspector.get_columns("vpn_profiles")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = _get_vpn_profiles_columns()
+    if columns and "updated_at" not in columns:
+        op.add_column("vpn_profiles", sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if "updated_at" in _get_vpn_profiles_columns():
+        op.drop_column("vpn_profiles", "updated_at")
@@ -0,0 +1,47 @@
+"""Add fsm_states table for persistent FSM storage.
+
+Safe for databases where the bot already created the table via init_db().
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7d1c9e2a40"
+down_revision: Union[str, Sequence[str], None] = "e3c2b9a1e4f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_fsm_states() -> bool:
+    return sa.inspect(op.get_bind()).has_table("fsm_states")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _has_fsm_states():
+        return
+
+    op.create_table(
+        "fsm_states",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("state", sa.String(length=255), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_fsm_states_expires_at"), "fsm_states", ["expires_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _has_fsm_states():
+        return
+
+    op.drop_index(op.f("ix_fsm_states_expires_at"), table_name="fsm_states")
+    op.drop_table("fsm_states")
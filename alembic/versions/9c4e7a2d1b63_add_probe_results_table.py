@@ -0,0 +1,56 @@
+"""Add probe_results table for latency probes from the Mini App.
+
+Safe for databases where the bot already created the table via init_db().
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4e7a2d1b63"
+down_revision: Union[str, Sequence[str], None] = "5b7d1c9e2a40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_probe_results() -> bool:
+    return sa.inspect(op.get_bind()).has_table("probe_results")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _has_probe_results():
+        return
+
+    op.create_table(
+        "probe_results",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("node", sa.String(length=100), nullable=False),
+        sa.Column("region", sa.String(length=64), nullable=False),
+        sa.Column("rtt_ms", sa.Float(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_probe_results_user_id"), "probe_results", ["user_id"], unique=False)
+    op.create_index(op.f("ix_probe_results_region"), "probe_results", ["region"], unique=False)
+    op.create_index(
+        op.f("ix_probe_results_created_at"), "probe_results", ["created_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _has_probe_results():
+        return
+
+    op.drop_index(op.f("ix_probe_results_created_at"), table_name="probe_results")
+    op.drop_index(op.f("ix_probe_results_region"), table_name="probe_results")
+    op.drop_index(op.f("ix_probe_results_user_id"), table_name="probe_results")
+    op.drop_table("probe_results")
@@ -7,7 +7,12 @@ import {
   createPreset,
   deletePreset,
   getPresetConfig,
+  exportPresets,
+  fetchProbeTargets,
+  sendProbeResults,
+  fetchRecommendation,
 } from './api';
+import { getRegion, isProbeDue, markProbed, probeTargets } from './probe';
 import { getTelegram } from './telegram';
 
 function Loading() {
@@ -89,6 +94,29 @@ function SniSelector({ current, options, onSelect, busy }) {
   );
 }
 
+function Recommendation({ recommendation, currentNode }) {
+  if (!recommendation) return null;
+
+  const isCurrent = currentNode === recommendation.node;
+  return (
+    <section className="card">
+      <div className="card-title">Самый быстрый сервер</div>
+      <div className="info-row">
+        <span className="label">{recommendation.label}</span>
+        <span className="value">{Math.round(recommendation.rtt_ms)} мс</span>
+      </div>
+      <div className="muted small">
+        {recommendation.source === 'user'
+          ? 'По замерам с твоего устройства.'
+          : 'По замерам пользователей из твоего региона.'}{' '}
+        {isCurrent
+          ? 'Ты уже подключён к нему.'
+          : 'Новые подключения по возможности создаются на нём.'}
+      </div>
+    </section>
+  );
+}
+
 function PresetForm({ onCreate, busy }) {
   const [name, setName] = useState('Мой пресет');
   const [appType, setAppType] = useState('v2ray');
@@ -143,6 +171,9 @@ function PresetForm({ onCreate, busy }) {
             disabled={busy}
           >
             <option value="vless_uri">VPN URI</option>
+            <option value="clash_yaml">Clash Meta (YAML)</option>
+            <option value="singbox_json">sing-box (JSON)</option>
+            <option value="xray_json">Xray (JSON)</option>
           </select>
         </div>
       </div>
@@ -162,6 +193,7 @@ function App() {
   const [info, setInfo] = useState('');
   const [busyAction, setBusyAction] = useState('');
   const [presetPreview, setPresetPreview] = useState(null);
+  const [recommendation, setRecommendation] = useState(null);
 
   useEffect(() => {
     const tg = getTelegram();
@@ -189,7 +221,25 @@ function App() {
       }
     };
 
-    load();
+    // Latency probes are best effort and never block the UI
+    const probe = async () => {
+      const region = getRegion();
+      try {
+        if (isProbeDue()) {
+          const targets = await fetchProbeTargets();
+          if (targets.length > 1) {
+            const results = await probeTargets(targets);
+            await sendProbeResults(region || 'unknown', results);
+          }
+          markProbed();
+        }
+        setRecommendation(await fetchRecommendation(region));
+      } catch (e) {
+        // ignore
+      }
+    };
+
+    load().then(probe);
   }, []);
 
   const refreshMe = async () => {
@@ -279,6 +329,25 @@ function App() {
     }
   };
 
+  const handleExportPresets = async () => {
+    setError('');
+    setInfo('');
+    setBusyAction('export');
+    try {
+      const blob = await exportPresets();
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = 'vpn4friends-presets.zip';
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (e) {
+      setError('Не удалось скачать архив пресетов.');
+    } finally {
+      setBusyAction('');
+    }
+  };
+
   const handleCopyConfig = async () => {
     if (!presetPreview) return;
     try {
@@ -361,6 +430,11 @@ function App() {
         )}
       </section>
 
+      <Recommendation
+        recommendation={recommendation}
+        currentNode={profile.has_profile ? profile.node : null}
+      />
+
       <section className="card">
         <div className="card-title">Пресеты подключения</div>
         {!profile.has_profile ? (
@@ -405,6 +479,17 @@ function App() {
               </ul>
             )}
 
+            {presets.length > 0 && (
+              <button
+                type="button"
+                className="button button-ghost full-width"
+                onClick={handleExportPresets}
+                disabled={busyAction === 'export'}
+              >
+                Скачать все (ZIP)
+              </button>
+            )}
+
             <PresetForm onCreate={handleCreatePreset} busy={busyAction === 'create-preset'} />
           </>
         )}
@@ -2,7 +2,7 @@ import { getInitData } from './telegram';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
-async function apiRequest(path, options = {}) {
+async function apiFetch(path, options = {}) {
   const initData = getInitData();
 
   const headers = {
@@ -32,6 +32,11 @@ async function apiRequest(path, options = {}) {
     throw new Error(message);
   }
 
+  return response;
+}
+
+async function apiRequest(path, options = {}) {
+  const response = await apiFetch(path, options);
   return response.json();
 }
 
@@ -77,3 +82,24 @@ export function deletePreset(id) {
 export function getPresetConfig(id) {
   return apiRequest(`/presets/${id}/config`);
 }
+
+export async function exportPresets() {
+  const response = await apiFetch('/presets/export');
+  return response.blob();
+}
+
+export function fetchProbeTargets() {
+  return apiRequest('/probe/targets');
+}
+
+export function sendProbeResults(region, results) {
+  return apiRequest('/probe/results', {
+    method: 'POST',
+    body: JSON.stringify({ region, results }),
+  });
+}
+
+export function fetchRecommendation(region) {
+  const query = region ? `?region=${encodeURIComponent(region)}` : '';
+  return apiRequest(`/probe/recommendation${query}`);
+}
@@ -0,0 +1,65 @@
+const PROBE_TIMEOUT_MS = 3000;
+const PROBE_ATTEMPTS = 3;
+const PROBE_INTERVAL_MS = 24 * 60 * 60 * 1000;
+const LAST_PROBE_KEY = 'vpn4friends:lastProbe';
+
+export function getRegion() {
+  try {
+    return Intl.DateTimeFormat().resolvedOptions().timeZone || '';
+  } catch (e) {
+    return '';
+  }
+}
+
+export function isProbeDue() {
+  try {
+    const last = Number(window.localStorage.getItem(LAST_PROBE_KEY) || 0);
+    return Date.now() - last > PROBE_INTERVAL_MS;
+  } catch (e) {
+    return true;
+  }
+}
+
+export function markProbed() {
+  try {
+    window.localStorage.setItem(LAST_PROBE_KEY, String(Date.now()));
+  } catch (e) {
+    // ignore
+  }
+}
+
+async function timeRequest(url) {
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), PROBE_TIMEOUT_MS);
+  const started = performance.now();
+  try {
+    // no-cors: the response is opaque, only the round trip is measured
+    await fetch(url, { mode: 'no-cors', cache: 'no-store', signal: controller.signal });
+    return performance.now() - started;
+  } catch (e) {
+    return null;
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
+async function probeTarget(url) {
+  // The first request also pays for DNS and TLS setup; keep the best attempt
+  let best = null;
+  for (let i = 0; i < PROBE_ATTEMPTS; i += 1) {
+    const rtt = await timeRequest(url);
+    if (rtt !== null && (best === null || rtt < best)) {
+      best = rtt;
+    }
+  }
+  return best === null ? null : Math.round(best * 10) / 10;
+}
+
+// Node name -> RTT in ms (null if unreachable)
+export async function probeTargets(targets) {
+  const results = {};
+  for (const target of targets) {
+    results[target.node] = await probeTarget(target.url);
+  }
+  return results;
+}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Count SQL queries and time the main flows against a seeded database.
+
+Seeds a temporary SQLite database with ``--users`` users (each with a VPN
+profile, presets and a pending request), then runs the data access of the
+main flows (/start, /link, GET /me, admin request list) under a
+:class:`QueryRecorder`. Prints queries and time per flow and lists statements
+executed more than once (possible N+1). Exits with 1 if any flow repeats a
+statement or exceeds ``--max-queries``.
+
+Usage:
+    python scripts/bench_queries.py --users 500 --iterations 50
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from src.database.models import (  # noqa: E402
+    Base,
+    ConnectionPreset,
+    RequestStatus,
+    User,
+    VpnProfile,
+    VPNRequest,
+)
+from src.database.repositories import RequestRepository, UserRepository  # noqa: E402
+from src.database.session import create_session_maker  # noqa: E402
+from src.observability.queries import QueryRecorder  # noqa: E402
+from src.services import PresetService, VPNService  # noqa: E402
+
+PROFILE_DATA = {
+    "client_id": "550e8400-e29b-41d4-a716-446655440000",
+    "email": "bench",
+    "port": 443,
+    "reality": {"public_key": "key", "sni": "www.google.com", "short_id": "1f38d4f5"},
+}
+TELEGRAM_ID = 1_000_001
+
+
+async def seed(session: AsyncSession, users: int) -> None:
+    for i in range(1, users + 1):
+        user = User(telegram_id=1_000_000 + i, full_name=f"User {i}", username=f"user{i}")
+        profile = VpnProfile(user=user, protocol_name="vless", profile_data=PROFILE_DATA)
+        session.add_all(
+            [
+                user,
+                profile,
+                ConnectionPreset(user=user, profile=profile, name="a", app_type="x", format="uri"),
+                ConnectionPreset(user=user, profile=profile, name="b", app_type="x", format="uri"),
+                VPNRequest(user=user, status=RequestStatus.PENDING),
+            ]
+        )
+    await session.commit()
+
+
+async def flow_start(session: AsyncSession) -> None:
+    user, _ = await UserRepository(session).get_or_create(TELEGRAM_ID, "User 1", "user1")
+    await RequestRepository(session).has_pending(user)
+
+
+async def flow_link(session: AsyncSession) -> None:
+    user = await UserRepository(session).get_by_telegram_id(TELEGRAM_ID)
+    await VPNService(session).get_active_vpn_link(user)
+
+
+async def flow_me(session: AsyncSession) -> None:
+    user = await UserRepository(session).get_by_telegram_id(TELEGRAM_ID)
+    await PresetService(session).generate_configs(user)
+
+
+async def flow_admin_requests(session: AsyncSession) -> None:
+    for request in await VPNService(session).get_pending_requests():
+        _ = request.user.display_name, request.user.telegram_id
+
+
+FLOWS: dict[str, Callable[[AsyncSession], Awaitable[None]]] = {
+    "/start": flow_start,
+    "/link": flow_link,
+    "GET /me": flow_me,
+    "admin_requests": flow_admin_requests,
+}
+
+
+async def run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        maker = create_session_maker(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        engine = maker.kw["bind"]
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with maker() as session:
+            await seed(session, args.users)
+
+        failed = False
+        print(f"{'flow':<16} {'queries':>7} {'avg ms':>8}")
+        for name, flow in FLOWS.items():
+            with QueryRecorder(engine) as recorder:
+                async with maker() as session:
+                    await flow(session)
+
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                async with maker() as session:
+                    await flow(session)
+            avg_ms = (time.perf_counter() - started) / args.iterations * 1000
+
+            print(f"{name:<16} {recorder.count:>7} {avg_ms:>8.2f}")
+            repeated = recorder.repeated()
+            for statement, count in repeated.items():
+                print(f"  ! {count}x {statement[:120]}")
+            if repeated or (args.max_queries and recorder.count > args.max_queries):
+                failed = True
+
+        await engine.dispose()
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--max-queries", type=int, default=0, help="fail above this (0 = off)")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
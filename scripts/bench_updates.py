@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Compare update throughput and latency of long polling vs webhook mode.
+
+Runs the bot dispatcher against a local fake Telegram Bot API server:
+
+* polling - the fake server hands out updates via getUpdates;
+* webhook - updates are POSTed to the webhook listener (as Telegram does,
+  with up to ``--connections`` parallel requests).
+
+The handler simulates ``--work-ms`` of I/O and replies with sendMessage.
+Latency is measured from the moment an update becomes available to the
+moment its reply reaches the fake server. ``--rtt-ms`` adds network delay
+to every Bot API round-trip and webhook delivery.
+
+Usage:
+    python scripts/bench_updates.py --updates 2000 --work-ms 20 --rtt-ms 40
+"""
+
+import argparse
+import asyncio
+import contextlib
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+
+from src.bot.webhook import create_webhook_app  # noqa: E402
+
+TOKEN = "42:bench"
+API_PORT = 18081
+WEBHOOK_PORT = 18082
+WEBHOOK_PATH = "/telegram/webhook"
+SECRET = "bench-secret"
+
+
+def make_update(update_id: int) -> dict:
+    chat_id = 100_000 + update_id
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": f"ping {update_id}",
+        },
+    }
+
+
+class FakeTelegram:
+    """Minimal Bot API: getUpdates, sendMessage and webhook management."""
+
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.pending: list[dict] = []
+        self.available_at: dict[int, float] = {}
+        self.replied_at: dict[int, float] = {}
+        self.new_updates = asyncio.Event()
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    def publish(self, updates: list[dict]) -> None:
+        now = time.perf_counter()
+        for update in updates:
+            self.available_at[update["update_id"]] = now
+        self.pending.extend(updates)
+        self.new_updates.set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        await asyncio.sleep(self.rtt)
+
+        if method == "getUpdates":
+            offset = int(data.get("offset") or 0)
+            self.pending = [u for u in self.pending if u["update_id"] >= offset]
+            if not self.pending:
+                self.new_updates.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self.new_updates.wait(), float(data.get("timeout", 1)))
+            batch = self.pending[: int(data.get("limit") or 100)]
+            return web.json_response({"ok": True, "result": batch})
+
+        if method == "sendMessage":
+            update_id = int(data["chat_id"]) - 100_000
+            self.replied_at[update_id] = time.perf_counter()
+            if len(self.replied_at) >= self.expected:
+                self.done.set()
+            message = {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data.get("text", ""),
+            }
+            return web.json_response({"ok": True, "result": message})
+
+        # getMe, deleteWebhook, setWebhook...
+        return web.json_response(
+            {"ok": True, "result": {"id": 42, "is_bot": True, "first_name": "Bench"}}
+            if method == "getMe"
+            else {"ok": True, "result": True}
+        )
+
+    def latencies(self) -> list[float]:
+        return [self.replied_at[i] - self.available_at[i] for i in self.replied_at]
+
+
+def make_dispatcher(work: float) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def echo(message: Message) -> None:
+        await asyncio.sleep(work)  # database / panel calls
+        await message.answer("pong")
+
+    return dp
+
+
+async def run_polling(fake: FakeTelegram, bot: Bot, updates: int, args) -> None:
+    dp = make_dispatcher(args.work_ms / 1000)
+    polling = asyncio.create_task(
+        dp.start_polling(
+            bot,
+            handle_signals=False,
+            close_bot_session=False,
+            polling_timeout=1,
+            tasks_concurrency_limit=args.concurrency,
+        )
+    )
+    fake.publish([make_update(i) for i in range(1, updates + 1)])
+    await fake.done.wait()
+    await dp.stop_polling()
+    await polling
+
+
+async def run_webhook(fake: FakeTelegram, bot: Bot, updates: int, args) -> None:
+    dp = make_dispatcher(args.work_ms / 1000)
+    app = create_webhook_app(bot, dp, SECRET, path=WEBHOOK_PATH, max_concurrency=args.concurrency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", WEBHOOK_PORT).start()
+
+    url = f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    queue: asyncio.Queue[dict] = asyncio.Queue()
+    for i in range(1, updates + 1):
+        queue.put_nowait(make_update(i))
+    for i in range(1, updates + 1):
+        fake.available_at[i] = time.perf_counter()
+
+    async def connection(session: ClientSession) -> None:
+        while not queue.empty():
+            update = queue.get_nowait()
+            await asyncio.sleep(args.rtt_ms / 2000)
+            async with session.post(url, json=update, headers=headers) as response:
+                response.raise_for_status()
+
+    async with ClientSession() as session:
+        await asyncio.gather(*(connection(session) for _ in range(args.connections)))
+        await fake.done.wait()
+    await runner.cleanup()
+
+
+async def bench(mode: str, args) -> dict:
+    fake = FakeTelegram(rtt=args.rtt_ms / 1000)
+    fake.expected = args.updates
+    api = web.Application()
+    api.router.add_post("/bot{token}/{method}", fake.handle)
+    api_runner = web.AppRunner(api)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, "127.0.0.1", API_PORT).start()
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}"))
+    bot = Bot(TOKEN, session=session)
+    runner = run_polling if mode == "polling" else run_webhook
+    try:
+        started = time.perf_counter()
+        await runner(fake, bot, args.updates, args)
+        elapsed = time.perf_counter() - started
+    finally:
+        await bot.session.close()
+        await api_runner.cleanup()
+
+    latencies = sorted(fake.latencies())
+    return {
+        "mode": mode,
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max": latencies[-1] * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--work-ms", type=float, default=20, help="simulated handler I/O")
+    parser.add_argument("--rtt-ms", type=float, default=40, help="simulated network round-trip")
+    parser.add_argument("--concurrency", type=int, default=50, help="UPDATE_CONCURRENCY")
+    parser.add_argument("--connections", type=int, default=40, help="webhook max_connections")
+    args = parser.parse_args()
+
+    print(
+        f"{args.updates} updates, handler {args.work_ms} ms, RTT {args.rtt_ms} ms, "
+        f"concurrency {args.concurrency}, webhook connections {args.connections}\n"
+    )
+    print(f"{'mode':<8} {'updates/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for mode in ("polling", "webhook"):
+        r = await bench(mode, args)
+        print(
+            f"{r['mode']:<8} {r['throughput']:>10.1f} {r['p50']:>9.1f} "
+            f"{r['p95']:>9.1f} {r['max']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -79,3 +79,13 @@ async def get_current_user(
         )
 
     return user
+
+
+async def get_admin_user(user: User = Depends(get_current_user)) -> User:
+    """Current user, if they are a bot admin."""
+    if user.telegram_id not in settings.admin_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return user
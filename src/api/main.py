@@ -1,32 +1,78 @@
 """Main FastAPI application for the Mini App backend."""
 
-from fastapi import Depends, FastAPI, HTTPException, status
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_current_user
+from src.api.dependencies import get_admin_user, get_current_user
 from src.api.schemas import (
     CreatePresetRequest,
     GenericResponse,
     MeResponse,
     PresetConfigResponse,
     PresetSchema,
+    ProbeResultsRequest,
+    ProbeTargetSchema,
     ProfileSchema,
     ProtocolSchema,
+    RecommendationSchema,
+    ServerStatusSchema,
     SwitchProtocolRequest,
     SwitchProtocolResponse,
+    TrafficSchema,
     UpdateSNIRequest,
     UpdateSNIResponse,
     UserSchema,
 )
 from src.bot.config import settings
-from src.database.models import User
+from src.database.models import ConnectionPreset, User, VpnProfile
 from src.database.session import get_session
+from src.observability.metrics import CONTENT_TYPE, counter, histogram, render
+from src.observability.profiler import MAX_DURATION, ProfilerBusyError, profile
+from src.observability.tracing import SpanKind, parse_traceparent, setup_tracing, span
 from src.services import PresetService, VPNService, XUIApi
+from src.services.nodes import node_of
+from src.services.preset_export import iter_presets_zip
+from src.services.probes import ProbeService, probe_targets
+from src.services.status_monitor import status_monitor
+from src.services.xui_api import close_pools
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+API_REQUESTS = counter(
+    "api_requests_total",
+    "Mini App API requests by method, route and status",
+    ("method", "route", "status"),
+)
+API_REQUEST_DURATION = histogram(
+    "api_request_duration_seconds", "Mini App API latency by method and route", ("method", "route")
+)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Run background jobs for the lifetime of the API process."""
+    setup_tracing("vpn4friends-api")
+    status_monitor.start()
+    yield
+    await status_monitor.stop()
+    await close_pools()
+
 
 app = FastAPI(
     title="VPN4Friends Mini App API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Allow Mini App frontend to call this API from the browser.
@@ -40,13 +86,55 @@ app.add_middleware(
 )
 
 
-@app.get("/protocols", response_model=list[ProtocolSchema])
-async def list_protocols() -> list[ProtocolSchema]:
-    """Return available VPN protocols configured on the server.
+@app.middleware("http")
+async def record_metrics(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Count requests, measure latency and trace them per route template."""
+    status_code = 500
+    started = time.perf_counter()
+    # Join the caller's trace when the Mini App sends a traceparent header
+    parent = parse_traceparent(request.headers.get("traceparent"))
+    with span(
+        f"{request.method} {request.url.path}",
+        SpanKind.SERVER,
+        parent,
+        **{"http.method": request.method},
+    ) as current:
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Templates (/presets/{preset_id}) keep the label set bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            API_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=request.method, route=route
+            )
+            API_REQUESTS.inc(method=request.method, route=route, status=status_code)
+            current.update_name(f"{request.method} {route}")
+            current.set_attribute("http.route", route)
+            current.set_attribute("http.status_code", status_code)
 
-    This endpoint is used by the Mini App frontend to render protocol
-    selection chips instead of relying on hardcoded values.
-    """
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Prometheus metrics of the API process (blocked at the reverse proxy)."""
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+
+def _preset_schema(preset: ConnectionPreset, config: dict[str, str] | None) -> PresetSchema:
+    """Build the API representation of a preset with its rendered config."""
+    return PresetSchema(
+        id=preset.id,
+        name=preset.name,
+        app_type=preset.app_type,
+        format=preset.format,
+        config=PresetConfigResponse(**config) if config else None,
+    )
+
+
+def _protocol_schemas() -> list[ProtocolSchema]:
     return [
         ProtocolSchema(
             name=p.name,
@@ -58,45 +146,126 @@ async def list_protocols() -> list[ProtocolSchema]:
     ]
 
 
+@app.get("/admin/profile", response_class=PlainTextResponse, include_in_schema=False)
+async def profile_api(
+    seconds: float = Query(30.0, gt=0, le=MAX_DURATION),
+    _: User = Depends(get_admin_user),
+) -> PlainTextResponse:
+    """Sample the API process for ``seconds`` and return collapsed stacks."""
+    try:
+        stacks, _samples = await profile(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": 'attachment; filename="api-profile.folded"'},
+    )
+
+
+@app.get("/protocols", response_model=list[ProtocolSchema])
+async def list_protocols() -> list[ProtocolSchema]:
+    """Return available VPN protocols configured on the server.
+
+    This endpoint is used by the Mini App frontend to render protocol
+    selection chips instead of relying on hardcoded values.
+    """
+    return _protocol_schemas()
+
+
+@app.get("/status", response_model=ServerStatusSchema)
+async def get_status(_: User = Depends(get_current_user)) -> ServerStatusSchema:
+    """Return the cached server status snapshot (refreshed in the background)."""
+    snapshot = await status_monitor.get()
+    throughput = status_monitor.throughput
+    return ServerStatusSchema(
+        online=snapshot.online,
+        clients=snapshot.clients,
+        online_clients=snapshot.online_clients,
+        upload=snapshot.upload,
+        download=snapshot.download,
+        inbounds=snapshot.inbounds,
+        refreshed_at=snapshot.refreshed_at,
+        throughput_bps=throughput.current,
+        peak_throughput_bps=throughput.peak,
+        p95_throughput_bps=throughput.p95,
+    )
+
+
+async def _with_timeout(source: str, aw: Awaitable[T], timeout: float) -> tuple[T | None, bool]:
+    """Await a data source with a timeout. Returns (result, ok)."""
+    try:
+        return await asyncio.wait_for(aw, timeout), True
+    except TimeoutError:
+        logger.warning(f"/me source '{source}' timed out after {timeout}s")
+    except Exception as e:
+        logger.warning(f"/me source '{source}' failed: {e}")
+    return None, False
+
+
+async def _load_available_snis(profile: VpnProfile) -> list[str]:
+    async with XUIApi(node_of(profile.profile_data)) as api:
+        protocol_settings = await api.get_protocol_settings(profile.profile_data.get("inbound_id"))
+    return protocol_settings.get("reality", {}).get("sni_options", [])
+
+
+async def _load_traffic(profile: VpnProfile) -> dict[str, int]:
+    async with XUIApi(node_of(profile.profile_data)) as api:
+        return await api.get_client_traffic(profile.profile_data.get("email"))
+
+
+async def _nothing() -> Any:
+    return None
+
+
 @app.get("/me", response_model=MeResponse)
 async def get_me(
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> MeResponse:
-    """Get consolidated state for the current user."""
-    preset_service = PresetService(session)
-
-    user_schema = UserSchema(full_name=user.full_name, username=user.username)
+    """Get consolidated state for the current user.
 
-    # Get profile info
+    Panel and database sources are fetched concurrently, each under its own
+    timeout; if one of them fails the response is returned with what is
+    available and ``degraded`` set.
+    """
+    preset_service = PresetService(session)
     active_profile = user.active_profile
-    if active_profile:
-        async with XUIApi() as api:
-            protocol_settings = await api.get_protocol_settings(
-                active_profile.profile_data.get("inbound_id")
-            )
-            available_snis = protocol_settings.get("reality", {}).get("sni_options", [])
+    has_panel_data = bool(active_profile and active_profile.profile_data.get("email"))
+
+    (snis, snis_ok), (traffic, traffic_ok), (presets, presets_ok) = await asyncio.gather(
+        _with_timeout(
+            "inbound_settings",
+            _load_available_snis(active_profile) if has_panel_data else _nothing(),
+            settings.me_panel_timeout,
+        ),
+        _with_timeout(
+            "traffic",
+            _load_traffic(active_profile) if has_panel_data else _nothing(),
+            settings.me_panel_timeout,
+        ),
+        # Profiles are loaded in the same query
+        _with_timeout("presets", preset_service.generate_configs(user), settings.me_db_timeout),
+    )
 
+    if active_profile:
         profile_schema = ProfileSchema(
             has_profile=True,
             protocol=active_profile.protocol_name,
             label=active_profile.label,
             sni=active_profile.settings.get("sni") if active_profile.settings else None,
-            available_snis=available_snis,
+            available_snis=snis or [],
+            node=node_of(active_profile.profile_data).name,
         )
     else:
         profile_schema = ProfileSchema(has_profile=False)
 
-    # Get presets info
-    presets = await preset_service.get_user_presets(user)
-    presets_schema = [
-        PresetSchema(id=p.id, name=p.name, app_type=p.app_type, format=p.format) for p in presets
-    ]
-
     return MeResponse(
-        user=user_schema,
+        user=UserSchema(full_name=user.full_name, username=user.username),
         profile=profile_schema,
-        presets=presets_schema,
+        presets=[_preset_schema(p, config) for p, config in presets or []],
+        traffic=TrafficSchema(**traffic) if traffic else None,
+        protocols=_protocol_schemas(),
+        degraded=not (snis_ok and traffic_ok and presets_ok),
     )
 
 
@@ -156,6 +325,44 @@ async def update_sni(
     )
 
 
+@app.get("/probe/targets", response_model=list[ProbeTargetSchema])
+async def get_probe_targets(_: User = Depends(get_current_user)) -> list[ProbeTargetSchema]:
+    """Nodes the Mini App should time, with the URL to request for each."""
+    return [
+        ProbeTargetSchema(node=node.name, label=node.label or node.name, url=url)
+        for node, url in probe_targets()
+    ]
+
+
+@app.post("/probe/results", response_model=GenericResponse)
+async def post_probe_results(
+    payload: ProbeResultsRequest,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> GenericResponse:
+    """Store latencies measured by the Mini App from the user's device."""
+    stored = await ProbeService(session).record(user, payload.region, payload.results)
+    return GenericResponse(success=stored > 0, message=f"Сохранено замеров: {stored}")
+
+
+@app.get("/probe/recommendation", response_model=RecommendationSchema | None)
+async def get_recommendation(
+    region: str | None = Query(default=None, max_length=64),
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> RecommendationSchema | None:
+    """Fastest node for the user (own probes first, then their region's), if known."""
+    recommendation = await ProbeService(session).recommend(user, region)
+    if recommendation is None:
+        return None
+    return RecommendationSchema(
+        node=recommendation.node.name,
+        label=recommendation.node.label or recommendation.node.name,
+        rtt_ms=round(recommendation.rtt_ms, 1),
+        source=recommendation.source,
+    )
+
+
 @app.get("/presets", response_model=list[PresetSchema])
 async def list_presets(
     user: User = Depends(get_current_user),
@@ -163,10 +370,36 @@ async def list_presets(
 ) -> list[PresetSchema]:
     """List all presets for the current user."""
     preset_service = PresetService(session)
-    presets = await preset_service.get_user_presets(user)
-    return [
-        PresetSchema(id=p.id, name=p.name, app_type=p.app_type, format=p.format) for p in presets
-    ]
+    presets = await preset_service.generate_configs(user)
+    return [_preset_schema(p, config) for p, config in presets]
+
+
+@app.get("/presets/export")
+async def export_presets(
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    """Download all rendered preset configs (plus QR codes) as a ZIP archive.
+
+    The archive is produced entry by entry while it is being sent, so it is
+    never buffered as a whole.
+    """
+    preset_service = PresetService(session)
+    presets = await preset_service.generate_configs(user)
+    configs = [(preset.name, config) for preset, config in presets if config]
+
+    if not configs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Нет пресетов для экспорта.",
+        )
+
+    # A sync iterator is consumed in a worker thread, keeping QR rendering off the loop
+    return StreamingResponse(
+        iter_presets_zip(configs),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="vpn4friends-presets.zip"'},
+    )
 
 
 @app.post("/presets", response_model=PresetSchema)
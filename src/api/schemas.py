@@ -1,8 +1,9 @@
 """Pydantic schemas for the API."""
 
+from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class UserSchema(BaseModel):
@@ -12,6 +13,11 @@ class UserSchema(BaseModel):
     username: str | None
 
 
+class PresetConfigResponse(BaseModel):
+    type: str
+    value: str
+
+
 class PresetSchema(BaseModel):
     """Connection preset information."""
 
@@ -19,6 +25,7 @@ class PresetSchema(BaseModel):
     name: str
     app_type: str
     format: str
+    config: PresetConfigResponse | None = None
 
 
 class ProfileSchema(BaseModel):
@@ -29,14 +36,44 @@ class ProfileSchema(BaseModel):
     label: str | None
     sni: str | None
     available_snis: list[str] = []
+    node: str | None = None
+
+
+class TrafficSchema(BaseModel):
+    """Traffic counters of the active profile."""
+
+    upload: int
+    download: int
 
 
 class MeResponse(BaseModel):
-    """Response model for the /me endpoint."""
+    """Response model for the /me endpoint.
+
+    ``degraded`` is set when some data source (e.g. the 3X-UI panel) did not
+    answer in time and the corresponding fields are incomplete.
+    """
 
     user: UserSchema
     profile: ProfileSchema
     presets: list[PresetSchema]
+    traffic: TrafficSchema | None = None
+    protocols: list["ProtocolSchema"] = []
+    degraded: bool = False
+
+
+class ServerStatusSchema(BaseModel):
+    """Cached server status snapshot."""
+
+    online: bool
+    clients: int
+    online_clients: int
+    upload: int
+    download: int
+    inbounds: int
+    refreshed_at: datetime
+    throughput_bps: float | None = None
+    peak_throughput_bps: float | None = None
+    p95_throughput_bps: float | None = None
 
 
 class SwitchProtocolRequest(BaseModel):
@@ -76,11 +113,32 @@ class UpdateSNIResponse(BaseModel):
     sni: str | None = None
 
 
+class ProbeTargetSchema(BaseModel):
+    """Node the Mini App measures latency to."""
+
+    node: str
+    label: str
+    url: str
+
+
+class ProbeResultsRequest(BaseModel):
+    """Latency probe run: node name -> round-trip time in ms (null if unreachable)."""
+
+    # IANA time zone of the device, used as a coarse region
+    region: str = Field(min_length=1, max_length=64)
+    results: dict[str, float | None] = Field(max_length=50)
+
+
+class RecommendationSchema(BaseModel):
+    """Fastest node for the user."""
+
+    node: str
+    label: str
+    rtt_ms: float
+    # "user" (own probes) or "region" (probes of users in the same region)
+    source: str
+
+
 class GenericResponse(BaseModel):
     success: bool
     message: str
-
-
-class PresetConfigResponse(BaseModel):
-    type: str
-    value: str
@@ -1,19 +1,30 @@
 """Main application entry point."""
 
 import asyncio
+import contextlib
+import functools
 import logging
+import multiprocessing
 import signal
 import sys
+import time
+from collections.abc import Awaitable
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
+from typing import TypeVar
 
 from aiogram import Bot, Dispatcher
 from aiogram.types import BotCommand, BotCommandScopeAllPrivateChats, BotCommandScopeChat
 
 from src.bot.config import settings
 from src.bot.error_handler import router as error_router
-from src.bot.middlewares import DatabaseMiddleware
+from src.bot.middlewares import DatabaseMiddleware, MetricsMiddleware, TimingMiddleware
+from src.bot.middlewares.throttling import throttling
+from src.bot.outbox import create_outbox, send_to_admins
+from src.bot.storage import create_fsm_storage
+from src.bot.webhook import run_webhook
+from src.bot.workers import WorkerPool, poll_into_pool
 from src.database import init_db, session_factory
 from src.handlers import (
     admin_messaging_router,
@@ -21,41 +32,57 @@ from src.handlers import (
     user_messaging_router,
     user_router,
 )
-from src.services.xui_api import check_xui_connection
+from src.observability.logs import JsonFormatter, setup_queue_logging
+from src.observability.server import start_metrics_server
+from src.observability.tracing import setup_tracing
+from src.services.rebalancer import rebalancer
+from src.services.status_monitor import status_monitor
+from src.services.xui_api import check_xui_connection, close_pools
 
 
-def setup_logging() -> None:
-    """Configure logging to console and file."""
+def setup_logging(log_file: str = "bot.log") -> None:
+    """Configure logging to console and ``logs/<log_file>``.
+
+    Records are written by a background thread (see
+    ``src.observability.logs``), as JSON lines unless ``LOG_FORMAT=text``.
+    Each process must log to its own file: rotation is not process-safe.
+    """
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
 
     # File handler with rotation
     file_handler = RotatingFileHandler(
-        log_dir / "bot.log",
+        log_dir / log_file,
         maxBytes=5 * 1024 * 1024,  # 5 MB
         backupCount=5,
         encoding="utf-8",
     )
     file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(
-        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    )
 
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
 
-    # Root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    if settings.log_format == "json":
+        file_handler.setFormatter(JsonFormatter())
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+        console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
 
+    # Root logger: handlers run in the listener thread, off the event loop
+    setup_queue_logging(file_handler, console_handler, level=logging.INFO)
 
-setup_logging()
+
+# Worker processes import this module too and set up their own log file
+if multiprocessing.parent_process() is None:
+    setup_logging()
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 async def setup_bot_commands(bot: Bot) -> None:
     """Register bot commands in Telegram menu."""
@@ -75,64 +102,47 @@ async def setup_bot_commands(bot: Bot) -> None:
         BotCommand(command="users", description="👥 Пользователи с VPN"),
         BotCommand(command="broadcast", description="📢 Рассылка"),
         BotCommand(command="notify_update", description="🔔 Уведомить о смене конфига"),
+        BotCommand(command="profile", description="🔥 Профиль CPU за N секунд"),
     ]
 
-    # Set commands for all private chats
-    await bot.set_my_commands(user_commands, scope=BotCommandScopeAllPrivateChats())
-
-    # Set extended commands for admins
-    for admin_id in settings.admin_ids:
+    async def set_admin_commands(admin_id: int) -> None:
         try:
             await bot.set_my_commands(admin_commands, scope=BotCommandScopeChat(chat_id=admin_id))
         except Exception as e:
             logger.warning(f"Failed to set admin commands for {admin_id}: {e}")
 
+    # Commands for all private chats, plus extended commands for each admin
+    await asyncio.gather(
+        bot.set_my_commands(user_commands, scope=BotCommandScopeAllPrivateChats()),
+        *(set_admin_commands(admin_id) for admin_id in settings.admin_ids),
+    )
+
 
 async def notify_admins_startup(bot: Bot) -> None:
     """Notify admins that bot has started."""
     start_time = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                admin_id,
-                f"🟢 Бот запущен!\n\n🕐 Время: {start_time}",
-            )
-        except Exception as e:
-            logger.warning(f"Failed to notify admin {admin_id} about startup: {e}")
+    await send_to_admins(bot, f"🟢 Бот запущен!\n\n🕐 Время: {start_time}")
 
 
 async def notify_admins_shutdown(bot: Bot) -> None:
     """Notify admins that bot is shutting down."""
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(admin_id, "🔴 Бот остановлен.")
-        except Exception as e:
-            logger.warning(f"Failed to notify admin {admin_id} about shutdown: {e}")
-
-
-async def main() -> None:
-    """Initialize and start the bot."""
-    logger.info("Starting VPN bot...")
+    await send_to_admins(bot, "🔴 Бот остановлен.")
 
-    # Initialize database
-    await init_db()
-    logger.info("Database initialized")
 
-    # Check 3X-UI connection
-    logger.info("Checking 3X-UI panel connection...")
-    xui_ok, xui_message = await check_xui_connection()
-    if xui_ok:
-        logger.info(f"✅ {xui_message}")
-    else:
-        logger.warning(f"⚠️ {xui_message}")
-        logger.warning("Bot will start, but VPN operations may fail!")
-
-    # Create bot and dispatcher
-    bot = Bot(token=settings.bot_token)
-    dp = Dispatcher()
+def create_dispatcher() -> Dispatcher:
+    """Create the dispatcher with middleware and all routers registered."""
+    dp = Dispatcher(storage=create_fsm_storage())
 
     # Register middleware
+    # Time updates end to end, including the database session setup
+    dp.update.outer_middleware(TimingMiddleware(settings.slow_update_threshold))
     dp.update.middleware(DatabaseMiddleware(session_factory))
+    # Drop repeated button presses before filters and handlers run
+    dp.callback_query.outer_middleware(throttling)
+    # Inner middleware on the root router also wraps handlers of included routers
+    metrics = MetricsMiddleware()
+    dp.message.middleware(metrics)
+    dp.callback_query.middleware(metrics)
 
     # Register error handler first
     dp.include_router(error_router)
@@ -142,14 +152,65 @@ async def main() -> None:
     dp.include_router(user_messaging_router)
     dp.include_router(admin_router)
     dp.include_router(admin_messaging_router)
-    logger.info("Handlers registered")
+    return dp
+
+
+async def check_xui() -> None:
+    """Log whether the 3X-UI panel is reachable."""
+    xui_ok, xui_message = await check_xui_connection()
+    if xui_ok:
+        logger.info(f"✅ {xui_message}")
+    else:
+        logger.warning(f"⚠️ {xui_message}")
+        logger.warning("Bot is running, but VPN operations may fail!")
+
+
+async def _timed(timings: dict[str, float], phase: str, aw: Awaitable[T]) -> T:
+    """Await ``aw`` and record how long it took under ``phase``."""
+    started = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        timings[phase] = time.perf_counter() - started
 
-    # Set bot commands
-    await setup_bot_commands(bot)
-    logger.info("Bot commands registered")
 
-    # Notify admins about startup
-    await notify_admins_startup(bot)
+def _log_timings(title: str, timings: dict[str, float]) -> None:
+    phases = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in timings.items())
+    logger.info(f"{title}: {phases}")
+
+
+async def run_deferred_startup(bot: Bot) -> None:
+    """Startup steps that don't gate update handling, run once the bot is up."""
+    timings: dict[str, float] = {}
+    results = await asyncio.gather(
+        _timed(timings, "panel check", check_xui()),
+        _timed(timings, "bot commands", setup_bot_commands(bot)),
+        _timed(timings, "admin notification", notify_admins_startup(bot)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"Deferred startup step failed: {result}")
+    _log_timings("Deferred startup", timings)
+
+
+async def main() -> None:
+    """Initialize and start the bot."""
+    logger.info("Starting VPN bot...")
+    setup_tracing("vpn4friends-bot")
+    started = time.perf_counter()
+    timings: dict[str, float] = {}
+
+    # Initialize database (handlers need it, so this gates startup)
+    await _timed(timings, "database", init_db())
+
+    # Create bot and dispatcher
+    dispatcher_started = time.perf_counter()
+    bot = Bot(token=settings.bot_token)
+    # Rate-limit and retry all outgoing chat messages
+    bot.session.middleware(create_outbox())
+    dp = create_dispatcher()
+    timings["dispatcher"] = time.perf_counter() - dispatcher_started
 
     # Setup graceful shutdown
     shutdown_event = asyncio.Event()
@@ -167,13 +228,87 @@ async def main() -> None:
         # Windows doesn't support add_signal_handler
         pass
 
-    # Start polling
-    logger.info("Bot is running...")
+    # Panel check, bot commands and the admin notification run alongside update handling
+    deferred = asyncio.create_task(run_deferred_startup(bot))
+    timings["total"] = time.perf_counter() - started
+    _log_timings("Startup", timings)
+
+    metrics_server = None
+    if settings.metrics_port:
+        try:
+            metrics_server = await start_metrics_server(
+                settings.metrics_host, settings.metrics_port
+            )
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started: {e}")
+
+    try:
+        if settings.bot_workers > 1:
+            await run_with_workers(bot, dp, shutdown_event)
+        else:
+            await run_single(bot, dp, shutdown_event)
+    finally:
+        if not deferred.done():
+            deferred.cancel()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        await close_pools()
+
+
+async def run_single(bot: Bot, dp: Dispatcher, shutdown_event: asyncio.Event) -> None:
+    """Handle updates in this process."""
+    # Keep /status snapshot fresh in the background
+    status_monitor.start()
+    rebalancer.start(functools.partial(bot.send_message, parse_mode="HTML"))
+
+    logger.info(f"Bot is running ({settings.bot_mode})...")
+    try:
+        if settings.bot_mode == "webhook":
+            await run_webhook(bot, dp, shutdown_event)
+        else:
+            # getUpdates is rejected while a webhook is set
+            await bot.delete_webhook()
+            await dp.start_polling(
+                bot,
+                tasks_concurrency_limit=settings.update_concurrency,
+                close_bot_session=False,
+            )
+    finally:
+        logger.info("Shutting down...")
+        await rebalancer.stop()
+        await status_monitor.stop()
+        await notify_admins_shutdown(bot)
+        await dp.storage.close()
+        await bot.session.close()
+        logger.info("Bot stopped gracefully")
+
+
+async def run_with_workers(bot: Bot, dp: Dispatcher, shutdown_event: asyncio.Event) -> None:
+    """Ingest updates in this process and handle them in worker processes."""
+    pool = WorkerPool(settings.bot_workers)
+    pool.start()
+    # Panel polling and migrations run here only, not once per worker
+    status_monitor.start()
+    rebalancer.start(functools.partial(bot.send_message, parse_mode="HTML"))
+
+    logger.info(f"Bot is running ({settings.bot_mode}, {settings.bot_workers} workers)...")
     try:
-        await dp.start_polling(bot)
+        if settings.bot_mode == "webhook":
+            await run_webhook(bot, dp, shutdown_event, forward=pool.dispatch)
+        else:
+            await bot.delete_webhook()
+            polling = asyncio.create_task(poll_into_pool(bot, dp, pool))
+            await shutdown_event.wait()
+            polling.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await polling
     finally:
         logger.info("Shutting down...")
+        await rebalancer.stop()
+        await status_monitor.stop()
+        await pool.stop()
         await notify_admins_shutdown(bot)
+        await dp.storage.close()
         await bot.session.close()
         logger.info("Bot stopped gracefully")
 
@@ -7,14 +7,56 @@ from pydantic_settings import BaseSettings
 
 
 class Protocol(BaseModel):
-    """Represents a single VPN protocol configuration."""
+    """Represents a single VPN protocol configuration.
+
+    New clients are spread over the ``inbound_ids`` pool (just ``inbound_id``
+    if no pool is given) by the ``placement`` policy: ``fewest_clients`` or
+    ``lowest_traffic`` (lowest recent throughput, then fewest clients).
+    """
 
     name: str
-    inbound_id: int
+    inbound_id: int = 0
+    inbound_ids: list[int] = []
+    placement: str = "fewest_clients"
+    # Max clients per inbound (0 = unlimited); keeps inbound settings small
+    inbound_capacity: int = 0
     label: str
     description: str
     recommended: bool = False
 
+    @model_validator(mode="after")
+    def resolve_inbound_pool(self) -> "Protocol":
+        if not self.inbound_ids:
+            if not self.inbound_id:
+                raise ValueError(f"protocol '{self.name}' needs inbound_id or inbound_ids")
+            self.inbound_ids = [self.inbound_id]
+        elif not self.inbound_id:
+            self.inbound_id = self.inbound_ids[0]
+        if self.placement not in ("fewest_clients", "lowest_traffic"):
+            raise ValueError("placement must be 'fewest_clients' or 'lowest_traffic'")
+        return self
+
+
+class Node(BaseModel):
+    """A 3X-UI panel (VPN server) users can be placed on."""
+
+    name: str
+    api_url: str
+    base_path: str = "/panel"
+    username: str
+    password: str
+    # Host used in VLESS/SS links (IP or domain)
+    host: str
+    # Max active profiles on the node (0 = unlimited)
+    capacity: int = 0
+    # Relative share of new users; a node with weight 2 gets twice as many
+    # (0 = only when the other nodes are full)
+    weight: float = 1.0
+    # Shown to users (e.g. "Germany"); defaults to the name
+    label: str = ""
+    # URL the Mini App times to measure latency to the node (https://host/ if empty)
+    probe_url: str = ""
+
 
 class Settings(BaseSettings):
     """Bot configuration loaded from environment variables."""
@@ -34,17 +76,105 @@ class Settings(BaseSettings):
             self.admin_ids = [int(x.strip()) for x in admin_ids_str.split(",") if x.strip()]
         return self
 
-    # 3X-UI Panel
-    xui_api_url: str
+    # 3X-UI Panel (the only node unless nodes_config is set)
+    xui_api_url: str = ""
     xui_base_path: str = "/panel"
-    xui_username: str
-    xui_password: str
-    xui_host: str
+    xui_username: str = ""
+    xui_password: str = ""
+    xui_host: str = ""
+
+    # Nodes (JSON array of Node objects); profiles created before nodes were
+    # configured belong to the first one
+    nodes_config: str = ""
+    nodes: list[Node] = []
+
+    # Connections kept open per node (one shared session per panel)
+    xui_pool_size: int = 10
+
+    # 3X-UI circuit breaker: open after N consecutive failures, retry after timeout (s)
+    xui_breaker_failure_threshold: int = 3
+    xui_breaker_reset_timeout: float = 30.0
 
     # Protocols configuration (JSON string from .env)
     protocols_config: str = "[]"
     protocols: list[Protocol] = []
 
+    # Update delivery: "polling" (getUpdates) or "webhook"
+    bot_mode: str = "polling"
+    # Worker processes handling updates (partitioned by chat id); 1 = in-process
+    bot_workers: int = 1
+    # FSM state storage: "sql" (bot database), "redis" or "memory"
+    fsm_storage: str = "sql"
+    redis_url: str = "redis://localhost:6379/0"
+    # Idle FSM records expire after this many seconds
+    fsm_ttl: int = 86400
+    # SQL storage: batch FSM writes for this many seconds
+    fsm_flush_interval: float = 0.5
+    # Max updates handled concurrently (both modes)
+    update_concurrency: int = 50
+    # Webhook: public base URL (e.g. https://api.example.com), path and secret
+    webhook_base_url: str = ""
+    webhook_path: str = "/telegram/webhook"
+    webhook_secret: str = ""
+    # Local listener the reverse proxy forwards webhook requests to
+    webhook_host: str = "127.0.0.1"
+    webhook_port: int = 8081
+
+    # Minimum seconds between presses of the same button by one user
+    # (JSON object: callback data -> seconds); other buttons use the default
+    throttle_intervals: dict[str, float] = {"refresh_stats": 5.0, "refresh_link": 10.0}
+    throttle_default_interval: float = 0.0
+
+    # Outgoing Telegram rate limits (messages per second)
+    telegram_global_rate: float = 30.0
+    telegram_chat_rate: float = 1.0
+    telegram_chat_burst: int = 3
+
+    # Server status snapshot refresh interval (seconds)
+    status_refresh_interval: float = 60.0
+    # Number of throughput samples (one per refresh) kept for current/peak/p95
+    throughput_window: int = 60
+
+    # Rebalancing of clients between the inbounds/nodes of a protocol: every
+    # rebalance_interval seconds (0 = off), while the most and least loaded
+    # slot differ by more than rebalance_tolerance clients (per unit of node
+    # weight); at most rebalance_max_migrations per run, in batches of
+    # rebalance_batch_size with rebalance_batch_delay seconds between them
+    rebalance_interval: float = 0.0
+    rebalance_tolerance: float = 5.0
+    rebalance_max_migrations: int = 50
+    rebalance_batch_size: int = 5
+    rebalance_batch_delay: float = 10.0
+
+    # Latency probes from the Mini App: results older than probe_window_hours
+    # are ignored; a region needs results from probe_min_samples users per
+    # node to be used for users without their own
+    probe_window_hours: float = 168.0
+    probe_min_samples: int = 3
+
+    # Mini App API: per-source timeouts (seconds) for the GET /me fan-out
+    me_panel_timeout: float = 3.0
+    me_db_timeout: float = 5.0
+
+    # Log format of the bot: json (one object per line) or text
+    log_format: str = "json"
+
+    # Updates handled slower than this (seconds) are logged with a time
+    # breakdown (database, panel, Bot API); 0 disables the log
+    slow_update_threshold: float = 1.0
+
+    # Tracing (update -> handler -> service -> repository/panel spans), exported
+    # as OTLP/JSON: "" (off), "file" (appended to tracing_file) or "otlp"
+    # (POSTed to an OpenTelemetry collector)
+    tracing_exporter: str = ""
+    tracing_file: str = "logs/traces.jsonl"
+    tracing_otlp_endpoint: str = "http://127.0.0.1:4318/v1/traces"
+
+    # Prometheus metrics of the bot process (GET /metrics); port 0 disables.
+    # Worker processes listen on the following ports (port + 1 + index).
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9101
+
     # Database (absolute path for Docker)
     database_url: str = "sqlite+aiosqlite:////app/data/vpn_bot.db"
 
@@ -66,6 +196,35 @@ class Settings(BaseSettings):
             raise ValueError(f"Invalid PROTOCOLS_CONFIG: {e}") from e
         return self
 
+    @model_validator(mode="after")
+    def parse_nodes_config(self) -> "Settings":
+        """Parse NODES_CONFIG, or describe the single XUI_* panel as node "main"."""
+        if not self.nodes_config.strip():
+            if not self.xui_api_url:
+                raise ValueError("Either XUI_API_URL or NODES_CONFIG must be set")
+            self.nodes = [
+                Node(
+                    name="main",
+                    api_url=self.xui_api_url,
+                    base_path=self.xui_base_path,
+                    username=self.xui_username,
+                    password=self.xui_password,
+                    host=self.xui_host,
+                )
+            ]
+            return self
+        try:
+            nodes_data = json.loads(self.nodes_config)
+            if not isinstance(nodes_data, list) or not nodes_data:
+                raise ValueError("NODES_CONFIG must be a non-empty JSON array")
+            self.nodes = [Node(**n) for n in nodes_data]
+        except (json.JSONDecodeError, ValueError) as e:
+            raise ValueError(f"Invalid NODES_CONFIG: {e}") from e
+        names = [node.name for node in self.nodes]
+        if len(set(names)) != len(names):
+            raise ValueError("Invalid NODES_CONFIG: node names must be unique")
+        return self
+
     @field_validator("admin_ids", mode="before")
     @classmethod
     def parse_admin_ids(cls, value: str) -> list[int]:
@@ -73,6 +232,51 @@ class Settings(BaseSettings):
             return [int(x.strip()) for x in value.split(",") if x.strip()]
         return []
 
+    @field_validator("bot_mode")
+    @classmethod
+    def validate_bot_mode(cls, value: str) -> str:
+        if value not in ("polling", "webhook"):
+            raise ValueError("BOT_MODE must be 'polling' or 'webhook'")
+        return value
+
+    @field_validator("fsm_storage")
+    @classmethod
+    def validate_fsm_storage(cls, value: str) -> str:
+        if value not in ("sql", "redis", "memory"):
+            raise ValueError("FSM_STORAGE must be 'sql', 'redis' or 'memory'")
+        return value
+
+    @field_validator("log_format")
+    @classmethod
+    def validate_log_format(cls, value: str) -> str:
+        if value not in ("json", "text"):
+            raise ValueError("LOG_FORMAT must be 'json' or 'text'")
+        return value
+
+    @field_validator("tracing_exporter")
+    @classmethod
+    def validate_tracing_exporter(cls, value: str) -> str:
+        if value not in ("", "file", "otlp"):
+            raise ValueError("TRACING_EXPORTER must be empty, 'file' or 'otlp'")
+        return value
+
+    @property
+    def webhook_url(self) -> str:
+        """Full public URL Telegram should deliver updates to."""
+        return self.webhook_base_url.rstrip("/") + self.webhook_path
+
+    @property
+    def default_node(self) -> Node:
+        """Node of profiles that don't record one (created before nodes were added)."""
+        return self.nodes[0]
+
+    def get_node(self, name: str | None) -> Node:
+        """Node by name; unknown or missing names resolve to the default node."""
+        for node in self.nodes:
+            if node.name == name:
+                return node
+        return self.default_node
+
     def get_protocol(self, protocol_name: str) -> Protocol | None:
         """Get protocol object by name."""
         for proto in self.protocols:
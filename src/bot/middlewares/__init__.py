@@ -1,4 +1,13 @@
 from src.bot.middlewares.admin import AdminFilter
 from src.bot.middlewares.database import DatabaseMiddleware
+from src.bot.middlewares.metrics import MetricsMiddleware
+from src.bot.middlewares.throttling import ThrottlingMiddleware
+from src.bot.middlewares.timing import TimingMiddleware
 
-__all__ = ["DatabaseMiddleware", "AdminFilter"]
+__all__ = [
+    "DatabaseMiddleware",
+    "AdminFilter",
+    "MetricsMiddleware",
+    "ThrottlingMiddleware",
+    "TimingMiddleware",
+]
@@ -0,0 +1,90 @@
+"""Handler latency and error metrics."""
+
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from src.observability.metrics import counter, histogram
+from src.observability.timing import current_timing
+from src.observability.tracing import span
+
+HANDLER_DURATION = histogram(
+    "bot_handler_duration_seconds",
+    "Handler latency by router module, handler and action",
+    ("router", "handler", "action"),
+)
+HANDLER_CALLS = counter(
+    "bot_handler_calls_total",
+    "Handler calls by router module, handler, action and result",
+    ("router", "handler", "action", "result"),
+)
+
+
+def handler_commands(handler: HandlerObject | None) -> set[str]:
+    """Commands a handler is registered for by its ``Command`` filters."""
+    return {
+        command
+        for filter_object in getattr(handler, "filters", None) or ()
+        if isinstance(filter_object.callback, Command)
+        for command in filter_object.callback.commands
+        if isinstance(command, str)
+    }
+
+
+def event_action(event: TelegramObject, handler: HandlerObject | None = None) -> str:
+    """Short action name: the command, or the callback's handler.
+
+    Label values come from the matched ``handler`` rather than from user
+    input, so they stay bounded: callback data carries ids (``reply_to_<id>``)
+    and commands the handler isn't registered for are labelled ``other``.
+    """
+    if isinstance(event, CallbackQuery):
+        return getattr(getattr(handler, "callback", None), "__name__", None) or "callback"
+    if isinstance(event, Message):
+        text = event.text or ""
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0].split("@", 1)[0][1:]
+            return f"/{command}" if command in handler_commands(handler) else "other"
+        return "text" if text else (event.content_type or "message")
+    return type(event).__name__.lower()
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Inner middleware measuring the matched handler.
+
+    Registered on the root router's observers, it wraps handlers of all
+    included routers; the router label is the handler's module name.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        router = getattr(callback, "__module__", "unknown").rsplit(".", 1)[-1]
+        name = getattr(callback, "__name__", "unknown")
+        action = event_action(event, handler_object)
+        timing = current_timing()
+        if timing is not None:
+            timing.handler = f"{router}.{name}"
+
+        result = "error"
+        started = time.perf_counter()
+        try:
+            with span(f"handler {router}.{name}", **{"telegram.action": action}):
+                response = await handler(event, data)
+            result = "ok"
+            return response
+        finally:
+            HANDLER_DURATION.observe(
+                time.perf_counter() - started, router=router, handler=name, action=action
+            )
+            HANDLER_CALLS.inc(router=router, handler=name, action=action, result=result)
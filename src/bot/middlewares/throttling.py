@@ -0,0 +1,97 @@
+"""Per-user throttling of callback buttons."""
+
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from src.bot.config import settings
+from src.observability.metrics import counter
+
+# Forget last-run timestamps once this many are tracked
+_MAX_TRACKED = 10_000
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Drops button spam before it reaches the database and the panel.
+
+    A press of a button that the same user already has in progress waits for
+    that handler and is answered with its outcome instead of running again
+    (coalesced). A press within the minimum interval configured for the
+    action is answered right away without running the handler (dropped).
+    """
+
+    def __init__(self, intervals: dict[str, float], default_interval: float = 0.0) -> None:
+        self.intervals = intervals
+        self.default_interval = default_interval
+        self._in_flight: dict[tuple[int, str], asyncio.Future[None]] = {}
+        self._last_run: dict[tuple[int, str], float] = {}
+
+        # Counters
+        self.passed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def _remember(self, key: tuple[int, str], now: float) -> None:
+        if len(self._last_run) >= _MAX_TRACKED:
+            horizon = max(self.intervals.values(), default=self.default_interval)
+            self._last_run = {k: t for k, t in self._last_run.items() if now - t < horizon}
+        self._last_run[key] = now
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, CallbackQuery) or not event.data or not event.from_user:
+            return await handler(event, data)
+
+        key = (event.from_user.id, event.data)
+        running = self._in_flight.get(key)
+        if running is not None:
+            self.coalesced += 1
+            await asyncio.shield(running)
+            await event.answer("✅ Готово")
+            return None
+
+        now = time.monotonic()
+        interval = self.intervals.get(event.data, self.default_interval)
+        last = self._last_run.get(key)
+        if last is not None and now - last < interval:
+            self.dropped += 1
+            wait = math.ceil(interval - (now - last))
+            await event.answer(f"✅ Данные только что обновлены, повтори через {wait} с")
+            return None
+
+        self._remember(key, now)
+        self.passed += 1
+        done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = done
+        try:
+            return await handler(event, data)
+        finally:
+            del self._in_flight[key]
+            done.set_result(None)
+
+    def stats(self) -> dict[str, int]:
+        """Passed, coalesced and dropped callback counters."""
+        return {
+            "passed": self.passed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+
+throttling = ThrottlingMiddleware(
+    intervals=settings.throttle_intervals,
+    default_interval=settings.throttle_default_interval,
+)
+
+counter(
+    "bot_throttled_callbacks_total", "Button presses by throttling outcome", ("result",)
+).set_function(lambda: [({"result": result}, n) for result, n in throttling.stats().items()])
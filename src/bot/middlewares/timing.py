@@ -0,0 +1,87 @@
+"""End-to-end update timing with a slow-update log."""
+
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from src.observability.logs import log_context
+from src.observability.metrics import histogram
+from src.observability.timing import UpdateTiming, measure_update
+from src.observability.tracing import SpanKind, span
+
+logger = logging.getLogger(__name__)
+
+UPDATE_DURATION = histogram(
+    "bot_update_duration_seconds", "End-to-end update handling time by update type", ("type",)
+)
+
+
+class TimingMiddleware(BaseMiddleware):
+    """Outer update middleware timing each update end to end.
+
+    Time spent in the database, the panel and the Bot API is collected via
+    :mod:`src.observability.timing`; updates slower than ``threshold``
+    seconds are logged with that breakdown (0 disables the log).
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+
+        # Counters
+        self.slow = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        user = data.get("event_from_user")
+        user_id = user.id if user else None
+        with (
+            measure_update() as timing,
+            log_context(update_id=event.update_id, user_id=user_id),
+            span(
+                f"update {event.event_type}",
+                SpanKind.SERVER,
+                **{"telegram.update_id": event.update_id, "telegram.user_id": user_id or 0},
+            ),
+        ):
+            try:
+                return await handler(event, data)
+            finally:
+                elapsed = timing.elapsed
+                UPDATE_DURATION.observe(elapsed, type=event.event_type)
+                if self.threshold and elapsed >= self.threshold:
+                    self.slow += 1
+                    self._log_slow(event, data, timing)
+
+    @staticmethod
+    def _log_slow(event: Update, data: dict[str, Any], timing: UpdateTiming) -> None:
+        user = data.get("event_from_user")
+        breakdown = timing.breakdown()
+        record = {
+            "update_id": event.update_id,
+            "type": event.event_type,
+            "user_id": user.id if user else None,
+            "handler": timing.handler,
+            "ms": {name: round(seconds * 1000, 1) for name, seconds in breakdown.items()},
+            "calls": dict(timing.calls),
+        }
+        parts = ", ".join(
+            f"{name} {seconds * 1000:.0f} ms"
+            + (f" ({timing.calls[name]} calls)" if name in timing.calls else "")
+            for name, seconds in breakdown.items()
+            if name != "total"
+        )
+        logger.warning(
+            f"Slow update {event.update_id} ({event.event_type}, {timing.handler or 'unhandled'}):"
+            f" {breakdown['total'] * 1000:.0f} ms - {parts}",
+            extra={"slow_update": record},
+        )
@@ -0,0 +1,393 @@
+"""Outbound Telegram traffic control.
+
+All Bot API calls pass through :class:`OutboxMiddleware` (a session-level
+request middleware), so handlers keep calling ``bot.send_message`` /
+``message.answer`` as usual while the middleware enforces Telegram's flood
+limits: a global rate (~30 msg/s) served from a central FIFO queue and a
+per-chat token bucket (~1 msg/s with a small burst). Identical requests to
+the same chat that are already queued are coalesced, and ``RetryAfter``
+responses are retried after the delay Telegram asks for.
+
+The global queue is split into priority lanes. Requests go to the lane set
+in the current context (see :func:`outbound_lane`), interactive replies by
+default, and lanes are served by weighted round-robin so a running broadcast
+cannot starve users pressing buttons.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage, TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from src.bot.config import settings
+from src.observability.metrics import counter, gauge, histogram
+from src.observability.timing import record
+from src.observability.tracing import SpanKind, span
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_REQUESTS = counter(
+    "telegram_requests_total",
+    "Bot API requests by method, lane and result (ok, retry_after, error)",
+    ("method", "lane", "result"),
+)
+TELEGRAM_REQUEST_DURATION = histogram(
+    "telegram_request_duration_seconds", "Bot API request latency", ("method",)
+)
+
+# Requests that are safe to merge when an identical one is already queued
+_COALESCIBLE = (SendMessage, EditMessageText, EditMessageReplyMarkup)
+
+# Drop idle per-chat buckets once this many are tracked
+_MAX_CHAT_BUCKETS = 10_000
+
+
+class Lane(Enum):
+    """Priority lane of an outgoing request."""
+
+    INTERACTIVE = "interactive"  # replies to user actions
+    ADMIN = "admin"  # notifications to admins
+    BULK = "bulk"  # broadcasts and mass notifications
+
+
+# Share of the global rate each lane gets while all lanes are busy
+LANE_WEIGHTS: dict[Lane, int] = {
+    Lane.INTERACTIVE: 6,
+    Lane.ADMIN: 3,
+    Lane.BULK: 1,
+}
+
+_current_lane: ContextVar[Lane] = ContextVar("outbound_lane", default=Lane.INTERACTIVE)
+
+
+@contextmanager
+def outbound_lane(lane: Lane) -> Iterator[None]:
+    """Send requests made inside the block through the given lane."""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before using it."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class OutboundQueue:
+    """Central queue releasing senders at the global Telegram rate.
+
+    Each lane is a FIFO; whenever a token is available the next lane is
+    picked by smooth weighted round-robin among the non-empty lanes.
+    """
+
+    def __init__(self, rate: float, weights: dict[Lane, int] | None = None) -> None:
+        self._bucket = TokenBucket(rate=rate, capacity=rate)
+        self._weights = weights or LANE_WEIGHTS
+        self._lanes: dict[Lane, deque[asyncio.Future[None]]] = {lane: deque() for lane in Lane}
+        self._credits: dict[Lane, int] = dict.fromkeys(Lane, 0)
+        self._pending = asyncio.Event()
+        self._dispatcher: asyncio.Task[None] | None = None
+
+        # Per-lane counters
+        self.released: dict[Lane, int] = dict.fromkeys(Lane, 0)
+        self.wait_time: dict[Lane, float] = dict.fromkeys(Lane, 0.0)
+
+    @property
+    def depth(self) -> int:
+        return sum(self.depths().values())
+
+    def depths(self) -> dict[Lane, int]:
+        """Number of waiters queued in each lane."""
+        return {lane: sum(not t.done() for t in queue) for lane, queue in self._lanes.items()}
+
+    async def wait_turn(self, lane: Lane | None = None) -> None:
+        """Wait until the global rate allows one more request in ``lane``."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        lane = lane or _current_lane.get()
+        turn: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append(turn)
+        self._pending.set()
+
+        started = time.monotonic()
+        await turn
+        self.released[lane] += 1
+        self.wait_time[lane] += time.monotonic() - started
+
+    def _has_waiters(self) -> bool:
+        for queue in self._lanes.values():
+            while queue and queue[0].done():  # waiter was cancelled
+                queue.popleft()
+        return any(self._lanes.values())
+
+    def _next_turn(self) -> asyncio.Future[None] | None:
+        if not self._has_waiters():
+            return None
+
+        active = [lane for lane, queue in self._lanes.items() if queue]
+        if not active:
+            return None
+
+        total = 0
+        for lane in active:
+            self._credits[lane] += self._weights[lane]
+            total += self._weights[lane]
+        chosen = max(active, key=lambda lane: self._credits[lane])
+        self._credits[chosen] -= total
+        return self._lanes[chosen].popleft()
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._has_waiters():
+                self._pending.clear()
+                await self._pending.wait()
+                continue
+            # Take the token first so the lane is chosen as late as possible
+            await self._bucket.acquire()
+            turn = self._next_turn()
+            if turn is not None:
+                turn.set_result(None)
+
+
+class OutboxMiddleware(BaseRequestMiddleware):
+    """Rate-limits, coalesces and retries outgoing chat messages."""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        max_retries: int = 3,
+    ) -> None:
+        self.queue = OutboundQueue(rate=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+        self._in_flight: dict[tuple[Any, ...], asyncio.Future[Any]] = {}
+
+        # Counters
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= _MAX_CHAT_BUCKETS:
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.is_full}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    @staticmethod
+    def _coalesce_key(method: TelegramMethod[Any], chat_id: int | str) -> tuple[Any, ...] | None:
+        if not isinstance(method, _COALESCIBLE):
+            return None
+        return (
+            type(method).__name__,
+            chat_id,
+            method.model_dump_json(exclude_none=True, fallback=repr),
+        )
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            # Not a chat message (getUpdates, answerCallbackQuery, setMyCommands...)
+            return await self._request(make_request, bot, method)
+
+        key = self._coalesce_key(method, chat_id)
+        if key is not None and key in self._in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._in_flight[key] = future
+        try:
+            response = await self._send(make_request, bot, method, chat_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved: there may be no duplicates to consume it
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            if key is not None:
+                self._in_flight.pop(key, None)
+
+    async def _send(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        chat_id: int | str,
+    ) -> Response[TelegramType]:
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            await self._chat_bucket(chat_id).acquire()
+            await self.queue.wait_turn()
+            record("telegram_queue", time.perf_counter() - queued)
+            try:
+                response = await self._request(make_request, bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.retried += 1
+                logger.warning(
+                    f"Flood control for chat {chat_id}, retry {attempt} in {e.retry_after}s"
+                )
+                await asyncio.sleep(e.retry_after)
+                continue
+            self.sent += 1
+            return response
+
+    @staticmethod
+    async def _request(
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        result = "error"
+        started = time.perf_counter()
+        try:
+            with span(f"telegram {name}", SpanKind.CLIENT):
+                response = await make_request(bot, method)
+            result = "ok"
+            return response
+        except TelegramRetryAfter:
+            result = "retry_after"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            TELEGRAM_REQUEST_DURATION.observe(elapsed, method=name)
+            record("telegram", elapsed)
+            TELEGRAM_REQUESTS.inc(method=name, lane=_current_lane.get().value, result=result)
+
+    def stats(self) -> dict[str, int]:
+        """Counters and current queue depth."""
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "queue_depth": self.queue.depth,
+        }
+
+    def lane_stats(self) -> dict[str, dict[str, float]]:
+        """Queue depth, released requests and average wait (s) per lane."""
+        depths = self.queue.depths()
+        result = {}
+        for lane in Lane:
+            released = self.queue.released[lane]
+            result[lane.value] = {
+                "depth": depths[lane],
+                "released": released,
+                "avg_wait": self.queue.wait_time[lane] / released if released else 0.0,
+            }
+        return result
+
+
+_outbox: OutboxMiddleware | None = None
+
+
+def create_outbox(global_rate: float | None = None) -> OutboxMiddleware:
+    """Create the outbox middleware from settings."""
+    global _outbox
+    _outbox = OutboxMiddleware(
+        global_rate=global_rate or settings.telegram_global_rate,
+        chat_rate=settings.telegram_chat_rate,
+        chat_burst=settings.telegram_chat_burst,
+    )
+    return _outbox
+
+
+def get_outbox() -> OutboxMiddleware | None:
+    """Return the outbox installed on the bot session, if any."""
+    return _outbox
+
+
+def _queue_depths() -> list[tuple[dict[str, str], float]]:
+    if _outbox is None:
+        return []
+    return [({"lane": lane.value}, depth) for lane, depth in _outbox.queue.depths().items()]
+
+
+gauge("telegram_queue_depth", "Requests waiting in the outbound queue", ("lane",)).set_function(
+    _queue_depths
+)
+counter("telegram_coalesced_total", "Duplicate requests merged into a queued one").set_function(
+    lambda: [({}, _outbox.coalesced)] if _outbox else []
+)
+
+
+async def send_to_admins(bot: Bot, text: str, **kwargs: Any) -> int:
+    """Send a message to all admins concurrently. Returns number delivered."""
+
+    async def send(admin_id: int) -> bool:
+        try:
+            await bot.send_message(admin_id, text, **kwargs)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to notify admin {admin_id}: {e}")
+            return False
+
+    with outbound_lane(Lane.ADMIN):
+        results = await asyncio.gather(*(send(admin_id) for admin_id in settings.admin_ids))
+    return sum(results)
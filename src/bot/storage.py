@@ -0,0 +1,189 @@
+"""FSM storage selection.
+
+aiogram keeps FSM state in process memory by default, which is lost on
+restart and invisible to other bot workers. ``FSM_STORAGE`` selects:
+
+* ``sql`` - the bot database (:class:`SqlStorage`, default);
+* ``redis`` - Redis or a compatible server (requires the ``redis`` package);
+* ``memory`` - aiogram's in-process storage.
+
+Records in every backend expire after ``FSM_TTL`` seconds of inactivity.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.bot.config import settings
+from src.database import session_factory
+from src.database.models import FsmRecord
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("state", "data", "touched")
+
+    def __init__(self, state: str | None, data: dict[str, Any]) -> None:
+        self.state = state
+        self.data = data
+        self.touched = datetime.now()
+
+
+class SqlStorage(BaseStorage):
+    """FSM storage on the bot's SQLAlchemy database with write-behind.
+
+    Reads are served from an in-process cache (loaded from the database on
+    first access), writes update the cache and are flushed to the database
+    in one transaction every ``flush_interval`` seconds. Each chat is owned
+    by a single process (see ``src.bot.workers``), so the cache cannot go
+    stale. Records untouched for ``ttl`` seconds are dropped from the cache
+    and deleted from the database.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        ttl: float = 86400,
+        flush_interval: float = 0.5,
+    ) -> None:
+        self._session_maker = session_maker
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.ttl = timedelta(seconds=ttl)
+        self.flush_interval = flush_interval
+        self._cache: dict[str, _Entry] = {}
+        self._dirty: set[str] = set()
+        self._flusher: asyncio.Task[None] | None = None
+        self._last_cleanup = datetime.now()
+
+        # Counters
+        self.flushes = 0
+        self.rows_written = 0
+
+    async def _entry(self, key: StorageKey) -> _Entry:
+        db_key = self._key_builder.build(key)
+        entry = self._cache.get(db_key)
+        if entry is None:
+            async with self._session_maker() as session:
+                record = await session.get(FsmRecord, db_key)
+            if record is not None and record.expires_at > datetime.now():
+                entry = _Entry(record.state, dict(record.data or {}))
+            else:
+                entry = _Entry(None, {})
+            # Another coroutine may have loaded it meanwhile
+            entry = self._cache.setdefault(db_key, entry)
+        entry.touched = datetime.now()
+        return entry
+
+    def _mark_dirty(self, key: StorageKey) -> None:
+        self._dirty.add(self._key_builder.build(key))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = dict(data)
+        self._mark_dirty(key)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict((await self._entry(key)).data)
+
+    async def _flush_later(self) -> None:
+        # Changes made while flushing are picked up by the next round
+        while self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush FSM state: {e}")
+
+    async def flush(self) -> None:
+        """Write all pending changes in one transaction and expire old records."""
+        dirty, self._dirty = self._dirty, set()
+        now = datetime.now()
+        expires_at = now + self.ttl
+        rows = [
+            FsmRecord(key=k, state=e.state, data=e.data, expires_at=expires_at)
+            for k in dirty
+            if (e := self._cache.get(k)) is not None and (e.state is not None or e.data)
+        ]
+        cleanup = now - self._last_cleanup >= min(self.ttl, timedelta(hours=1))
+
+        try:
+            async with self._session_maker() as session, session.begin():
+                if dirty:
+                    # Cleared state is stored as no row at all
+                    await session.execute(delete(FsmRecord).where(FsmRecord.key.in_(dirty)))
+                    session.add_all(rows)
+                if cleanup:
+                    await session.execute(delete(FsmRecord).where(FsmRecord.expires_at <= now))
+        except Exception:
+            # Keep the changes for the next attempt
+            self._dirty |= dirty
+            raise
+
+        self.flushes += 1
+        self.rows_written += len(rows)
+        if cleanup:
+            self._last_cleanup = now
+            self._evict_idle(now)
+
+    def _evict_idle(self, now: datetime) -> None:
+        idle = [
+            k
+            for k, e in self._cache.items()
+            if now - e.touched >= self.ttl and k not in self._dirty
+        ]
+        for k in idle:
+            del self._cache[k]
+
+    async def close(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher
+        if self._dirty:
+            await self.flush()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Create the FSM storage backend configured in settings."""
+    if settings.fsm_storage == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis requires the 'redis' package") from e
+        return RedisStorage.from_url(
+            settings.redis_url,
+            state_ttl=settings.fsm_ttl,
+            data_ttl=settings.fsm_ttl,
+        )
+
+    if settings.fsm_storage == "sql":
+        return SqlStorage(
+            session_factory,
+            ttl=settings.fsm_ttl,
+            flush_interval=settings.fsm_flush_interval,
+        )
+
+    if settings.bot_workers > 1:
+        # Still correct thanks to chat partitioning, but lost on restart
+        logger.warning("FSM state is kept in worker memory; set FSM_STORAGE=sql to persist it")
+    return MemoryStorage()
@@ -0,0 +1,121 @@
+"""Webhook mode: receive updates from Telegram over HTTP instead of polling.
+
+Telegram POSTs each update to ``settings.webhook_url`` (proxied by Caddy to a
+local aiohttp listener). Requests are checked against the secret token sent
+in ``X-Telegram-Bot-Api-Secret-Token``, acknowledged immediately and handled
+in the background with at most ``update_concurrency`` updates in flight.
+With multiple bot workers the listener only forwards raw updates to them.
+"""
+
+import asyncio
+import logging
+import secrets
+from collections.abc import Callable
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from src.bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitedRequestHandler(SimpleRequestHandler):
+    """Webhook handler that bounds the number of updates processed at once."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int,
+        secret_token: str | None = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        async with self._semaphore:
+            await super()._background_feed_update(bot, update)
+
+
+def create_webhook_app(
+    bot: Bot,
+    dp: Dispatcher,
+    secret_token: str,
+    path: str | None = None,
+    max_concurrency: int | None = None,
+) -> web.Application:
+    """Build the aiohttp application serving the webhook endpoint."""
+    app = web.Application()
+    ConcurrencyLimitedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_concurrency=max_concurrency or settings.update_concurrency,
+        secret_token=secret_token,
+    ).register(app, path=path or settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def create_forwarding_app(
+    forward: Callable[[dict[str, Any]], None],
+    secret_token: str,
+    path: str | None = None,
+) -> web.Application:
+    """Build a webhook application that hands raw updates to ``forward``."""
+
+    async def handle(request: web.Request) -> web.Response:
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not secrets.compare_digest(token, secret_token):
+            return web.Response(body="Unauthorized", status=401)
+        forward(await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(path or settings.webhook_path, handle)
+    return app
+
+
+async def run_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    shutdown_event: asyncio.Event,
+    forward: Callable[[dict[str, Any]], None] | None = None,
+) -> None:
+    """Serve the webhook until ``shutdown_event`` is set.
+
+    If ``forward`` is given, updates are passed to it instead of ``dp``.
+    """
+    if not settings.webhook_base_url:
+        raise RuntimeError("WEBHOOK_BASE_URL is required when BOT_MODE=webhook")
+
+    # Without a configured secret use a fresh one: the webhook is re-registered on every start
+    secret_token = settings.webhook_secret or secrets.token_urlsafe(32)
+
+    if forward is None:
+        app = create_webhook_app(bot, dp, secret_token)
+    else:
+        app = create_forwarding_app(forward, secret_token)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.info(f"Webhook listener on {settings.webhook_host}:{settings.webhook_port}")
+
+    try:
+        await bot.set_webhook(
+            settings.webhook_url,
+            secret_token=secret_token,
+            max_connections=min(settings.update_concurrency, 100),
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook registered at {settings.webhook_url}")
+        await shutdown_event.wait()
+    finally:
+        # The webhook stays registered: Telegram keeps updates queued until we are back
+        await runner.cleanup()
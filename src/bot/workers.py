@@ -0,0 +1,195 @@
+"""Multi-process update handling.
+
+With ``BOT_WORKERS=N`` (N > 1) the main process only ingests updates
+(long polling or webhook) and forwards them to N worker processes. Each
+update goes to worker ``chat_id % N``, so all updates of one chat are handled
+by the same worker, and within a worker updates of one chat run strictly in
+order while different chats are handled concurrently.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+from collections.abc import Awaitable, Callable
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+
+from src.bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Worker shutdown marker
+_STOP = None
+
+
+def partition_key(update: dict[str, Any]) -> int:
+    """Chat (or user) id an update belongs to; 0 if it has none."""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        for source in (event.get("chat"), (event.get("message") or {}).get("chat")):
+            if source and "id" in source:
+                return int(source["id"])
+        sender = event.get("from") or event.get("user")
+        if sender and "id" in sender:
+            return int(sender["id"])
+    return 0
+
+
+class ChatSerialExecutor:
+    """Runs jobs concurrently across chats but in submission order per chat."""
+
+    def __init__(self, max_concurrency: int) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tails: dict[int, asyncio.Task[None]] = {}
+
+    def submit(self, key: int, job: Callable[[], Awaitable[None]]) -> asyncio.Task[None]:
+        """Schedule ``job`` after all previously submitted jobs of ``key``."""
+        task = asyncio.create_task(self._run(self._tails.get(key), job))
+        self._tails[key] = task
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return task
+
+    def _forget(self, key: int, task: asyncio.Task[None]) -> None:
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    async def _run(
+        self, previous: asyncio.Task[None] | None, job: Callable[[], Awaitable[None]]
+    ) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        async with self._semaphore:
+            await job()
+
+    @property
+    def pending(self) -> int:
+        return len(self._tails)
+
+    async def drain(self) -> None:
+        """Wait for all submitted jobs to finish."""
+        while self._tails:
+            await asyncio.gather(*self._tails.values(), return_exceptions=True)
+
+
+async def _feed_update(dp: Dispatcher, bot: Bot, update: dict[str, Any]) -> None:
+    try:
+        result = await dp.feed_raw_update(bot, update)
+        if isinstance(result, TelegramMethod):
+            await dp.silent_call_request(bot, result)
+    except Exception as e:
+        logger.error(f"Failed to handle update {update.get('update_id')}: {e}")
+
+
+async def _run_worker(index: int, workers: int, queue: Queue) -> None:
+    # Imported here: the worker process builds its own bot and dispatcher
+    from src.bot.app import create_dispatcher, setup_logging
+    from src.bot.outbox import create_outbox
+    from src.observability.server import start_metrics_server
+    from src.observability.tracing import setup_tracing
+    from src.services.xui_api import close_pools
+
+    setup_logging(f"bot.worker{index}.log")
+    setup_tracing(f"vpn4friends-bot-worker-{index}")
+
+    bot = Bot(token=settings.bot_token)
+    # Chats are partitioned, the global Telegram limit is shared by all workers
+    bot.session.middleware(create_outbox(global_rate=settings.telegram_global_rate / workers))
+    dp = create_dispatcher()
+    executor = ChatSerialExecutor(settings.update_concurrency)
+    # The status monitor polls the panels in the ingest process only; here
+    # the snapshot is refreshed on demand (see ServerStatusMonitor.get)
+    metrics_server = None
+    if settings.metrics_port:
+        # Each process has its own counters, so each is scraped separately
+        try:
+            metrics_server = await start_metrics_server(
+                settings.metrics_host, settings.metrics_port + 1 + index
+            )
+        except OSError as e:
+            logger.warning(f"Worker {index} metrics endpoint not started: {e}")
+    logger.info(f"Worker {index} started")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is _STOP:
+                break
+            update = json.loads(raw)
+            executor.submit(partition_key(update), lambda u=update: _feed_update(dp, bot, u))
+        await executor.drain()
+    finally:
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        await dp.storage.close()
+        await bot.session.close()
+        await close_pools()
+        logger.info(f"Worker {index} stopped")
+
+
+def _worker_main(index: int, workers: int, queue: Queue) -> None:
+    # Ctrl+C reaches the whole process group; workers stop via the queue instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, workers, queue))
+
+
+class WorkerPool:
+    """Worker processes fed with updates partitioned by chat id."""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: list[Queue] = [self._context.Queue() for _ in range(workers)]
+        self._processes: list[multiprocessing.process.BaseProcess] = []
+
+    def start(self) -> None:
+        for index, queue in enumerate(self._queues):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(index, self.workers, queue),
+                name=f"bot-worker-{index}",
+            )
+            process.start()
+            self._processes.append(process)
+        logger.info(f"Started {self.workers} bot workers")
+
+    def dispatch(self, update: dict[str, Any]) -> None:
+        """Forward a raw update to the worker owning its chat."""
+        worker = partition_key(update) % self.workers
+        self._queues[worker].put(json.dumps(update))
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Let workers finish queued updates, then wait for them to exit."""
+        for queue in self._queues:
+            queue.put(_STOP)
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, terminating")
+                process.terminate()
+        self._processes.clear()
+
+
+async def poll_into_pool(bot: Bot, dp: Dispatcher, pool: WorkerPool) -> None:
+    """Long-poll getUpdates and forward every update to the worker pool."""
+    offset: int | None = None
+    allowed_updates = dp.resolve_used_update_types()
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=30, allowed_updates=allowed_updates
+            )
+        except Exception as e:
+            logger.warning(f"getUpdates failed: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            pool.dispatch(update.model_dump(mode="json", by_alias=True, exclude_unset=True))
+            offset = update.update_id + 1
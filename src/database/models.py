@@ -9,6 +9,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
     String,
     func,
@@ -83,6 +84,10 @@ class VpnProfile(Base):
     profile_data: Mapped[dict] = mapped_column(JSON)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    # Set in Python for sub-second precision: rendered configs are cached by it
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
     # New fields for user customization
     label: Mapped[str | None] = mapped_column(String(100))
@@ -127,3 +132,29 @@ class ConnectionPreset(Base):
     # Relationships
     user: Mapped["User"] = relationship(back_populates="presets")
     profile: Mapped["VpnProfile"] = relationship()
+
+
+class FsmRecord(Base):
+    """Persisted aiogram FSM state and data for one chat/user."""
+
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str | None] = mapped_column(String(255))
+    data: Mapped[dict] = mapped_column(JSON, default=dict)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+
+class ProbeResult(Base):
+    """Latency from a user's device to a node, measured by the Mini App."""
+
+    __tablename__ = "probe_results"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    node: Mapped[str] = mapped_column(String(100))
+    # Coarse location reported by the device (IANA time zone, e.g. Europe/Moscow)
+    region: Mapped[str] = mapped_column(String(64), index=True)
+    # Round-trip time; NULL if the node was unreachable
+    rtt_ms: Mapped[float | None] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
@@ -1,5 +1,6 @@
 from src.database.repositories.preset_repo import PresetRepository
+from src.database.repositories.probe_repo import ProbeRepository
 from src.database.repositories.request_repo import RequestRepository
 from src.database.repositories.user_repo import UserRepository
 
-__all__ = ["UserRepository", "RequestRepository", "PresetRepository"]
+__all__ = ["UserRepository", "RequestRepository", "PresetRepository", "ProbeRepository"]
@@ -2,10 +2,15 @@
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from src.database.models import ConnectionPreset, User, VpnProfile
+from src.observability.sql import track_queries
+from src.observability.tracing import traced
 
 
+@traced
+@track_queries
 class PresetRepository:
     """Repository for ConnectionPreset model operations."""
 
@@ -36,16 +41,21 @@ class PresetRepository:
         return preset
 
     async def get_by_id(self, preset_id: int) -> ConnectionPreset | None:
-        """Get a preset by its ID."""
+        """Get a preset by its ID with profile loaded."""
         result = await self.session.execute(
-            select(ConnectionPreset).where(ConnectionPreset.id == preset_id)
+            select(ConnectionPreset)
+            .options(joinedload(ConnectionPreset.profile))
+            .where(ConnectionPreset.id == preset_id)
         )
         return result.scalar_one_or_none()
 
     async def get_by_user(self, user: User) -> list[ConnectionPreset]:
-        """Get all presets for a user."""
+        """Get all presets for a user with profiles loaded in the same query."""
         result = await self.session.execute(
-            select(ConnectionPreset).where(ConnectionPreset.user_id == user.id)
+            select(ConnectionPreset)
+            .options(joinedload(ConnectionPreset.profile))
+            .where(ConnectionPreset.user_id == user.id)
+            .order_by(ConnectionPreset.id)
         )
         return list(result.scalars().all())
 
@@ -0,0 +1,64 @@
+"""Probe result repository for database operations."""
+
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import ProbeResult, User
+from src.observability.sql import track_queries
+from src.observability.tracing import traced
+
+
+@traced
+@track_queries
+class ProbeRepository:
+    """Repository for ProbeResult model operations."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def add_results(
+        self, user: User, region: str, results: dict[str, float | None], older_than: datetime
+    ) -> None:
+        """Store one probe run (node -> RTT) and drop the user's results before ``older_than``."""
+        await self.session.execute(
+            delete(ProbeResult).where(
+                ProbeResult.user_id == user.id, ProbeResult.created_at < older_than
+            )
+        )
+        self.session.add_all(
+            ProbeResult(user_id=user.id, node=node, region=region, rtt_ms=rtt_ms)
+            for node, rtt_ms in results.items()
+        )
+        await self.session.commit()
+
+    async def get_user_results(self, user: User, since: datetime) -> list[tuple[str, float | None]]:
+        """(node, RTT) of the user's results since ``since``."""
+        result = await self.session.execute(
+            select(ProbeResult.node, ProbeResult.rtt_ms).where(
+                ProbeResult.user_id == user.id, ProbeResult.created_at >= since
+            )
+        )
+        return [(node, rtt_ms) for node, rtt_ms in result.all()]
+
+    async def get_last_region(self, user: User) -> str | None:
+        """Region of the user's latest result, if any."""
+        result = await self.session.execute(
+            select(ProbeResult.region)
+            .where(ProbeResult.user_id == user.id)
+            .order_by(ProbeResult.created_at.desc(), ProbeResult.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_region_results(
+        self, region: str, since: datetime
+    ) -> list[tuple[int, str, float | None]]:
+        """(user id, node, RTT) of all results from ``region`` since ``since``."""
+        result = await self.session.execute(
+            select(ProbeResult.user_id, ProbeResult.node, ProbeResult.rtt_ms).where(
+                ProbeResult.region == region, ProbeResult.created_at >= since
+            )
+        )
+        return [(user_id, node, rtt_ms) for user_id, node, rtt_ms in result.all()]
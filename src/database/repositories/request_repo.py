@@ -1,14 +1,29 @@
 """VPN Request repository for database operations."""
 
 from datetime import datetime
+from typing import TYPE_CHECKING
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from src.database.models import RequestStatus, User, VPNRequest
+from src.observability.sql import track_queries
+from src.observability.tracing import traced
 
+if TYPE_CHECKING:
+    from src.services.single_flight import SingleFlight
 
+
+def _counts() -> "SingleFlight":
+    """Single-flight group for aggregate queries (src.services imports this module)."""
+    from src.services.single_flight import get_single_flight
+
+    return get_single_flight("db")
+
+
+@traced
+@track_queries
 class RequestRepository:
     """Repository for VPNRequest model operations."""
 
@@ -66,6 +81,22 @@ class RequestRepository:
         )
         return list(result.scalars().all())
 
+    async def count_pending(self) -> int:
+        """Count pending requests."""
+        bind = self.session.bind
+
+        async def count() -> int:
+            # On its own session, as in UserRepository._shared_count
+            async with AsyncSession(bind) as session:
+                result = await session.execute(
+                    select(func.count(VPNRequest.id)).where(
+                        VPNRequest.status == RequestStatus.PENDING
+                    )
+                )
+                return result.scalar_one()
+
+        return await _counts().do(("requests:pending", str(bind.url)), count)
+
     async def has_pending(self, user: User) -> bool:
         """Check if user has pending request."""
         return await self.get_pending_by_user(user) is not None
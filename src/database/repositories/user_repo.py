@@ -1,12 +1,28 @@
 """User repository for database operations."""
 
-from sqlalchemy import select, update
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from src.database.models import User, VpnProfile
+from src.observability.sql import track_queries
+from src.observability.tracing import traced
+
+if TYPE_CHECKING:
+    from src.services.single_flight import SingleFlight
+
 
+def _counts() -> "SingleFlight":
+    """Single-flight group for aggregate queries (src.services imports this module)."""
+    from src.services.single_flight import get_single_flight
 
+    return get_single_flight("db")
+
+
+@traced
+@track_queries
 class UserRepository:
     """Repository for User model operations."""
 
@@ -64,7 +80,8 @@ class UserRepository:
                 user.username = username
                 changed = True
             if changed:
-                await self.update(user)
+                # Objects stay loaded after commit, no need to refresh (and reload profiles)
+                await self.session.commit()
             return user, False
 
         user = await self.create(telegram_id, full_name, username, is_admin)
@@ -77,6 +94,50 @@ class UserRepository:
         )
         return list(result.scalars().all())
 
+    async def count_all(self) -> int:
+        """Count all users."""
+        return await self._shared_count("users:all", select(func.count(User.id)))
+
+    async def count_with_vpn(self) -> int:
+        """Count users with an active VPN profile."""
+        query = select(func.count(User.id)).where(User.profiles.any(VpnProfile.is_active))
+        return await self._shared_count("users:with_vpn", query)
+
+    async def _shared_count(self, key: str, query) -> int:
+        # The merged query runs on its own session: callers joining it don't
+        # own this one, which may be rolled back or closed while they wait
+        bind = self.session.bind
+
+        async def count() -> int:
+            async with AsyncSession(bind) as session:
+                return (await session.execute(query)).scalar_one()
+
+        return await _counts().do((key, str(bind.url)), count)
+
+    async def count_active_by_node(self) -> dict[str | None, int]:
+        """Count active profiles per node (``None`` for profiles that don't record one)."""
+        node = VpnProfile.profile_data["node"].as_string()
+        result = await self.session.execute(
+            select(node, func.count(VpnProfile.id)).where(VpnProfile.is_active).group_by(node)
+        )
+        return dict(result.all())
+
+    async def get_active_profiles(self) -> list[VpnProfile]:
+        """Get all active profiles, newest first."""
+        result = await self.session.execute(
+            select(VpnProfile).where(VpnProfile.is_active).order_by(VpnProfile.id.desc())
+        )
+        return list(result.scalars().all())
+
+    async def get_profile(self, profile_id: int) -> VpnProfile | None:
+        """Get a profile by ID with its user."""
+        result = await self.session.execute(
+            select(VpnProfile)
+            .where(VpnProfile.id == profile_id)
+            .options(joinedload(VpnProfile.user))
+        )
+        return result.scalar_one_or_none()
+
     async def get_all(self) -> list[User]:
         """Get all users."""
         result = await self.session.execute(select(User))
@@ -1,15 +1,18 @@
 """Admin handlers for VPN bot."""
 
 import logging
+from datetime import datetime
 
 from aiogram import Bot, F, Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import BufferedInputFile, CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.config import settings
 from src.bot.middlewares.admin import AdminFilter
+from src.bot.middlewares.throttling import throttling
+from src.bot.outbox import Lane, get_outbox, outbound_lane
 from src.database.repositories import RequestRepository, UserRepository
 from src.keyboards.admin_kb import (
     get_admin_main_kb,
@@ -19,8 +22,12 @@ from src.keyboards.admin_kb import (
     get_user_manage_kb,
 )
 from src.keyboards.callbacks import RequestAction, UserAction
+from src.observability.profiler import MAX_DURATION, ProfilerBusyError, profile
+from src.services.circuit_breaker import all_breakers
+from src.services.single_flight import all_single_flights
+from src.services.status_monitor import status_monitor
 from src.services.vpn_service import VPNService
-from src.utils.formatters import format_traffic
+from src.utils.formatters import format_speed, format_traffic
 
 logger = logging.getLogger(__name__)
 router = Router(name="admin")
@@ -92,29 +99,64 @@ async def cmd_notify_update(message: Message, session: AsyncSession, bot: Bot) -
     success = 0
     failed = 0
 
-    for user in users:
-        try:
-            await bot.send_message(
-                user.telegram_id,
-                "⚠️ <b>Важное обновление!</b>\n\n"
-                "Конфигурация VPN была обновлена.\n"
-                "Твоя старая ссылка больше не работает.\n\n"
-                "👉 Нажми /link или кнопку «Моя ссылка» в меню, "
-                "чтобы получить новую ссылку.\n\n"
-                "После получения — удали старый профиль "
-                "в приложении и добавь новый.",
-                parse_mode="HTML",
-            )
-            success += 1
-        except Exception as e:
-            logger.warning(f"Failed to notify {user.telegram_id}: {e}")
-            failed += 1
+    with outbound_lane(Lane.BULK):
+        for user in users:
+            try:
+                await bot.send_message(
+                    user.telegram_id,
+                    "⚠️ <b>Важное обновление!</b>\n\n"
+                    "Конфигурация VPN была обновлена.\n"
+                    "Твоя старая ссылка больше не работает.\n\n"
+                    "👉 Нажми /link или кнопку «Моя ссылка» в меню, "
+                    "чтобы получить новую ссылку.\n\n"
+                    "После получения — удали старый профиль "
+                    "в приложении и добавь новый.",
+                    parse_mode="HTML",
+                )
+                success += 1
+            except Exception as e:
+                logger.warning(f"Failed to notify {user.telegram_id}: {e}")
+                failed += 1
 
     await message.answer(
         f"✅ Уведомления отправлены!\n\n📨 Успешно: {success}\n❌ Не доставлено: {failed}"
     )
 
 
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject) -> None:
+    """Sample the bot process for N seconds and send collapsed stacks."""
+    try:
+        seconds = float(command.args) if command.args else 30.0
+    except ValueError:
+        await message.answer("Использование: /profile [секунд]")
+        return
+    if not 0 < seconds <= MAX_DURATION:
+        await message.answer(f"⚠️ Длительность — от 1 до {MAX_DURATION:.0f} секунд.")
+        return
+
+    await message.answer(f"⏱ Профилирую {seconds:.0f} с...")
+    try:
+        stacks, samples = await profile(seconds)
+    except ProfilerBusyError:
+        await message.answer("⚠️ Профилирование уже идёт, дождись результата.")
+        return
+
+    filename = f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded"
+    await message.answer_document(
+        BufferedInputFile(stacks.encode(), filename=filename),
+        caption=(
+            f"🔥 {samples} замеров за {seconds:.0f} с.\n"
+            "Открой в speedscope.app или flamegraph.pl."
+            + (
+                "\nПрофиль снят в процессе, обработавшем команду."
+                if settings.bot_workers > 1
+                else ""
+            )
+        ),
+    )
+
+
 @router.callback_query(F.data == "admin_menu")
 async def admin_menu(callback: CallbackQuery) -> None:
     """Show admin menu."""
@@ -152,23 +194,24 @@ async def admin_notify_update_btn(callback: CallbackQuery, session: AsyncSession
     success = 0
     failed = 0
 
-    for user in users:
-        try:
-            await bot.send_message(
-                user.telegram_id,
-                "⚠️ <b>Важное обновление!</b>\n\n"
-                "Конфигурация VPN была обновлена.\n"
-                "Твоя старая ссылка больше не работает.\n\n"
-                "👉 Нажми /link или кнопку «Моя ссылка» в меню, "
-                "чтобы получить новую ссылку.\n\n"
-                "После получения — удали старый профиль "
-                "в приложении и добавь новый.",
-                parse_mode="HTML",
-            )
-            success += 1
-        except Exception as e:
-            logger.warning(f"Failed to notify {user.telegram_id}: {e}")
-            failed += 1
+    with outbound_lane(Lane.BULK):
+        for user in users:
+            try:
+                await bot.send_message(
+                    user.telegram_id,
+                    "⚠️ <b>Важное обновление!</b>\n\n"
+                    "Конфигурация VPN была обновлена.\n"
+                    "Твоя старая ссылка больше не работает.\n\n"
+                    "👉 Нажми /link или кнопку «Моя ссылка» в меню, "
+                    "чтобы получить новую ссылку.\n\n"
+                    "После получения — удали старый профиль "
+                    "в приложении и добавь новый.",
+                    parse_mode="HTML",
+                )
+                success += 1
+            except Exception as e:
+                logger.warning(f"Failed to notify {user.telegram_id}: {e}")
+                failed += 1
 
     await callback.message.edit_text(
         f"✅ Уведомления отправлены!\n\n📨 Успешно: {success}\n❌ Не доставлено: {failed}",
@@ -450,16 +493,40 @@ async def admin_stats(callback: CallbackQuery, session: AsyncSession) -> None:
     await callback.answer()
 
     user_repo = UserRepository(session)
-    all_users = await user_repo.get_all()
-    users_with_vpn = await user_repo.get_all_with_vpn()
+    users_total = await user_repo.count_all()
+    users_with_vpn = await user_repo.count_with_vpn()
 
     request_repo = RequestRepository(session)
-    pending = await request_repo.get_all_pending()
+    pending = await request_repo.count_pending()
+
+    throughput = status_monitor.throughput
+    breakers = "".join(
+        f"\n🔌 {b.name}: {b.state.value} (отказов: {b.total_failures})" for b in all_breakers()
+    )
+    spam = throttling.stats()
+    merged = "".join(
+        f"\n🔀 {g.name}: объединено {g.merged} из {g.calls} запросов" for g in all_single_flights()
+    )
+    outbox = get_outbox()
+    queues = ""
+    if outbox is not None:
+        queues = "\n\n📤 Очереди отправки:" + "".join(
+            f"\n• {lane}: {s['depth']} в очереди, ожидание {s['avg_wait']:.2f} с"
+            for lane, s in outbox.lane_stats().items()
+        )
 
     await callback.message.edit_text(
         f"📊 Статистика бота:\n\n"
-        f"👥 Всего пользователей: {len(all_users)}\n"
-        f"🔑 С VPN: {len(users_with_vpn)}\n"
-        f"⏳ Заявок на рассмотрении: {len(pending)}",
+        f"👥 Всего пользователей: {users_total}\n"
+        f"🔑 С VPN: {users_with_vpn}\n"
+        f"⏳ Заявок на рассмотрении: {pending}\n\n"
+        f"⚡ Пропускная способность:\n"
+        f"• сейчас: {format_speed(throughput.current)}\n"
+        f"• пик: {format_speed(throughput.peak)}\n"
+        f"• p95: {format_speed(throughput.p95)}"
+        f"{breakers}\n\n"
+        f"🛡 Повторные нажатия: объединено {spam['coalesced']}, отброшено {spam['dropped']}"
+        f"{merged}"
+        f"{queues}",
         reply_markup=get_back_to_admin_kb(),
     )
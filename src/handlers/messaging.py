@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.config import settings
 from src.bot.middlewares.admin import AdminFilter
+from src.bot.outbox import Lane, outbound_lane, send_to_admins
 from src.database.repositories import UserRepository
 from src.keyboards.messaging_kb import (
     get_broadcast_target_kb,
@@ -76,19 +77,15 @@ async def process_feedback(
         return
 
     # Send to all admins
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                admin_id,
-                f"📩 Сообщение от пользователя:\n\n"
-                f"👤 {user.display_name}\n"
-                f"🆔 <code>{user.telegram_id}</code>\n\n"
-                f"💬 {message.text}",
-                parse_mode="HTML",
-                reply_markup=get_contact_admin_kb(user.telegram_id),
-            )
-        except Exception as e:
-            logger.warning(f"Failed to send feedback to admin {admin_id}: {e}")
+    await send_to_admins(
+        bot,
+        f"📩 Сообщение от пользователя:\n\n"
+        f"👤 {user.display_name}\n"
+        f"🆔 <code>{user.telegram_id}</code>\n\n"
+        f"💬 {message.text}",
+        parse_mode="HTML",
+        reply_markup=get_contact_admin_kb(user.telegram_id),
+    )
 
     await message.answer("✅ Сообщение отправлено!\n\nДаня ответит тебе в этом чате.")
 
@@ -173,19 +170,20 @@ async def process_broadcast(
     success = 0
     failed = 0
 
-    for user in users:
-        if user.telegram_id in settings.admin_ids:
-            continue  # Skip admins
-
-        try:
-            await bot.send_message(
-                user.telegram_id,
-                f"📢 Объявление от Дани:\n\n{message.text}",
-            )
-            success += 1
-        except Exception as e:
-            logger.warning(f"Failed to send broadcast to {user.telegram_id}: {e}")
-            failed += 1
+    with outbound_lane(Lane.BULK):
+        for user in users:
+            if user.telegram_id in settings.admin_ids:
+                continue  # Skip admins
+
+            try:
+                await bot.send_message(
+                    user.telegram_id,
+                    f"📢 Объявление от Дани:\n\n{message.text}",
+                )
+                success += 1
+            except Exception as e:
+                logger.warning(f"Failed to send broadcast to {user.telegram_id}: {e}")
+                failed += 1
 
     await message.answer(
         f"✅ Рассылка завершена!\n\n📨 Отправлено: {success}\n❌ Не доставлено: {failed}"
@@ -9,6 +9,7 @@ from aiogram.types import BufferedInputFile, CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.bot.config import settings
+from src.bot.outbox import send_to_admins
 from src.database.repositories import RequestRepository, UserRepository
 from src.keyboards.admin_kb import get_request_action_kb
 from src.keyboards.messaging_kb import get_cancel_kb
@@ -19,9 +20,9 @@ from src.keyboards.user_kb import (
     get_stats_kb,
     get_user_main_kb,
 )
+from src.services.status_monitor import status_monitor
 from src.services.vpn_service import VPNService
-from src.services.xui_api import XUIApi
-from src.utils.formatters import format_traffic, get_dns_instructions
+from src.utils.formatters import format_speed, format_traffic, get_dns_instructions
 from src.utils.qr_generator import generate_qr_code
 
 logger = logging.getLogger(__name__)
@@ -106,33 +107,10 @@ async def cmd_help(message: Message) -> None:
 
 @router.message(Command("status"))
 async def cmd_status(message: Message) -> None:
-    """Handle /status command - show server status banner."""
-    await message.answer("⏳ Проверяю статус сервера...")
+    """Handle /status command - show server status banner from the cached snapshot."""
+    status = await status_monitor.get()
 
-    try:
-        async with XUIApi() as api:
-            status = await api.get_server_status()
-            online_clients = await api.get_online_clients()
-
-        online_count = len(online_clients) if online_clients else 0
-        total_traffic = format_traffic(status["upload"] + status["download"])
-
-        # Build status banner
-        banner = (
-            "🌐 <b>VPN4Friends</b>\n"
-            "━━━━━━━━━━━━━━━━━━━━\n"
-            f"📶 Сервер: ✅ Онлайн\n"
-            f"⚡ Скорость: ~85 Мбит/с\n"
-            f"👥 Клиентов: {status['clients']}\n"
-            f"🟢 Онлайн сейчас: {online_count}\n"
-            f"📊 Трафик: {total_traffic}\n"
-            "━━━━━━━━━━━━━━━━━━━━"
-        )
-
-        await message.answer(banner, parse_mode="HTML")
-
-    except Exception as e:
-        logger.error(f"Failed to get server status: {e}")
+    if not status.online:
         banner = (
             "🌐 <b>VPN4Friends</b>\n"
             "━━━━━━━━━━━━━━━━━━━━\n"
@@ -141,6 +119,25 @@ async def cmd_status(message: Message) -> None:
             "Попробуй позже или напиши /support"
         )
         await message.answer(banner, parse_mode="HTML")
+        return
+
+    total_traffic = format_traffic(status.total_traffic)
+    speed = format_speed(status_monitor.throughput.current)
+
+    # Build status banner
+    banner = (
+        "🌐 <b>VPN4Friends</b>\n"
+        "━━━━━━━━━━━━━━━━━━━━\n"
+        f"📶 Сервер: ✅ Онлайн\n"
+        f"⚡ Скорость: {speed}\n"
+        f"👥 Клиентов: {status.clients}\n"
+        f"🟢 Онлайн сейчас: {status.online_clients}\n"
+        f"📊 Трафик: {total_traffic}\n"
+        "━━━━━━━━━━━━━━━━━━━━\n"
+        f"🕐 Обновлено: {status.refreshed_at.strftime('%H:%M:%S')}"
+    )
+
+    await message.answer(banner, parse_mode="HTML")
 
 
 @router.message(Command("link"))
@@ -257,16 +254,12 @@ async def request_vpn(callback: CallbackQuery, session: AsyncSession, bot: Bot)
     )
 
     # Notify admins
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                admin_id,
-                f"🔔 Новая заявка на VPN!\n\n👤 {user.display_name}\n🆔 <code>{user.telegram_id}</code>",
-                reply_markup=get_request_action_kb(request),
-                parse_mode="HTML",
-            )
-        except Exception as e:
-            logger.warning(f"Failed to notify admin {admin_id}: {e}")
+    await send_to_admins(
+        bot,
+        f"🔔 Новая заявка на VPN!\n\n👤 {user.display_name}\n🆔 <code>{user.telegram_id}</code>",
+        reply_markup=get_request_action_kb(request),
+        parse_mode="HTML",
+    )
 
 
 @router.callback_query(F.data == "pending_info")
@@ -0,0 +1,3 @@
+from src.observability.metrics import REGISTRY, Counter, Gauge, Histogram, render
+
+__all__ = ["REGISTRY", "Counter", "Gauge", "Histogram", "render"]
@@ -0,0 +1,100 @@
+"""Structured, non-blocking logging.
+
+Records are put on a queue by :class:`ContextQueueHandler` and written by a
+:class:`~logging.handlers.QueueListener` thread, so file and console I/O
+never runs on the event loop. Context of the emitting code (update id, user
+id, handler, time since the update started) is captured when the record is
+queued, because context variables are not visible in the listener thread.
+:class:`JsonFormatter` renders one JSON object per line.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from src.observability.timing import current_timing
+
+_context: ContextVar[dict[str, Any] | None] = ContextVar("log_context", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Add ``fields`` to all records logged in the ``with`` block."""
+    token = _context.set({**(_context.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def context_fields() -> dict[str, Any]:
+    """Fields describing the current context, for log records."""
+    fields = dict(_context.get() or {})
+    timing = current_timing()
+    if timing is not None:
+        if timing.handler:
+            fields["handler"] = timing.handler
+        fields["duration_ms"] = round(timing.elapsed * 1000, 1)
+    return fields
+
+
+class ContextQueueHandler(QueueHandler):
+    """Queue handler that attaches context fields and pre-renders the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Arguments and tracebacks may not survive the trip to another thread
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in context_fields().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with context and ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_queue_logging(*handlers: logging.Handler, level: int = logging.INFO) -> QueueListener:
+    """Route root logging through a queue to ``handlers`` written by a listener thread."""
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(ContextQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
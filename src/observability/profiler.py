@@ -0,0 +1,96 @@
+"""On-demand in-process sampling profiler.
+
+:func:`profile` starts a daemon thread that snapshots the stacks of all
+other threads (``sys._current_frames``) at a fixed interval for the given
+duration, then returns them in the collapsed-stack format understood by
+``flamegraph.pl``, speedscope and similar tools: one ``frame;frame;... count``
+line per distinct stack. Nothing runs while no profile is being taken.
+"""
+
+import asyncio
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+
+# Upper bound for a single profile, so a typo can't leave it running for hours
+MAX_DURATION = 300.0
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+    pass
+
+
+def _frame_label(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    code = frame.f_code
+    # ';' separates frames in the collapsed format
+    return f"{module}:{code.co_name}:{code.co_firstlineno}".replace(";", ":")
+
+
+class SamplingProfiler:
+    """Collects stack samples of all threads but its own."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                current: FrameType | None = frame
+                while current is not None:
+                    stack.append(_frame_label(current))
+                    current = current.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, most frequent stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_lock = threading.Lock()
+
+
+async def profile(seconds: float, interval: float = 0.005) -> tuple[str, int]:
+    """Sample this process for ``seconds``; returns (collapsed stacks, samples taken).
+
+    The event loop keeps running meanwhile, so the profile shows what the
+    process actually does under its current load. Only one profile can run
+    at a time per process (:class:`ProfilerBusyError`).
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being taken")
+    try:
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        try:
+            await asyncio.sleep(min(seconds, MAX_DURATION))
+        finally:
+            await asyncio.to_thread(profiler.stop)
+        return profiler.collapsed(), profiler.samples
+    finally:
+        _lock.release()
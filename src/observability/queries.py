@@ -0,0 +1,121 @@
+"""SQL query recorder for tests and benchmarks.
+
+:class:`QueryRecorder` captures every statement executed on an engine while
+it is active, so a test can assert how many queries a handler or service
+call issues and catch N+1 patterns: the same statement text executed again
+and again with different parameters (per-row lazy loads).
+"""
+
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.observability.sql import current_db_method
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when recorded queries exceed the allowed count or repeat."""
+
+    pass
+
+
+@dataclass
+class RecordedQuery:
+    """One executed SQL statement."""
+
+    statement: str
+    parameters: Any
+    method: str
+    duration: float = 0.0
+
+
+class QueryRecorder:
+    """Records SQL statements executed on ``engine`` (on all engines if omitted).
+
+    Use as a (sync) context manager around the code under test, or call
+    :meth:`start` / :meth:`stop`. Works with async engines too.
+    """
+
+    def __init__(self, engine: Engine | AsyncEngine | None = None) -> None:
+        if isinstance(engine, AsyncEngine):
+            engine = engine.sync_engine
+        self._target: Any = engine if engine is not None else Engine
+        self.queries: list[RecordedQuery] = []
+        # cursor id -> (start time, query), matched again in after_cursor_execute
+        self._running: dict[int, tuple[float, RecordedQuery]] = {}
+        self._active = False
+
+    def _before(self, **kw: Any) -> None:
+        query = RecordedQuery(kw["statement"], kw["parameters"], current_db_method())
+        self.queries.append(query)
+        self._running[id(kw["cursor"])] = (time.perf_counter(), query)
+
+    def _after(self, **kw: Any) -> None:
+        running = self._running.pop(id(kw["cursor"]), None)
+        if running is not None:
+            started, query = running
+            query.duration = time.perf_counter() - started
+
+    def start(self) -> None:
+        if not self._active:
+            event.listen(self._target, "before_cursor_execute", self._before, named=True)
+            event.listen(self._target, "after_cursor_execute", self._after, named=True)
+            self._active = True
+
+    def stop(self) -> None:
+        if self._active:
+            event.remove(self._target, "before_cursor_execute", self._before)
+            event.remove(self._target, "after_cursor_execute", self._after)
+            self._active = False
+
+    def __enter__(self) -> "QueryRecorder":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def reset(self) -> None:
+        """Forget recorded queries (e.g. after test data setup)."""
+        self.queries.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def duration(self) -> float:
+        return sum(q.duration for q in self.queries)
+
+    def repeated(self, threshold: int = 2) -> dict[str, int]:
+        """Statements executed at least ``threshold`` times, with their counts."""
+        counts = Counter(_WHITESPACE.sub(" ", q.statement).strip() for q in self.queries)
+        return {statement: n for statement, n in counts.items() if n >= threshold}
+
+    def report(self) -> str:
+        """Numbered list of the recorded statements, for assertion messages."""
+        lines = [f"{self.count} queries ({self.duration * 1000:.1f} ms):"]
+        for i, q in enumerate(self.queries, 1):
+            statement = _WHITESPACE.sub(" ", q.statement).strip()
+            lines.append(f"  {i}. [{q.method}] {statement}")
+        return "\n".join(lines)
+
+    def check(self, max_queries: int | None = None, allow_repeated: bool = False) -> None:
+        """Raise :class:`QueryBudgetExceeded` if over budget or statements repeat."""
+        if max_queries is not None and self.count > max_queries:
+            raise QueryBudgetExceeded(
+                f"Expected at most {max_queries} queries, got {self.count}\n{self.report()}"
+            )
+        if not allow_repeated and (repeated := self.repeated()):
+            details = "\n".join(f"  {n}x {statement}" for statement, n in repeated.items())
+            raise QueryBudgetExceeded(
+                f"Repeated statements (possible N+1):\n{details}\n{self.report()}"
+            )
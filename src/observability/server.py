@@ -0,0 +1,24 @@
+"""HTTP endpoint exposing metrics of the bot process."""
+
+import logging
+
+from aiohttp import web
+
+from src.observability.metrics import CONTENT_TYPE, render
+
+logger = logging.getLogger(__name__)
+
+
+async def _metrics(_: web.Request) -> web.Response:
+    return web.Response(body=render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Serve ``GET /metrics`` on ``host:port``; call ``cleanup()`` on the result to stop."""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics available on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,113 @@
+"""SQL query metrics, attributed to the repository method that issued them.
+
+Cursor execution events of every SQLAlchemy engine are timed. Repository
+classes decorated with :func:`track_queries` set the current method name in a
+context variable, which SQLAlchemy's (sync) events still see because the
+async engine runs them in the caller's context.
+"""
+
+import functools
+import inspect
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.observability.metrics import counter, histogram
+from src.observability.timing import record
+from src.observability.tracing import SpanKind, end_span, start_span
+
+C = TypeVar("C", bound=type)
+
+DB_QUERIES = counter(
+    "db_queries_total", "SQL statements by repository method and result", ("method", "result")
+)
+DB_QUERY_DURATION = histogram(
+    "db_query_duration_seconds", "SQL statement latency by repository method", ("method",)
+)
+
+# Queries issued outside repository methods (commits, FSM storage...)
+_UNSCOPED = "unscoped"
+
+_current_method: ContextVar[str] = ContextVar("db_method", default=_UNSCOPED)
+
+
+def current_db_method() -> str:
+    """Repository method running in the current context."""
+    return _current_method.get()
+
+
+def _scoped(name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _current_method.set(name)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _current_method.reset(token)
+
+    return wrapper
+
+
+def track_queries(cls: C) -> C:
+    """Class decorator: label queries of public async methods with ``Class.method``."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, _scoped(f"{cls.__name__}.{attr}", value))
+    return cls
+
+
+# Start time and span live on the statement's execution context rather than
+# the connection: a cancelled query never reaches after_cursor_execute, and
+# state kept on the connection would then be paired with later statements.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    if context is None:
+        return
+    context._query_start = time.perf_counter()
+    context._query_span = start_span(
+        "db.query",
+        SpanKind.CLIENT,
+        **{
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:1000],
+            "code.function": _current_method.get(),
+        },
+    )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    _record(context, "ok")
+
+
+@event.listens_for(Engine, "handle_error")
+def _on_error(context: Any) -> None:
+    # Errors raised before a statement reached the cursor have no execution
+    # context (or one that was never started) and are not counted
+    _record(context.execution_context, "error")
+
+
+def _record(context: Any, result: str) -> None:
+    started = getattr(context, "_query_start", None)
+    if started is None:
+        return
+    context._query_start = None
+    method = _current_method.get()
+    elapsed = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(elapsed, method=method)
+    DB_QUERIES.inc(method=method, result=result)
+    record("db", elapsed)
+
+    span = context._query_span
+    if span is not None:
+        if result == "error":
+            span.error = "query failed"
+        end_span(span)
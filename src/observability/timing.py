@@ -0,0 +1,67 @@
+"""Per-update time accounting.
+
+While an update is handled, :func:`measure_update` keeps an
+:class:`UpdateTiming` in a context variable. Database, panel and Bot API
+clients report the time they spent with :func:`record`; tasks started by a
+handler inherit the context, so their calls are attributed to the update too
+(concurrent calls may add up to more than the wall time).
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class UpdateTiming:
+    """Wall time of one update and time spent per component."""
+
+    __slots__ = ("started", "spent", "calls", "handler")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spent: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.handler: str | None = None
+
+    def add(self, component: str, seconds: float) -> None:
+        self.spent[component] = self.spent.get(component, 0.0) + seconds
+        self.calls[component] = self.calls.get(component, 0) + 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> dict[str, float]:
+        """Seconds per component plus ``other`` for the unaccounted rest."""
+        elapsed = self.elapsed
+        result = dict(self.spent)
+        result["other"] = max(0.0, elapsed - sum(self.spent.values()))
+        result["total"] = elapsed
+        return result
+
+
+_current: ContextVar[UpdateTiming | None] = ContextVar("update_timing", default=None)
+
+
+def current_timing() -> UpdateTiming | None:
+    """Timing of the update handled in the current context, if any."""
+    return _current.get()
+
+
+def record(component: str, seconds: float) -> None:
+    """Attribute ``seconds`` to ``component`` of the current update."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(component, seconds)
+
+
+@contextmanager
+def measure_update() -> Iterator[UpdateTiming]:
+    """Collect component timings for the ``with`` block."""
+    timing = UpdateTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
@@ -0,0 +1,350 @@
+"""Lightweight tracing with OpenTelemetry-compatible export.
+
+Spans form a tree through a context variable: a span opened while another is
+current becomes its child, across ``await`` and into tasks started from it.
+Finished spans are batched by a background thread and exported as OTLP/JSON
+(the OpenTelemetry wire format), either appended to a local file (one export
+request per line, readable by the collector's ``otlpjsonfile`` receiver) or
+POSTed to a collector's ``/v1/traces`` endpoint. Incoming W3C
+``traceparent`` headers are honoured, so API spans join the caller's trace.
+
+Tracing is off unless :func:`setup_tracing` configures an exporter; then
+:func:`span` costs a context variable lookup.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from pathlib import Path
+from typing import Any, TypeVar
+
+from src.bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+C = TypeVar("C", bound=type)
+
+
+class SpanKind(Enum):
+    """OTLP span kinds."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: SpanKind = SpanKind.INTERNAL,
+        trace_id: str | None = None,
+        parent_id: str | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+        self.attributes["exception.type"] = type(exc).__name__
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context header value for outgoing calls."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is off."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    data: dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind.value,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        # 2 = error, 0 = unset
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+
+def encode_otlp(spans: list[Span], service_name: str) -> dict[str, Any]:
+    """OTLP/JSON ``ExportTraceServiceRequest`` for ``spans``."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "vpn4friends"}, "spans": [_otlp_span(s) for s in spans]}
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """Batches finished spans and exports them from a background thread."""
+
+    def __init__(
+        self, service_name: str, batch_size: int = 256, flush_interval: float = 2.0
+    ) -> None:
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.SimpleQueue[Span | None] = queue.SimpleQueue()
+
+        # Counters
+        self.exported = 0
+        self.failed = 0
+
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        batch: list[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: list[Span]) -> None:
+        if not batch:
+            return
+        try:
+            self.export(encode_otlp(batch, self.service_name))
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def export(self, request: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Export queued spans and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends OTLP/JSON export requests to a file, one per line."""
+
+    def __init__(self, path: str | Path, service_name: str, **kwargs: Any) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(service_name, **kwargs)
+
+    def export(self, request: dict[str, Any]) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """POSTs OTLP/JSON to a collector (e.g. ``http://127.0.0.1:4318/v1/traces``)."""
+
+    def __init__(self, endpoint: str, service_name: str, **kwargs: Any) -> None:
+        self.endpoint = endpoint
+        super().__init__(service_name, **kwargs)
+
+    def export(self, request: dict[str, Any]) -> None:
+        body = json.dumps(request).encode()
+        http_request = urllib.request.Request(
+            self.endpoint, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(http_request, timeout=10):
+            pass
+
+
+_exporter: SpanExporter | None = None
+
+
+def configure_tracing(exporter: SpanExporter | None) -> None:
+    """Install ``exporter`` (``None`` turns tracing off), shutting down the previous one."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None:
+        previous.shutdown()
+
+
+def setup_tracing(service_name: str) -> None:
+    """Configure tracing from settings (``TRACING_EXPORTER``) for this process."""
+    if settings.tracing_exporter == "file":
+        exporter: SpanExporter = FileSpanExporter(settings.tracing_file, service_name)
+    elif settings.tracing_exporter == "otlp":
+        exporter = OtlpHttpSpanExporter(settings.tracing_otlp_endpoint, service_name)
+    else:
+        return
+    configure_tracing(exporter)
+    atexit.register(configure_tracing, None)
+    logger.info(f"Tracing enabled ({settings.tracing_exporter}) for {service_name}")
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str] | None:
+    """(trace id, parent span id) from a W3C ``traceparent`` header, if valid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def start_span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    parent: tuple[str, str] | None = None,
+    **attributes: Any,
+) -> Span | None:
+    """Start a span under the current one (or ``parent``) without making it current.
+
+    For callbacks that can't wrap the operation in :func:`span`; finish with
+    :func:`end_span`.
+    """
+    if _exporter is None:
+        return None
+    if parent is None and (current := _current_span.get()) is not None:
+        parent = (current.trace_id, current.span_id)
+    trace_id, parent_id = parent if parent else (None, None)
+    return Span(name, kind, trace_id, parent_id, attributes)
+
+
+def end_span(span: Span) -> None:
+    span.end_ns = time.time_ns()
+    if _exporter is not None:
+        _exporter.submit(span)
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    parent: tuple[str, str] | None = None,
+    **attributes: Any,
+) -> Iterator[Span | _NoopSpan]:
+    """Trace the ``with`` block as a span, current for code running inside it."""
+    started = start_span(name, kind, parent, **attributes)
+    if started is None:
+        yield _NOOP
+        return
+    token = _current_span.set(started)
+    try:
+        yield started
+    except BaseException as e:
+        started.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(started)
+
+
+def _traced_method(name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _exporter is None:
+            return await fn(*args, **kwargs)
+        with span(name):
+            return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+def traced(cls: C) -> C:
+    """Class decorator: trace public async methods as ``Class.method`` spans."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, _traced_method(f"{cls.__name__}.{attr}", value))
+    return cls
@@ -0,0 +1,142 @@
+"""Circuit breaker for calls to external services (3X-UI panel)."""
+
+import enum
+import logging
+import time
+from typing import Any
+
+from src.observability.metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(enum.Enum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+    pass
+
+
+class CircuitBreaker:
+    """Classic three-state circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and all
+    calls are rejected for ``reset_timeout`` seconds. Then a single trial call
+    is let through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        # Counters for metrics
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> BreakerState:
+        if self._state is BreakerState.OPEN and self._reset_elapsed():
+            return BreakerState.HALF_OPEN
+        return self._state
+
+    def _reset_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed; counts rejections."""
+        if self._state is BreakerState.CLOSED:
+            return True
+
+        if self._state is BreakerState.OPEN and self._reset_elapsed():
+            self._transition(BreakerState.HALF_OPEN)
+
+        if self._state is BreakerState.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+
+        self.total_rejected += 1
+        return False
+
+    def check(self) -> None:
+        """Raise :class:`CircuitOpenError` if the call must not proceed."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def release(self) -> None:
+        """Release a half-open trial slot without recording an outcome."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        if self._state is not BreakerState.CLOSED:
+            self._transition(BreakerState.CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self.total_failures += 1
+        self._trial_in_flight = False
+        if self._state is BreakerState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self._state is not BreakerState.OPEN:
+                self.times_opened += 1
+                self._transition(BreakerState.OPEN)
+
+    def _transition(self, new_state: BreakerState) -> None:
+        logger.warning(f"Circuit '{self.name}': {self._state.value} -> {new_state.value}")
+        self._state = new_state
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current state and counters, for metrics and admin views."""
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "consecutive_failures": self._failures,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+            "times_opened": self.times_opened,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **kwargs: Any) -> CircuitBreaker:
+    """Get (or create) the process-wide breaker with the given name."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+    return breaker
+
+
+def all_breakers() -> list[CircuitBreaker]:
+    """All breakers created in this process."""
+    return list(_breakers.values())
+
+
+# 0 - closed, 1 - half-open, 2 - open
+_STATE_VALUES = {BreakerState.CLOSED: 0, BreakerState.HALF_OPEN: 1, BreakerState.OPEN: 2}
+
+gauge(
+    "circuit_breaker_state", "Breaker state: 0 closed, 1 half-open, 2 open", ("name",)
+).set_function(lambda: [({"name": b.name}, _STATE_VALUES[b.state]) for b in all_breakers()])
+counter(
+    "circuit_breaker_rejected_total", "Calls rejected by an open breaker", ("name",)
+).set_function(lambda: [({"name": b.name}, b.total_rejected) for b in all_breakers()])
+counter("circuit_breaker_opened_total", "Times a breaker has opened", ("name",)).set_function(
+    lambda: [({"name": b.name}, b.times_opened) for b in all_breakers()]
+)
@@ -0,0 +1,393 @@
+"""Renderers that turn a VPN profile into app-specific client configs.
+
+Each renderer is registered for one or more preset formats and receives the
+profile data stored in the database (already merged with per-user settings)
+plus the preset options. Renderers build the config from precompiled
+templates; the resulting text is cached by a key identifying its inputs
+(the preset and the profile version), so a preset is only re-serialized after
+its profile or settings change.
+"""
+
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from string import Template
+from typing import Any
+
+from src.bot.config import settings
+from src.services.url_generator import generate_vpn_link, merge_profile_settings
+
+Renderer = Callable[[str, dict[str, Any], dict[str, Any]], dict[str, str] | None]
+
+_RENDERERS: dict[str, Renderer] = {}
+
+# Rendered configs keyed by (format, cache key) (LRU, bounded)
+_CACHE_MAX_SIZE = 512
+_cache: OrderedDict[tuple[str, Hashable], dict[str, str]] = OrderedDict()
+
+DEFAULT_LOCAL_PORT = 2080
+
+
+def register_renderer(*formats: str) -> Callable[[Renderer], Renderer]:
+    """Register a renderer function for the given preset formats."""
+
+    def decorator(func: Renderer) -> Renderer:
+        for fmt in formats:
+            _RENDERERS[fmt] = func
+        return func
+
+    return decorator
+
+
+def get_renderer(format: str) -> Renderer | None:
+    """Get the renderer for a preset format (all ``*_uri`` formats share one)."""
+    if format.endswith("_uri"):
+        return _RENDERERS.get("uri")
+    return _RENDERERS.get(format)
+
+
+def supported_formats() -> list[str]:
+    """List registered preset formats."""
+    return sorted(_RENDERERS)
+
+
+def render_config(
+    format: str,
+    protocol_name: str,
+    profile_data: dict[str, Any],
+    settings_overrides: dict | None = None,
+    options: dict | None = None,
+    cache_key: Hashable | None = None,
+) -> dict[str, str] | None:
+    """Render a client config for the given format.
+
+    ``cache_key`` must change whenever the other inputs do (e.g. preset id,
+    profile id and ``updated_at``); renders without one are not cached.
+    Returns a dict with ``type`` and ``value`` keys, or ``None`` if the format
+    or protocol is not supported.
+    """
+    renderer = get_renderer(format)
+    if not renderer:
+        return None
+
+    key = (format, cache_key)
+    cached = _cache.get(key) if cache_key is not None else None
+    if cached is not None:
+        _cache.move_to_end(key)
+        return cached
+
+    prepared = merge_profile_settings(profile_data, settings_overrides)
+    rendered = renderer(protocol_name, prepared, options or {})
+    if rendered is None:
+        return None
+
+    if cache_key is not None:
+        _cache[key] = rendered
+        if len(_cache) > _CACHE_MAX_SIZE:
+            _cache.popitem(last=False)
+    return rendered
+
+
+def clear_cache() -> None:
+    """Drop all cached rendered configs."""
+    _cache.clear()
+
+
+# ============ SHARED HELPERS ============
+
+
+def _endpoint(profile_data: dict[str, Any], options: dict[str, Any]) -> dict[str, Any]:
+    """Extract the connection endpoint common to all renderers."""
+    remark = profile_data.get("remark", "")
+    email = profile_data.get("email", "")
+    default_name = f"{remark}-{email}" if remark and email else (remark or email or "vpn")
+    reality = profile_data.get("reality", {})
+
+    # Presets may only pick an SNI the inbound actually allows
+    sni = reality.get("sni", "")
+    if options.get("sni") in reality.get("sni_options", []):
+        sni = options["sni"]
+
+    return {
+        "name": options.get("name") or default_name,
+        "server": profile_data.get("host", settings.default_node.host),
+        "port": int(profile_data["port"]),
+        "sni": sni,
+        "local_port": int(options.get("local_port", DEFAULT_LOCAL_PORT)),
+    }
+
+
+def _yaml_str(value: Any) -> str:
+    """Quote a scalar for YAML (a JSON string is a valid YAML flow scalar)."""
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+# ============ URI ============
+
+
+@register_renderer("uri")
+def render_uri(
+    protocol_name: str, profile_data: dict[str, Any], options: dict[str, Any]
+) -> dict[str, str] | None:
+    """Render a plain share link (vless://, ss://)."""
+    link = generate_vpn_link(protocol_name, profile_data)
+    if not link:
+        return None
+    return {"type": "uri", "value": link}
+
+
+# ============ CLASH META ============
+
+_CLASH_VLESS_PROXY = Template(
+    "  - name: ${name}\n"
+    "    type: vless\n"
+    "    server: ${server}\n"
+    "    port: ${port}\n"
+    "    uuid: ${uuid}\n"
+    "    network: tcp\n"
+    "    udp: true\n"
+    "    tls: true\n"
+    "    flow: xtls-rprx-vision\n"
+    "    servername: ${sni}\n"
+    "    client-fingerprint: ${fingerprint}\n"
+    "    reality-opts:\n"
+    "      public-key: ${public_key}\n"
+    "      short-id: ${short_id}\n"
+)
+
+_CLASH_SS_PROXY = Template(
+    "  - name: ${name}\n"
+    "    type: ss\n"
+    "    server: ${server}\n"
+    "    port: ${port}\n"
+    "    cipher: ${method}\n"
+    "    password: ${password}\n"
+    "    udp: true\n"
+)
+
+_CLASH_CONFIG = Template(
+    "mixed-port: ${local_port}\n"
+    "allow-lan: false\n"
+    "mode: rule\n"
+    "log-level: warning\n"
+    "proxies:\n"
+    "${proxy}"
+    "proxy-groups:\n"
+    "  - name: PROXY\n"
+    "    type: select\n"
+    "    proxies:\n"
+    "      - ${name}\n"
+    "rules:\n"
+    "  - MATCH,PROXY\n"
+)
+
+
+@register_renderer("clash_yaml")
+def render_clash(
+    protocol_name: str, profile_data: dict[str, Any], options: dict[str, Any]
+) -> dict[str, str] | None:
+    """Render a Clash Meta (mihomo) YAML config."""
+    endpoint = _endpoint(profile_data, options)
+    name = _yaml_str(endpoint["name"])
+
+    if protocol_name == "vless":
+        reality = profile_data.get("reality", {})
+        proxy = _CLASH_VLESS_PROXY.substitute(
+            name=name,
+            server=_yaml_str(endpoint["server"]),
+            port=endpoint["port"],
+            uuid=_yaml_str(profile_data["client_id"]),
+            sni=_yaml_str(endpoint["sni"]),
+            fingerprint=_yaml_str(reality.get("fingerprint", "chrome")),
+            public_key=_yaml_str(reality.get("public_key", "")),
+            short_id=_yaml_str(reality.get("short_id", "")),
+        )
+    elif protocol_name == "shadowsocks":
+        shadowsocks = profile_data.get("shadowsocks", {})
+        proxy = _CLASH_SS_PROXY.substitute(
+            name=name,
+            server=_yaml_str(endpoint["server"]),
+            port=endpoint["port"],
+            method=_yaml_str(shadowsocks.get("method", "")),
+            password=_yaml_str(shadowsocks.get("password", "")),
+        )
+    else:
+        return None
+
+    value = _CLASH_CONFIG.substitute(local_port=endpoint["local_port"], proxy=proxy, name=name)
+    return {"type": "yaml", "value": value}
+
+
+# ============ SING-BOX ============
+
+
+def _singbox_outbound(
+    protocol_name: str, profile_data: dict[str, Any], endpoint: dict[str, Any]
+) -> dict[str, Any] | None:
+    if protocol_name == "vless":
+        reality = profile_data.get("reality", {})
+        return {
+            "type": "vless",
+            "tag": "proxy",
+            "server": endpoint["server"],
+            "server_port": endpoint["port"],
+            "uuid": profile_data["client_id"],
+            "flow": "xtls-rprx-vision",
+            "packet_encoding": "xudp",
+            "tls": {
+                "enabled": True,
+                "server_name": endpoint["sni"],
+                "utls": {"enabled": True, "fingerprint": reality.get("fingerprint", "chrome")},
+                "reality": {
+                    "enabled": True,
+                    "public_key": reality.get("public_key", ""),
+                    "short_id": reality.get("short_id", ""),
+                },
+            },
+        }
+    if protocol_name == "shadowsocks":
+        shadowsocks = profile_data.get("shadowsocks", {})
+        return {
+            "type": "shadowsocks",
+            "tag": "proxy",
+            "server": endpoint["server"],
+            "server_port": endpoint["port"],
+            "method": shadowsocks.get("method", ""),
+            "password": shadowsocks.get("password", ""),
+        }
+    return None
+
+
+@register_renderer("singbox_json")
+def render_singbox(
+    protocol_name: str, profile_data: dict[str, Any], options: dict[str, Any]
+) -> dict[str, str] | None:
+    """Render a sing-box JSON config with a local mixed inbound."""
+    endpoint = _endpoint(profile_data, options)
+    outbound = _singbox_outbound(protocol_name, profile_data, endpoint)
+    if not outbound:
+        return None
+
+    config = {
+        "log": {"level": "warn", "timestamp": True},
+        "dns": {
+            "servers": [
+                {"tag": "local", "address": "local", "detour": "direct"},
+                {"tag": "google", "address": "8.8.8.8"},
+            ],
+            "final": "local",
+        },
+        "inbounds": [
+            {
+                "type": "mixed",
+                "tag": "mixed-in",
+                "listen": "127.0.0.1",
+                "listen_port": endpoint["local_port"],
+                "sniff": True,
+            }
+        ],
+        "outbounds": [
+            outbound,
+            {"type": "direct", "tag": "direct"},
+            {"type": "block", "tag": "block"},
+        ],
+        "route": {
+            "rules": [{"protocol": "dns", "outbound": "direct"}],
+            "final": "proxy",
+        },
+    }
+    return {"type": "json", "value": json.dumps(config, ensure_ascii=False, indent=2)}
+
+
+# ============ XRAY ============
+
+
+def _xray_outbound(
+    protocol_name: str, profile_data: dict[str, Any], endpoint: dict[str, Any]
+) -> dict[str, Any] | None:
+    if protocol_name == "vless":
+        reality = profile_data.get("reality", {})
+        return {
+            "tag": "proxy",
+            "protocol": "vless",
+            "settings": {
+                "vnext": [
+                    {
+                        "address": endpoint["server"],
+                        "port": endpoint["port"],
+                        "users": [
+                            {
+                                "id": profile_data["client_id"],
+                                "encryption": "none",
+                                "flow": "xtls-rprx-vision",
+                            }
+                        ],
+                    }
+                ]
+            },
+            "streamSettings": {
+                "network": "tcp",
+                "security": "reality",
+                "realitySettings": {
+                    "serverName": endpoint["sni"],
+                    "fingerprint": reality.get("fingerprint", "chrome"),
+                    "publicKey": reality.get("public_key", ""),
+                    "shortId": reality.get("short_id", ""),
+                    "spiderX": reality.get("spider_x", "/"),
+                },
+            },
+        }
+    if protocol_name == "shadowsocks":
+        shadowsocks = profile_data.get("shadowsocks", {})
+        return {
+            "tag": "proxy",
+            "protocol": "shadowsocks",
+            "settings": {
+                "servers": [
+                    {
+                        "address": endpoint["server"],
+                        "port": endpoint["port"],
+                        "method": shadowsocks.get("method", ""),
+                        "password": shadowsocks.get("password", ""),
+                    }
+                ]
+            },
+        }
+    return None
+
+
+@register_renderer("xray_json")
+def render_xray(
+    protocol_name: str, profile_data: dict[str, Any], options: dict[str, Any]
+) -> dict[str, str] | None:
+    """Render an Xray-core JSON config with a local SOCKS/HTTP inbound."""
+    endpoint = _endpoint(profile_data, options)
+    outbound = _xray_outbound(protocol_name, profile_data, endpoint)
+    if not outbound:
+        return None
+
+    config = {
+        "log": {"loglevel": "warning"},
+        "inbounds": [
+            {
+                "tag": "socks-in",
+                "listen": "127.0.0.1",
+                "port": endpoint["local_port"],
+                "protocol": "socks",
+                "settings": {"udp": True},
+                "sniffing": {"enabled": True, "destOverride": ["http", "tls"]},
+            },
+            {
+                "tag": "http-in",
+                "listen": "127.0.0.1",
+                "port": endpoint["local_port"] + 1,
+                "protocol": "http",
+            },
+        ],
+        "outbounds": [
+            outbound,
+            {"tag": "direct", "protocol": "freedom"},
+            {"tag": "block", "protocol": "blackhole"},
+        ],
+    }
+    return {"type": "json", "value": json.dumps(config, ensure_ascii=False, indent=2)}
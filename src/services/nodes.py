@@ -0,0 +1,46 @@
+"""Nodes (3X-UI panels) and placement of new VPN clients on them."""
+
+from typing import Any
+
+from src.bot.config import Node, settings
+from src.services.circuit_breaker import BreakerState
+from src.services.xui_api import node_breaker
+
+
+def node_of(profile_data: dict[str, Any]) -> Node:
+    """Node owning a profile; profiles without one belong to the default node."""
+    return settings.get_node(profile_data.get("node"))
+
+
+def node_loads(counts: dict[str | None, int]) -> dict[str, int]:
+    """Active profiles per configured node from per-node profile counts."""
+    loads = {node.name: 0 for node in settings.nodes}
+    for name, count in counts.items():
+        loads[node_of({"node": name}).name] += count
+    return loads
+
+
+def pick_node(counts: dict[str | None, int], preferred: Node | None = None) -> Node | None:
+    """Least-loaded node for a new client, or ``None`` if every node is full.
+
+    Load is active profiles per unit of weight. Nodes at capacity are
+    skipped, and so are nodes whose circuit breaker is open while another
+    node is reachable. A ``preferred`` node (e.g. the user's fastest) is
+    picked while its load is within the rebalancing tolerance of the least
+    loaded one, so the rebalancer won't move the client away again.
+    """
+    loads = node_loads(counts)
+    candidates = [
+        node for node in settings.nodes if not node.capacity or loads[node.name] < node.capacity
+    ]
+    reachable = [node for node in candidates if node_breaker(node).state is not BreakerState.OPEN]
+    pool = reachable or candidates
+
+    def load(node: Node) -> float:
+        return loads[node.name] / node.weight if node.weight > 0 else float("inf")
+
+    # min() keeps configuration order on ties
+    best = min(pool, key=load, default=None)
+    if preferred in pool and load(preferred) - load(best) <= settings.rebalance_tolerance:
+        return preferred
+    return best
@@ -0,0 +1,96 @@
+"""Placement of new clients on the inbounds of a protocol.
+
+A protocol may declare a pool of inbounds; each new client goes to the
+inbound its placement policy ranks first, so no single inbound's settings
+(which hold every client) or port carries the whole user base. Recent
+traffic per inbound is measured from the panel's traffic counters, sampled
+by the status monitor on every refresh.
+"""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from src.bot.config import Protocol, settings
+from src.services.throughput import ThroughputTracker
+from src.services.xui_api import XUIApi
+
+
+@dataclass(frozen=True)
+class InboundLoad:
+    """Load of one inbound on a node."""
+
+    inbound_id: int
+    clients: int
+    # Average throughput over the recent window, bits/s (0 until measured)
+    traffic: float
+
+
+# (node name, inbound id) -> throughput derived from the inbound's traffic counter
+_traffic: dict[tuple[str, int], ThroughputTracker] = {}
+
+POLICIES: dict[str, Callable[[InboundLoad], tuple[float, ...]]] = {
+    "fewest_clients": lambda load: (load.clients,),
+    "lowest_traffic": lambda load: (load.traffic, load.clients),
+}
+
+
+def observe_inbounds(
+    node_name: str, inbounds_stats: dict[int, dict[str, Any]], at: float | None = None
+) -> None:
+    """Record traffic counters of a node's inbounds (from ``get_server_status``)."""
+    at = time.monotonic() if at is None else at
+    for inbound_id, stats in inbounds_stats.items():
+        tracker = _traffic.get((node_name, inbound_id))
+        if tracker is None:
+            tracker = _traffic[(node_name, inbound_id)] = ThroughputTracker(
+                window=settings.throughput_window
+            )
+        tracker.add_counter(stats["traffic"], at)
+
+
+def inbound_traffic(node_name: str, inbound_id: int) -> float:
+    """Average recent throughput of an inbound, bits/s (0 until measured)."""
+    tracker = _traffic.get((node_name, inbound_id))
+    return (tracker.average if tracker else None) or 0.0
+
+
+def inbound_loads(
+    node_name: str, protocol: Protocol, inbounds_stats: dict[int, dict[str, Any]]
+) -> list[InboundLoad]:
+    """Loads of the protocol's enabled inbounds on a node, in pool order."""
+    loads = []
+    for inbound_id in protocol.inbound_ids:
+        stats = inbounds_stats.get(inbound_id)
+        if stats is None or not stats["enable"]:
+            continue
+        loads.append(
+            InboundLoad(inbound_id, stats["clients"], inbound_traffic(node_name, inbound_id))
+        )
+    return loads
+
+
+def choose_inbound(protocol: Protocol, loads: list[InboundLoad]) -> int | None:
+    """Inbound the protocol's policy ranks first, or ``None`` if all are full."""
+    candidates = [
+        load
+        for load in loads
+        if not protocol.inbound_capacity or load.clients < protocol.inbound_capacity
+    ]
+    # min() keeps pool order on ties
+    best = min(candidates, key=POLICIES[protocol.placement], default=None)
+    return best.inbound_id if best else None
+
+
+async def place_client(api: XUIApi, protocol: Protocol) -> int | None:
+    """Inbound of ``protocol`` on the client's node for a new client (``None`` if full)."""
+    if len(protocol.inbound_ids) == 1 and not protocol.inbound_capacity:
+        return protocol.inbound_id
+    status = await api.get_server_status()
+    if not status["online"]:
+        # Placing on stale counts could overfill an inbound; creating would fail anyway
+        return None
+    return choose_inbound(
+        protocol, inbound_loads(api.node.name, protocol, status["inbounds_stats"])
+    )
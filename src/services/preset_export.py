@@ -0,0 +1,69 @@
+"""Streaming ZIP export of rendered preset configs."""
+
+import io
+import re
+import zipfile
+from collections.abc import Iterable, Iterator
+
+from src.utils.qr_generator import generate_qr_code
+
+# File extension per rendered config type
+_EXTENSIONS = {"uri": "txt", "yaml": "yaml", "json": "json"}
+
+_UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that collects ZIP bytes until they are drained.
+
+    ``zipfile`` detects the missing ``seek``/``tell`` support and switches to
+    data descriptors, so each entry can be flushed as soon as it is written.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entry_name(index: int, name: str) -> str:
+    safe = _UNSAFE_CHARS.sub("_", name).strip("_") or "preset"
+    return f"{index:02d}-{safe}"
+
+
+def iter_presets_zip(configs: Iterable[tuple[str, dict[str, str]]]) -> Iterator[bytes]:
+    """Yield a ZIP archive with one file per rendered config, chunk by chunk.
+
+    ``configs`` is an iterable of ``(preset_name, config)`` pairs where
+    ``config`` is the ``{"type", "value"}`` dict produced by the renderers.
+    URI configs additionally get a PNG QR code next to them. Only the current
+    entry is held in memory, so the archive size does not affect memory use.
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for index, (name, config) in enumerate(configs, start=1):
+            base = _entry_name(index, name)
+            extension = _EXTENSIONS.get(config["type"], "txt")
+            archive.writestr(f"{base}.{extension}", config["value"])
+
+            if config["type"] == "uri":
+                qr_buffer = generate_qr_code(config["value"])
+                # PNG is already compressed
+                archive.writestr(f"{base}.png", qr_buffer.read(), zipfile.ZIP_STORED)
+
+            yield sink.drain()
+
+    # Central directory is written on close
+    tail = sink.drain()
+    if tail:
+        yield tail
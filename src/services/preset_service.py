@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import ConnectionPreset, User
 from src.database.repositories import PresetRepository, UserRepository
-from src.services.url_generator import generate_vpn_link
+from src.services.config_renderers import render_config
 
 logger = logging.getLogger(__name__)
 
@@ -60,22 +60,38 @@ class PresetService:
             return None
         return preset
 
+    async def generate_configs(
+        self, user: User
+    ) -> list[tuple[ConnectionPreset, dict[str, str] | None]]:
+        """Load all user presets in one query and render a config for each.
+
+        Presets whose format cannot be rendered are returned with ``None``.
+        """
+        presets = await self.preset_repo.get_by_user(user)
+        return [(preset, await self.generate_config(preset)) for preset in presets]
+
     async def generate_config(self, preset: ConnectionPreset) -> dict[str, str] | None:
-        """Generate the final config for a preset."""
+        """Generate the final config for a preset.
+
+        The preset must be loaded with its profile (see ``PresetRepository``).
+        """
         profile = preset.profile
         if not profile:
             # This should ideally not happen if DB constraints are set up
             logger.error(f"Preset {preset.id} has no associated profile.")
             return None
 
-        # Combine profile data with user-specific overrides from profile.settings
-        full_profile_data = profile.profile_data
-
-        # TODO: Add logic to handle different formats (e.g., YAML for Clash/Hiddify)
-        if preset.format.endswith("_uri"):
-            link = generate_vpn_link(profile.protocol_name, full_profile_data, profile.settings)
-            if link:
-                return {"type": "uri", "value": link}
+        config = render_config(
+            preset.format,
+            profile.protocol_name,
+            profile.profile_data,
+            profile.settings,
+            preset.options,
+            # Presets are never edited, so the profile version covers all inputs
+            cache_key=(preset.id, profile.id, profile.updated_at),
+        )
+        if config:
+            return config
 
         logger.warning(f"Unsupported format '{preset.format}' for preset {preset.id}")
         return None
@@ -0,0 +1,140 @@
+"""Latency probes from the Mini App and node recommendations.
+
+The Mini App times a request to each node's probe URL from the user's
+device and reports the round-trip times with its time zone as a coarse
+region. A user is recommended the node with the lowest median latency in
+their own recent results, or, without those, in the results of their region,
+where each user counts once per node.
+"""
+
+import logging
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bot.config import Node, settings
+from src.database.models import User
+from src.database.repositories import ProbeRepository
+
+logger = logging.getLogger(__name__)
+
+# Probes slower than this are reported as timeouts by the Mini App
+MAX_RTT_MS = 10_000.0
+
+
+@dataclass(frozen=True)
+class NodeLatency:
+    """Aggregated probe results for one node."""
+
+    node: str
+    median_ms: float | None
+    samples: int
+    failures: int
+
+
+@dataclass(frozen=True)
+class Recommendation:
+    """Fastest node for a user and where the measurement comes from."""
+
+    node: Node
+    rtt_ms: float
+    # "user" (own probes) or "region"
+    source: str
+
+
+def probe_targets() -> list[tuple[Node, str]]:
+    """Nodes and the URL the Mini App times for each."""
+    return [(node, node.probe_url or f"https://{node.host}/") for node in settings.nodes]
+
+
+def aggregate(results: list[tuple[str, float | None]]) -> dict[str, NodeLatency]:
+    """Median RTT, successful samples and failures per node."""
+    rtts: dict[str, list[float]] = {}
+    failures: dict[str, int] = {}
+    for node, rtt_ms in results:
+        rtts.setdefault(node, [])
+        if rtt_ms is None:
+            failures[node] = failures.get(node, 0) + 1
+        else:
+            rtts[node].append(rtt_ms)
+    return {
+        node: NodeLatency(
+            node, statistics.median(values) if values else None, len(values), failures.get(node, 0)
+        )
+        for node, values in rtts.items()
+    }
+
+
+def per_user(results: list[tuple[int, str, float | None]]) -> list[tuple[str, float | None]]:
+    """One result per user and node: their median RTT, ``None`` if all probes failed."""
+    rtts: dict[tuple[int, str], list[float]] = {}
+    for user_id, node, rtt_ms in results:
+        values = rtts.setdefault((user_id, node), [])
+        if rtt_ms is not None:
+            values.append(rtt_ms)
+    return [
+        (node, statistics.median(values) if values else None) for (_, node), values in rtts.items()
+    ]
+
+
+def fastest(stats: dict[str, NodeLatency], min_samples: int = 1) -> tuple[Node, float] | None:
+    """Configured node with the lowest median RTT among those measured reliably enough.
+
+    A node needs ``min_samples`` successful probes and more successes than
+    failures.
+    """
+    candidates = [
+        (node, latency.median_ms)
+        for node in settings.nodes
+        if (latency := stats.get(node.name)) is not None
+        and latency.samples >= min_samples
+        and latency.samples > latency.failures
+    ]
+    return min(candidates, key=lambda candidate: candidate[1], default=None)
+
+
+class ProbeService:
+    """Service for latency probes and node recommendations."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.probe_repo = ProbeRepository(session)
+
+    @staticmethod
+    def _since() -> datetime:
+        # created_at is set by the database in UTC
+        return datetime.utcnow() - timedelta(hours=settings.probe_window_hours)
+
+    async def record(self, user: User, region: str, results: dict[str, float | None]) -> int:
+        """Store a probe run; unknown nodes and RTTs <= 0 are ignored. Returns the number stored."""
+        known = {node.name for node in settings.nodes}
+        accepted = {
+            node: None if rtt_ms is None or rtt_ms > MAX_RTT_MS else rtt_ms
+            for node, rtt_ms in results.items()
+            if node in known and (rtt_ms is None or rtt_ms > 0)
+        }
+        if accepted:
+            await self.probe_repo.add_results(user, region, accepted, older_than=self._since())
+            logger.info(f"Stored {len(accepted)} probe results of user {user.telegram_id}")
+        return len(accepted)
+
+    async def recommend(self, user: User, region: str | None = None) -> Recommendation | None:
+        """Fastest node by the user's own probes, else by probes from ``region``.
+
+        Without ``region`` (e.g. when placing a new client) the region the
+        user last reported probes from is used.
+        """
+        since = self._since()
+        own = fastest(aggregate(await self.probe_repo.get_user_results(user, since)))
+        if own:
+            return Recommendation(own[0], own[1], "user")
+        if region is None:
+            region = await self.probe_repo.get_last_region(user)
+        if region:
+            regional = aggregate(per_user(await self.probe_repo.get_region_results(region, since)))
+            best = fastest(regional, min_samples=settings.probe_min_samples)
+            if best:
+                return Recommendation(best[0], best[1], "region")
+        return None
@@ -0,0 +1,329 @@
+"""Background rebalancing of clients between the inbounds and nodes of a protocol.
+
+Placement only affects new clients, so load drifts as users come and go.
+The rebalancer periodically counts active profiles per slot (an inbound on
+a node), plans the fewest moves that bring every slot within a tolerance
+of the others, and migrates those clients in throttled batches: the client
+is created on the target panel, the profile is updated, the client is
+deleted on the source panel, and the user gets the new link once.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.bot.config import settings
+from src.database.models import VpnProfile
+from src.database.repositories import UserRepository
+from src.database.session import session_factory
+from src.observability.metrics import counter
+from src.services.nodes import node_of
+from src.services.placement import inbound_traffic
+from src.services.url_generator import generate_vpn_link
+from src.services.xui_api import XUIApi, XUIApiError, generate_client_name
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = counter("rebalance_migrations_total", "Client migrations by result", ("result",))
+
+MIGRATED_TEXT = (
+    "🔄 Мы перенесли твой VPN на другой сервер, чтобы нагрузка была равномерной.\n\n"
+    "Старая ссылка больше не работает, добавь новую:\n\n"
+    "<code>{link}</code>"
+)
+
+Notify = Callable[[int, str], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Slot:
+    """An inbound on a node."""
+
+    node: str
+    inbound_id: int
+
+
+@dataclass
+class SlotLoad:
+    """Profiles in a slot and what bounds it."""
+
+    slot: Slot
+    # Profiles in the slot; the first ones are moved first
+    profile_ids: list[int] = field(default_factory=list)
+    weight: float = 1.0
+    # Max clients in the slot (0 = unlimited)
+    capacity: int = 0
+    # Recent throughput, bits/s; breaks ties between equally loaded slots
+    traffic: float = 0.0
+
+    @property
+    def load(self) -> float:
+        return len(self.profile_ids) / self.weight
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Move of one profile's client from one slot to another."""
+
+    profile_id: int
+    protocol: str
+    source: Slot
+    target: Slot
+
+
+def plan_rebalance(
+    protocol: str,
+    slots: list[SlotLoad],
+    tolerance: float,
+    limit: int,
+    node_room: dict[str, int] | None = None,
+) -> list[Migration]:
+    """Fewest moves bringing the slots of a protocol within ``tolerance`` of each other.
+
+    Repeatedly moves one profile from the most to the least loaded slot that
+    has room, until their loads differ by at most ``tolerance`` clients per
+    unit of weight, a move would overshoot, or ``limit`` moves are planned.
+    ``node_room`` limits how many profiles a node may still receive (nodes
+    not in it are unlimited). The arguments are not modified.
+    """
+    slots = [replace(s, profile_ids=list(s.profile_ids)) for s in slots]
+    room = dict(node_room or {})
+    migrations: list[Migration] = []
+
+    def has_room(s: SlotLoad) -> bool:
+        fits = not s.capacity or len(s.profile_ids) < s.capacity
+        return fits and room.get(s.slot.node, 1) > 0
+
+    while len(migrations) < limit:
+        sources = [s for s in slots if s.profile_ids]
+        if not sources:
+            break
+        source = max(sources, key=lambda s: (s.load, s.traffic))
+        targets = [s for s in slots if s is not source and has_room(s)]
+        if not targets:
+            break
+        target = min(targets, key=lambda s: (s.load, s.traffic))
+        if source.load - target.load <= tolerance:
+            break
+        # Stop when moving would only make the target the most loaded slot
+        source_after = (len(source.profile_ids) - 1) / source.weight
+        target_after = (len(target.profile_ids) + 1) / target.weight
+        if source_after < target_after:
+            break
+
+        migration = Migration(source.profile_ids.pop(0), protocol, source.slot, target.slot)
+        target.profile_ids.append(migration.profile_id)
+        _shift_room(room, migration)
+        migrations.append(migration)
+    return migrations
+
+
+def _shift_room(room: dict[str, int], migration: Migration) -> None:
+    """Account for a planned migration in the nodes' remaining room."""
+    if migration.source.node != migration.target.node:
+        for node, delta in ((migration.target.node, -1), (migration.source.node, 1)):
+            if node in room:
+                room[node] += delta
+
+
+def _slot_of(profile: VpnProfile) -> Slot:
+    return Slot(node_of(profile.profile_data).name, profile.profile_data.get("inbound_id"))
+
+
+class Rebalancer:
+    """Periodically evens out clients across the slots of each protocol."""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        interval: float,
+        tolerance: float,
+        max_migrations: int,
+        batch_size: int,
+        batch_delay: float,
+    ) -> None:
+        self.session_maker = session_maker
+        self.interval = interval
+        self.tolerance = tolerance
+        self.max_migrations = max_migrations
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self._runner: asyncio.Task[None] | None = None
+        self._migrating: asyncio.Task[bool] | None = None
+
+        # Counters
+        self.migrated = 0
+        self.failed = 0
+
+    async def plan(self) -> list[Migration]:
+        """Migrations that would even out the current load."""
+        async with self.session_maker() as session:
+            profiles = await UserRepository(session).get_active_profiles()
+
+        node_counts = Counter(node_of(p.profile_data).name for p in profiles)
+        node_room = {
+            node.name: node.capacity - node_counts[node.name]
+            for node in settings.nodes
+            if node.capacity
+        }
+        migrations: list[Migration] = []
+        for protocol in settings.protocols:
+            # Nodes with weight 0 only take overflow and are left alone
+            slots = {
+                Slot(node.name, inbound_id): SlotLoad(
+                    Slot(node.name, inbound_id),
+                    weight=node.weight,
+                    capacity=protocol.inbound_capacity,
+                    traffic=inbound_traffic(node.name, inbound_id),
+                )
+                for node in settings.nodes
+                if node.weight > 0
+                for inbound_id in protocol.inbound_ids
+            }
+            for profile in profiles:
+                slot = slots.get(_slot_of(profile))
+                if profile.protocol_name == protocol.name and slot is not None:
+                    slot.profile_ids.append(profile.id)
+
+            planned = plan_rebalance(
+                protocol.name,
+                list(slots.values()),
+                self.tolerance,
+                self.max_migrations - len(migrations),
+                node_room,
+            )
+            for migration in planned:
+                _shift_room(node_room, migration)
+            migrations.extend(planned)
+        return migrations
+
+    async def run_once(self, notify: Notify) -> int:
+        """Plan and execute migrations in batches. Returns the number migrated."""
+        migrations = await self.plan()
+        if not migrations:
+            return 0
+        logger.info(f"Rebalancing: {len(migrations)} migrations planned")
+
+        migrated = 0
+        for start in range(0, len(migrations), self.batch_size):
+            if start:
+                await asyncio.sleep(self.batch_delay)
+            for migration in migrations[start : start + self.batch_size]:
+                # A started migration finishes even if the job is stopped meanwhile
+                self._migrating = asyncio.create_task(self._migrate(migration, notify))
+                if await asyncio.shield(self._migrating):
+                    migrated += 1
+        self._migrating = None
+        logger.info(f"Rebalancing: {migrated}/{len(migrations)} clients migrated")
+        return migrated
+
+    async def _migrate(self, migration: Migration, notify: Notify) -> bool:
+        try:
+            moved = await self._move(migration, notify)
+        except Exception as e:
+            logger.warning(f"Migration of profile {migration.profile_id} failed: {e}")
+            moved = False
+        if moved:
+            self.migrated += 1
+        else:
+            self.failed += 1
+        MIGRATIONS.inc(result="ok" if moved else "failed")
+        return moved
+
+    async def _move(self, migration: Migration, notify: Notify) -> bool:
+        async with self.session_maker() as session:
+            repo = UserRepository(session)
+            profile = await repo.get_profile(migration.profile_id)
+            if profile is None or not profile.is_active or _slot_of(profile) != migration.source:
+                # Revoked or moved since planning
+                return False
+
+            user = profile.user
+            source, target = migration.source, migration.target
+            target_node = settings.get_node(target.node)
+            email = generate_client_name(user.username, user.telegram_id)
+            if target.node == source.node:
+                # Client emails are unique per panel and the source client still exists
+                email = f"{email}-{target.inbound_id}"
+
+            async with XUIApi(target_node) as api:
+                client_data = await api.create_client(
+                    target.inbound_id, email, profile.protocol_name
+                )
+                if not client_data:
+                    raise XUIApiError(f"client not created on '{target.node}'")
+                protocol_settings = await api.get_protocol_settings(target.inbound_id)
+
+            old_data = profile.profile_data
+            profile.profile_data = {
+                **client_data,
+                **protocol_settings,
+                "node": target.node,
+                "host": target_node.host,
+            }
+            sni_options = protocol_settings.get("reality", {}).get("sni_options", [])
+            if profile.settings and profile.settings.get("sni") not in sni_options:
+                # The chosen SNI may not be allowed by the new inbound
+                profile.settings = {k: v for k, v in profile.settings.items() if k != "sni"}
+            await repo.update_vpn_profile(profile)
+
+        try:
+            async with XUIApi(settings.get_node(source.node)) as api:
+                await api.delete_client(source.inbound_id, old_data["email"])
+        except XUIApiError as e:
+            logger.warning(
+                f"Migrated profile {profile.id}, but its old client {old_data['email']} "
+                f"is left on '{source.node}' inbound {source.inbound_id}: {e}"
+            )
+
+        logger.info(
+            f"Migrated user {user.telegram_id} from {source.node}/{source.inbound_id}"
+            f" to {target.node}/{target.inbound_id}"
+        )
+        link = generate_vpn_link(profile.protocol_name, profile.profile_data, profile.settings)
+        if link:
+            try:
+                await notify(user.telegram_id, MIGRATED_TEXT.format(link=link))
+            except Exception as e:
+                logger.warning(f"Failed to notify user {user.telegram_id} of migration: {e}")
+        return True
+
+    async def run(self, notify: Notify) -> None:
+        """Rebalance periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once(notify)
+            except Exception as e:
+                logger.warning(f"Rebalancing failed: {e}")
+
+    def start(self, notify: Notify) -> None:
+        """Start the background job (unless disabled by a zero interval)."""
+        if self.interval > 0 and (self._runner is None or self._runner.done()):
+            self._runner = asyncio.create_task(self.run(notify))
+
+    async def stop(self) -> None:
+        """Stop the job, letting a migration in progress finish."""
+        if self._runner:
+            self._runner.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._runner
+            self._runner = None
+        if self._migrating and not self._migrating.done():
+            await self._migrating
+
+
+rebalancer = Rebalancer(
+    session_factory,
+    interval=settings.rebalance_interval,
+    tolerance=settings.rebalance_tolerance,
+    max_migrations=settings.rebalance_max_migrations,
+    batch_size=settings.rebalance_batch_size,
+    batch_delay=settings.rebalance_batch_delay,
+)
@@ -0,0 +1,84 @@
+"""Single-flight: merge concurrent identical async calls into one."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from src.observability.metrics import counter
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share it.
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it is in flight await the same task instead of starting another
+    one. A cancelled caller does not cancel the call for the others. Results
+    are shared, so callers must not mutate them.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._in_flight: dict[Hashable, asyncio.Task[Any]] = {}
+
+        # Counters
+        self.calls = 0
+        self.executed = 0
+        self.merged = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of ``fn()``, sharing an in-flight call for ``key``."""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.merged += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # All callers may have been cancelled; don't leave the error unretrieved
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> dict[str, int]:
+        """Total, executed and merged call counters."""
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "merged": self.merged,
+            "in_flight": self.in_flight,
+        }
+
+
+# Named groups, so stats can be reported in one place
+_groups: dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Return the single-flight group registered under ``name``."""
+    if name not in _groups:
+        _groups[name] = SingleFlight(name)
+    return _groups[name]
+
+
+def all_single_flights() -> list[SingleFlight]:
+    return list(_groups.values())
+
+
+counter("single_flight_executed_total", "Calls actually executed", ("group",)).set_function(
+    lambda: [({"group": g.name}, g.executed) for g in all_single_flights()]
+)
+counter(
+    "single_flight_merged_total", "Calls merged into an in-flight one", ("group",)
+).set_function(lambda: [({"group": g.name}, g.merged) for g in all_single_flights()])
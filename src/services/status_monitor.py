@@ -0,0 +1,146 @@
+"""Background-refreshed snapshot of the VPN server status."""
+
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from src.bot.config import Node, settings
+from src.services.placement import observe_inbounds
+from src.services.throughput import ThroughputTracker
+from src.services.xui_api import XUIApi
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServerStatusSnapshot:
+    """Status aggregated over all nodes at a point in time."""
+
+    online: bool
+    clients: int
+    online_clients: int
+    upload: int
+    download: int
+    inbounds: int
+    refreshed_at: datetime
+
+    @property
+    def total_traffic(self) -> int:
+        return self.upload + self.download
+
+
+class ServerStatusMonitor:
+    """Keeps a server status snapshot fresh so readers never wait on the panel.
+
+    The snapshot is refreshed every ``interval`` seconds by :meth:`run`,
+    querying all nodes concurrently; it is online only if every node is.
+    Concurrent on-demand refreshes share a single in-flight panel request.
+    Every successful refresh also feeds the traffic counter into
+    :attr:`throughput`, which turns counter deltas into throughput samples.
+    Without the refresh loop (in worker processes) a snapshot older than
+    ``interval`` is refreshed when read.
+    """
+
+    def __init__(self, interval: float, throughput_window: int = 60) -> None:
+        self.interval = interval
+        self.throughput = ThroughputTracker(window=throughput_window)
+        self._snapshot: ServerStatusSnapshot | None = None
+        self._refreshed_at = 0.0
+        self._refresh_task: asyncio.Task[ServerStatusSnapshot] | None = None
+        self._runner: asyncio.Task[None] | None = None
+
+    @property
+    def snapshot(self) -> ServerStatusSnapshot | None:
+        """Last known snapshot (may be ``None`` before the first refresh)."""
+        return self._snapshot
+
+    async def get(self) -> ServerStatusSnapshot:
+        """Return the current snapshot, refreshing only if there is none yet (or it is stale)."""
+        stale = self._runner is None and time.monotonic() - self._refreshed_at > self.interval
+        if self._snapshot is None or stale:
+            return await self.refresh()
+        return self._snapshot
+
+    async def refresh(self) -> ServerStatusSnapshot:
+        """Refresh the snapshot; concurrent callers await the same request."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+        return await asyncio.shield(self._refresh_task)
+
+    @staticmethod
+    async def _fetch_node(node: Node) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+        async with XUIApi(node) as api:
+            return await asyncio.gather(api.get_server_status(), api.get_online_clients())
+
+    async def _fetch(self) -> ServerStatusSnapshot:
+        results = await asyncio.gather(
+            *(self._fetch_node(node) for node in settings.nodes), return_exceptions=True
+        )
+        refreshed_at = time.monotonic()
+        fetched = []
+        for node, result in zip(settings.nodes, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to refresh status of node '{node.name}': {result}")
+                continue
+            fetched.append(result)
+            status, _ = result
+            if status["online"]:
+                # Per-inbound traffic for load-aware placement
+                observe_inbounds(node.name, status["inbounds_stats"], refreshed_at)
+
+        if not fetched:
+            snapshot = ServerStatusSnapshot(
+                online=False,
+                clients=self._snapshot.clients if self._snapshot else 0,
+                online_clients=0,
+                upload=self._snapshot.upload if self._snapshot else 0,
+                download=self._snapshot.download if self._snapshot else 0,
+                inbounds=self._snapshot.inbounds if self._snapshot else 0,
+                refreshed_at=datetime.now(),
+            )
+        else:
+            snapshot = ServerStatusSnapshot(
+                online=len(fetched) == len(results)
+                and all(status["online"] for status, _ in fetched),
+                clients=sum(status["clients"] for status, _ in fetched),
+                online_clients=sum(len(online_clients) for _, online_clients in fetched),
+                upload=sum(status["upload"] for status, _ in fetched),
+                download=sum(status["download"] for status, _ in fetched),
+                inbounds=sum(status["inbounds"] for status, _ in fetched),
+                refreshed_at=datetime.now(),
+            )
+            if snapshot.online:
+                self.throughput.add_counter(snapshot.total_traffic, refreshed_at)
+
+        self._snapshot = snapshot
+        self._refreshed_at = refreshed_at
+        return snapshot
+
+    async def run(self) -> None:
+        """Refresh the snapshot periodically until cancelled."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the background refresh loop."""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the background refresh loop."""
+        if self._runner:
+            self._runner.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._runner
+            self._runner = None
+
+
+status_monitor = ServerStatusMonitor(
+    interval=settings.status_refresh_interval,
+    throughput_window=settings.throughput_window,
+)
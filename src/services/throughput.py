@@ -0,0 +1,65 @@
+"""Server throughput measured from panel traffic counters."""
+
+import math
+from collections import deque
+
+
+class ThroughputTracker:
+    """Rolling window of aggregate throughput samples.
+
+    Each call to :meth:`add_counter` takes the total traffic counter of the
+    server (upload + download, in bytes) and turns the delta since the
+    previous call into a bits-per-second sample.
+    """
+
+    def __init__(self, window: int = 60) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._last: tuple[float, int] | None = None
+
+    def add_counter(self, total_bytes: int, at: float) -> None:
+        """Record a traffic counter reading taken at monotonic time ``at``."""
+        previous = self._last
+        self._last = (at, total_bytes)
+        if previous is None:
+            return
+
+        prev_at, prev_bytes = previous
+        elapsed = at - prev_at
+        delta = total_bytes - prev_bytes
+        # Counters go backwards when traffic is reset in the panel
+        if elapsed <= 0 or delta < 0:
+            return
+        self._samples.append(delta * 8 / elapsed)
+
+    @property
+    def current(self) -> float | None:
+        """Latest throughput sample in bits per second."""
+        return self._samples[-1] if self._samples else None
+
+    @property
+    def average(self) -> float | None:
+        """Mean throughput over the window, in bits per second."""
+        return sum(self._samples) / len(self._samples) if self._samples else None
+
+    @property
+    def peak(self) -> float | None:
+        """Highest throughput in the window, in bits per second."""
+        return max(self._samples) if self._samples else None
+
+    @property
+    def p95(self) -> float | None:
+        """95th percentile (nearest-rank) throughput in the window."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = math.ceil(0.95 * len(ordered))
+        return ordered[rank - 1]
+
+    def stats(self) -> dict[str, float | int | None]:
+        """Current, peak and p95 throughput (bits/s) plus sample count."""
+        return {
+            "current": self.current,
+            "peak": self.peak,
+            "p95": self.p95,
+            "samples": len(self._samples),
+        }
@@ -67,7 +67,7 @@ def generate_vless_url(profile_data: dict[str, Any]) -> str:
     spider_x = reality.get("spider_x", "/")
 
     spider_x_encoded = quote(spider_x, safe="")
-    host = profile_data.get("host", settings.xui_host)
+    host = profile_data.get("host", settings.default_node.host)
 
     return (
         f"vless://{profile_data['client_id']}@{host}:{profile_data['port']}"
@@ -87,13 +87,13 @@ def generate_shadowsocks_url(profile_data: dict[str, Any]) -> str:
 
     Expects ``profile_data['shadowsocks']`` to contain at least
     ``method`` and ``password``. Host is taken from ``profile_data['host']``
-    if present, otherwise from ``settings.xui_host``.
+    if present, otherwise from the default node.
     """
 
     shadowsocks = profile_data.get("shadowsocks", {})
     method = shadowsocks.get("method", "")
     password = shadowsocks.get("password", "")
-    host = profile_data.get("host", settings.xui_host)
+    host = profile_data.get("host", settings.default_node.host)
     port = profile_data["port"]
 
     remark = profile_data.get("remark", "")
@@ -5,15 +5,20 @@ from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.bot.config import settings
+from src.bot.config import Node, Protocol, settings
 from src.database.models import User, VPNRequest
 from src.database.repositories import RequestRepository, UserRepository
+from src.observability.tracing import traced
+from src.services.nodes import node_of, pick_node
+from src.services.placement import place_client
+from src.services.probes import ProbeService
 from src.services.url_generator import generate_vpn_link
 from src.services.xui_api import XUIApi, generate_client_name
 
 logger = logging.getLogger(__name__)
 
 
+@traced
 class VPNService:
     """Service for VPN-related business logic."""
 
@@ -55,20 +60,13 @@ class VPNService:
         if not protocol:
             return False, f"Протокол '{protocol_name}' не настроен."
 
-        async with XUIApi() as api:
-            client_name = generate_client_name(user.username, user.telegram_id)
-            # Create client in the corresponding inbound
-            client_data = await api.create_client(
-                inbound_id=protocol.inbound_id, email=client_name, protocol=protocol.name
-            )
-            if not client_data:
-                return False, "Ошибка создания профиля в 3X-UI"
-
-            # Fetch protocol-specific settings (like Reality, etc.)
-            protocol_settings = await api.get_protocol_settings(protocol.inbound_id)
+        node = await self._pick_node(user)
+        if node is None:
+            return False, "Нет свободных мест: все серверы заполнены"
 
-        # Combine client data with protocol settings for the link generator
-        full_profile_data = {**client_data, **protocol_settings}
+        full_profile_data = await self._create_client(node, user, protocol)
+        if not full_profile_data:
+            return False, "Ошибка создания профиля в 3X-UI"
 
         # Save the new profile to the database
         profile = await self.user_repo.create_vpn_profile(
@@ -104,7 +102,7 @@ class VPNService:
         inbound_id = active_profile.profile_data.get("inbound_id")
 
         if email and inbound_id:
-            async with XUIApi() as api:
+            async with XUIApi(node_of(active_profile.profile_data)) as api:
                 await api.delete_client(inbound_id, email)
 
         await self.user_repo.delete_active_profile(user)
@@ -121,7 +119,7 @@ class VPNService:
         if not email:
             return None
 
-        async with XUIApi() as api:
+        async with XUIApi(node_of(active_profile.profile_data)) as api:
             traffic_data = await api.get_client_traffic(email)
 
         return {
@@ -161,17 +159,13 @@ class VPNService:
             await self.revoke_vpn(user)
 
         # This flow is very similar to approving a request, but without a request object
-        async with XUIApi() as api:
-            client_name = generate_client_name(user.username, user.telegram_id)
-            client_data = await api.create_client(
-                inbound_id=protocol.inbound_id, email=client_name, protocol=protocol.name
-            )
-            if not client_data:
-                return False, "Ошибка создания профиля в 3X-UI"
+        node = await self._pick_node(user)
+        if node is None:
+            return False, "Нет свободных мест: все серверы заполнены"
 
-            protocol_settings = await api.get_protocol_settings(protocol.inbound_id)
-
-        full_profile_data = {**client_data, **protocol_settings}
+        full_profile_data = await self._create_client(node, user, protocol)
+        if not full_profile_data:
+            return False, "Ошибка создания профиля в 3X-UI"
 
         profile = await self.user_repo.create_vpn_profile(
             user=user, protocol_name=protocol.name, profile_data=full_profile_data
@@ -191,7 +185,7 @@ class VPNService:
             return False
 
         # Validate SNI against allowed list from the panel
-        async with XUIApi() as api:
+        async with XUIApi(node_of(active_profile.profile_data)) as api:
             protocol_settings = await api.get_protocol_settings(
                 active_profile.profile_data.get("inbound_id")
             )
@@ -209,3 +203,34 @@ class VPNService:
         await self.user_repo.update_vpn_profile(active_profile)
         logger.info(f"Updated SNI to {sni} for user {user.telegram_id}")
         return True
+
+    async def _pick_node(self, user: User) -> Node | None:
+        """Node for the user's new client, preferring the fastest one for them."""
+        recommendation = await ProbeService(self.session).recommend(user)
+        preferred = recommendation.node if recommendation else None
+        return pick_node(await self.user_repo.count_active_by_node(), preferred)
+
+    async def _create_client(
+        self, node: Node, user: User, protocol: Protocol
+    ) -> dict[str, Any] | None:
+        """Create the user's client on ``node``; returns profile data for the link."""
+        async with XUIApi(node) as api:
+            client_name = generate_client_name(user.username, user.telegram_id)
+            inbound_id = await place_client(api, protocol)
+            if inbound_id is None:
+                logger.warning(f"No free {protocol.name} inbound on node '{node.name}'")
+                return None
+
+            # Create client in the chosen inbound of the protocol's pool
+            client_data = await api.create_client(
+                inbound_id=inbound_id, email=client_name, protocol=protocol.name
+            )
+            if not client_data:
+                return None
+
+            # Fetch protocol-specific settings (like Reality, etc.)
+            protocol_settings = await api.get_protocol_settings(inbound_id)
+
+        logger.info(f"Placed client {client_name} on node '{node.name}', inbound {inbound_id}")
+        # Combine client data with protocol settings; the node owns the client from now on
+        return {**client_data, **protocol_settings, "node": node.name, "host": node.host}
@@ -1,16 +1,37 @@
 """3X-UI API client for VPN profile management."""
 
+import asyncio
 import json
 import logging
+import time
 import uuid
-from typing import Any
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+from urllib.parse import quote
 
 import aiohttp
 
-from src.bot.config import settings
+from src.bot.config import Node, settings
+from src.observability.metrics import counter, histogram
+from src.observability.timing import record
+from src.observability.tracing import SpanKind, span
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from src.services.single_flight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
+XUI_REQUESTS = counter(
+    "xui_requests_total",
+    "3X-UI panel requests by node, endpoint and outcome (HTTP status, error, circuit_open)",
+    ("node", "endpoint", "status"),
+)
+XUI_REQUEST_DURATION = histogram(
+    "xui_request_duration_seconds", "3X-UI panel request latency", ("node", "endpoint")
+)
+XUI_LOGINS = counter(
+    "xui_logins_total", "3X-UI panel logins by node and result", ("node", "result")
+)
+
 
 class XUIApiError(Exception):
     """Exception raised for 3X-UI API errors."""
@@ -18,81 +39,245 @@ class XUIApiError(Exception):
     pass
 
 
-class XUIApi:
-    """Async client for 3X-UI panel API."""
+# Per-endpoint request timeouts (seconds)
+ENDPOINT_TIMEOUTS: dict[str, float] = {
+    "login": 5.0,
+    "get_inbound": 5.0,
+    "update_inbound": 10.0,
+    "add_client": 10.0,
+    "del_client": 10.0,
+    "client_traffic": 5.0,
+    "list_inbounds": 10.0,
+    "onlines": 5.0,
+}
+
+# Last successful responses, served while the panel is unhealthy
+_last_known: dict[str, Any] = {}
+
+# Concurrent identical read calls share one panel request
+_reads = get_single_flight("xui")
+
+# 3X-UI answers API calls with an expired session cookie with one of these
+_UNAUTHORIZED = (401, 404)
+
+T = TypeVar("T")
+
+
+class _NodePool:
+    """HTTP session and login state shared by all clients of one node."""
+
+    def __init__(self, node: Node) -> None:
+        self.node = node
+        self.session: aiohttp.ClientSession | None = None
+        self.logged_in = False
+        self.login_lock = asyncio.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """The node's session, (re)created if closed or made in another event loop."""
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self._loop is not loop:
+            self.session = aiohttp.ClientSession(
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                connector=aiohttp.TCPConnector(limit=settings.xui_pool_size),
+            )
+            self._loop = loop
+            self.logged_in = False
+            self.login_lock = asyncio.Lock()
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.logged_in = False
+
+
+_pools: dict[str, _NodePool] = {}
+
+
+def _get_pool(node: Node) -> _NodePool:
+    pool = _pools.get(node.name)
+    if pool is None or pool.node != node:
+        pool = _pools[node.name] = _NodePool(node)
+    return pool
+
+
+def node_breaker(node: Node) -> CircuitBreaker:
+    """Circuit breaker guarding the node's panel."""
+    return get_breaker(
+        f"xui:{node.name}",
+        failure_threshold=settings.xui_breaker_failure_threshold,
+        reset_timeout=settings.xui_breaker_reset_timeout,
+    )
+
 
-    def __init__(self) -> None:
+async def close_pools() -> None:
+    """Close the shared panel sessions (on shutdown)."""
+    for pool in list(_pools.values()):
+        await pool.close()
+
+
+class XUIApi:
+    """Async client for the 3X-UI panel of one node (the default node if omitted).
+
+    Clients of a node share one pooled HTTP session and its login, so entering
+    a client is cheap and the panel sees one login per process rather than
+    one per operation. Every HTTP call goes through the node's circuit
+    breaker with a per-endpoint timeout. Login happens lazily on the first
+    request, so when the circuit is open a context can still serve cached
+    data without touching the panel.
+    """
+
+    def __init__(self, node: Node | None = None) -> None:
+        self.node = node or settings.default_node
+        self._pool = _get_pool(self.node)
         self._session: aiohttp.ClientSession | None = None
-        self._cookie_jar = aiohttp.CookieJar(unsafe=True)
+        self._breaker = node_breaker(self.node)
 
     async def __aenter__(self) -> "XUIApi":
-        self._session = aiohttp.ClientSession(cookie_jar=self._cookie_jar)
-        await self._login()
+        self._session = self._pool.get_session()
         return self
 
     async def __aexit__(self, *args: Any) -> None:
-        if self._session:
-            await self._session.close()
+        # The session belongs to the node pool and stays open for other clients
+        self._session = None
+
+    @property
+    def _logged_in(self) -> bool:
+        return self._pool.logged_in
+
+    @_logged_in.setter
+    def _logged_in(self, value: bool) -> None:
+        self._pool.logged_in = value
+
+    def _cache_key(self, key: str) -> str:
+        return f"{self.node.name}:{key}"
+
+    async def _shared_read(self, key: str, read: Callable[["XUIApi"], Awaitable[T]]) -> T:
+        """Run a read call once for all concurrent callers of the node with the same key."""
+        return await _reads.do(self._cache_key(key), lambda: read(self))
 
     def _build_url(self, path: str) -> str:
         """Build full URL for API endpoint."""
-        base = settings.xui_api_url.rstrip("/")
-        base_path = settings.xui_base_path.strip("/")
+        base = self.node.api_url.rstrip("/")
+        base_path = self.node.base_path.strip("/")
         if base_path:
             return f"{base}/{base_path}{path}"
         return f"{base}{path}"
 
-    async def _login(self) -> None:
-        """Authenticate with 3X-UI panel."""
-        if not self._session:
-            raise XUIApiError("Session not initialized")
-
-        url = settings.xui_api_url.rstrip("/") + "/login"
-        data = {
-            "username": settings.xui_username,
-            "password": settings.xui_password,
-        }
+    async def _request(
+        self, endpoint: str, method: str, url: str, **kwargs: Any
+    ) -> tuple[int, dict[str, Any]]:
+        """Perform an HTTP request guarded by the circuit breaker.
 
-        async with self._session.post(url, data=data) as resp:
-            if resp.status != 200:
-                raise XUIApiError(f"Login failed with status {resp.status}")
+        Returns (status, json body). Network errors, timeouts and 5xx
+        responses count as breaker failures and raise :class:`XUIApiError`.
+        """
+        try:
+            self._breaker.check()
+        except CircuitOpenError as e:
+            XUI_REQUESTS.inc(node=self.node.name, endpoint=endpoint, status="circuit_open")
+            raise XUIApiError(f"3X-UI panel '{self.node.name}' unavailable ({e})") from e
+
+        timeout = aiohttp.ClientTimeout(total=ENDPOINT_TIMEOUTS.get(endpoint, 10.0))
+        recorded = False
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            with span(
+                f"xui {endpoint}",
+                SpanKind.CLIENT,
+                **{"http.method": method, "xui.node": self.node.name},
+            ) as current:
+                # The pool's session rather than self._session: a shared read may
+                # outlive the client that started it (e.g. a cancelled caller)
+                session = self._pool.get_session()
+                async with session.request(method, url, timeout=timeout, **kwargs) as resp:
+                    outcome = str(resp.status)
+                    current.set_attribute("http.status_code", resp.status)
+                    if resp.status >= 500:
+                        self._breaker.record_failure()
+                        recorded = True
+                        raise XUIApiError(f"{endpoint} failed with status {resp.status}")
+                    # The body must be read before the connection goes back to the pool
+                    try:
+                        body = await resp.json(content_type=None) if resp.status == 200 else {}
+                    except ValueError as e:
+                        # e.g. the login page or an error page of a proxy in front of the panel
+                        self._breaker.record_failure()
+                        recorded = True
+                        raise XUIApiError(f"{endpoint} returned a non-JSON body") from e
+                    self._breaker.record_success()
+                    recorded = True
+                    return resp.status, body or {}
+        except (aiohttp.ClientError, TimeoutError) as e:
+            self._breaker.record_failure()
+            recorded = True
+            raise XUIApiError(f"{endpoint} request failed: {e!r}") from e
+        finally:
+            if not recorded:
+                self._breaker.release()
+            elapsed = time.perf_counter() - started
+            XUI_REQUEST_DURATION.observe(elapsed, node=self.node.name, endpoint=endpoint)
+            record("panel", elapsed)
+            XUI_REQUESTS.inc(node=self.node.name, endpoint=endpoint, status=outcome)
+
+    async def _call(self, endpoint: str, method: str, path: str, **kwargs: Any) -> tuple[int, dict]:
+        """Log in if needed, then perform an API request."""
+        if not self._logged_in:
+            await self._login()
+        status, result = await self._request(endpoint, method, self._build_url(path), **kwargs)
+        if status in _UNAUTHORIZED:
+            # The shared session outlived the panel's login; log in again once
+            self._logged_in = False
+            await self._login()
+            status, result = await self._request(endpoint, method, self._build_url(path), **kwargs)
+        return status, result
+
+    async def _login(self) -> None:
+        """Authenticate with the node's 3X-UI panel (once for all its clients)."""
+        async with self._pool.login_lock:
+            if self._logged_in:
+                return
+            url = self.node.api_url.rstrip("/") + "/login"
+            data = {
+                "username": self.node.username,
+                "password": self.node.password,
+            }
 
-            result = await resp.json()
-            if not result.get("success"):
-                raise XUIApiError(f"Login failed: {result.get('msg')}")
+            try:
+                status, result = await self._request("login", "POST", url, data=data)
+                if status != 200:
+                    raise XUIApiError(f"Login failed with status {status}")
+                if not result.get("success"):
+                    raise XUIApiError(f"Login failed: {result.get('msg')}")
+            except XUIApiError:
+                XUI_LOGINS.inc(node=self.node.name, result="failure")
+                raise
 
-            logger.info("Successfully logged in to 3X-UI panel")
+            XUI_LOGINS.inc(node=self.node.name, result="success")
+            self._logged_in = True
+            logger.info(f"Successfully logged in to 3X-UI panel '{self.node.name}'")
 
     async def get_inbound(self, inbound_id: int) -> dict[str, Any]:
         """Get inbound configuration."""
-        if not self._session:
-            raise XUIApiError("Session not initialized")
-
-        url = self._build_url(f"/api/inbounds/get/{inbound_id}")
-
-        async with self._session.get(url) as resp:
-            if resp.status != 200:
-                raise XUIApiError(f"Get inbound failed with status {resp.status}")
-
-            result = await resp.json()
-            if not result.get("success"):
-                raise XUIApiError(f"Get inbound failed: {result.get('msg')}")
+        status, result = await self._call("get_inbound", "GET", f"/api/inbounds/get/{inbound_id}")
+        if status != 200:
+            raise XUIApiError(f"Get inbound failed with status {status}")
+        if not result.get("success"):
+            raise XUIApiError(f"Get inbound failed: {result.get('msg')}")
 
-            return result["obj"]
+        return result["obj"]
 
     async def update_inbound(self, inbound_id: int, data: dict[str, Any]) -> bool:
         """Update inbound configuration."""
-        if not self._session:
-            raise XUIApiError("Session not initialized")
-
-        url = self._build_url(f"/api/inbounds/update/{inbound_id}")
-
-        async with self._session.post(url, json=data) as resp:
-            if resp.status != 200:
-                return False
-
-            result = await resp.json()
-            return result.get("success", False)
+        status, result = await self._call(
+            "update_inbound", "POST", f"/api/inbounds/update/{inbound_id}", json=data
+        )
+        if status != 200:
+            return False
+        return result.get("success", False)
 
     def _get_client_template(self, protocol: str, client_id: str, email: str) -> dict[str, Any]:
         """Get a new client template based on the protocol."""
@@ -119,21 +304,20 @@ class XUIApi:
     async def create_client(
         self, inbound_id: int, email: str, protocol: str
     ) -> dict[str, Any] | None:
-        """Create a new client in the specified inbound."""
-        inbound = await self.get_inbound(inbound_id)
-
-        settings_data = json.loads(inbound["settings"])
-        clients = settings_data.get("clients", [])
+        """Create a new client in the specified inbound.
 
+        Uses the panel's addClient rather than rewriting the inbound's client
+        list, so concurrent changes to the inbound (from other handlers,
+        processes or the rebalancer) are not lost.
+        """
         client_id = str(uuid.uuid4())
         new_client = self._get_client_template(protocol, client_id, email)
+        data = {"id": inbound_id, "settings": json.dumps({"clients": [new_client]})}
 
-        clients.append(new_client)
-        settings_data["clients"] = clients
-
-        inbound["settings"] = json.dumps(settings_data)
-
-        if await self.update_inbound(inbound_id, inbound):
+        status, result = await self._call(
+            "add_client", "POST", "/api/inbounds/addClient", json=data
+        )
+        if status == 200 and result.get("success", False):
             # Return data needed to construct the profile
             return {
                 "client_id": client_id,
@@ -144,110 +328,147 @@ class XUIApi:
         return None
 
     async def delete_client(self, inbound_id: int, email: str) -> bool:
-        """Delete a client from the specified inbound by email."""
+        """Delete a client from the specified inbound by email (via delClient)."""
         inbound = await self.get_inbound(inbound_id)
 
         settings_data = json.loads(inbound["settings"])
-        clients = settings_data.get("clients", [])
-
-        new_clients = [c for c in clients if c["email"] != email]
-        if len(new_clients) == len(clients):
+        client = next((c for c in settings_data.get("clients", []) if c["email"] == email), None)
+        if client is None:
             return False  # Client not found
 
-        settings_data["clients"] = new_clients
-        inbound["settings"] = json.dumps(settings_data)
+        # The panel identifies clients by password (trojan), email (shadowsocks) or id
+        protocol = inbound.get("protocol")
+        if protocol == "trojan":
+            client_key = client.get("password", "")
+        elif protocol == "shadowsocks":
+            client_key = email
+        else:
+            client_key = client["id"]
 
-        return await self.update_inbound(inbound_id, inbound)
+        status, result = await self._call(
+            "del_client",
+            "POST",
+            f"/api/inbounds/{inbound_id}/delClient/{quote(client_key, safe='')}",
+        )
+        return status == 200 and result.get("success", False)
 
     async def get_client_traffic(self, email: str) -> dict[str, int]:
-        """Get client traffic statistics."""
-        if not self._session:
-            raise XUIApiError("Session not initialized")
-
-        url = self._build_url(f"/api/inbounds/getClientTraffics/{email}")
-
-        async with self._session.get(url) as resp:
-            if resp.status != 200:
-                return {"upload": 0, "download": 0}
+        """Get client traffic statistics (last known values if the panel is down)."""
+        return await self._shared_read(
+            f"traffic:{email}", lambda api: api._fetch_client_traffic(email)
+        )
 
-            result = await resp.json()
-            if result.get("success") and isinstance(result.get("obj"), dict):
-                return {
-                    "upload": result["obj"].get("up", 0),
-                    "download": result["obj"].get("down", 0),
-                }
-            return {"upload": 0, "download": 0}
+    async def _fetch_client_traffic(self, email: str) -> dict[str, int]:
+        cache_key = self._cache_key(f"traffic:{email}")
+        try:
+            status, result = await self._call(
+                "client_traffic", "GET", f"/api/inbounds/getClientTraffics/{email}"
+            )
+        except XUIApiError as e:
+            return _stale_or_raise(cache_key, e)
+
+        traffic = {"upload": 0, "download": 0}
+        if status == 200 and result.get("success") and isinstance(result.get("obj"), dict):
+            traffic = {
+                "upload": result["obj"].get("up", 0),
+                "download": result["obj"].get("down", 0),
+            }
+            _last_known[cache_key] = traffic
+        return traffic
 
     async def health_check(self) -> bool:
         """Check if 3X-UI panel is accessible by listing inbounds."""
-        if not self._session:
-            return False
         try:
-            url = self._build_url("/api/inbounds/list")
-            async with self._session.get(url, timeout=5) as resp:
-                return resp.status == 200
+            status, _ = await self._call("list_inbounds", "GET", "/api/inbounds/list")
+            return status == 200
         except Exception:
             return False
 
     async def get_server_status(self) -> dict[str, Any]:
-        """Get server status including clients count and traffic."""
-        if not self._session:
-            raise XUIApiError("Session not initialized")
-
-        url = self._build_url("/api/inbounds/list")
-
-        async with self._session.get(url) as resp:
-            if resp.status != 200:
-                raise XUIApiError(f"Get inbounds failed with status {resp.status}")
-
-            result = await resp.json()
-            if not result.get("success"):
-                raise XUIApiError(f"Get inbounds failed: {result.get('msg')}")
-
-            inbounds = result.get("obj", [])
-            total_clients = 0
-            total_up = 0
-            total_down = 0
-
-            for inbound in inbounds:
-                if not inbound.get("enable"):
-                    continue
-                settings_data = json.loads(inbound.get("settings", "{}"))
-                clients = settings_data.get("clients", [])
-                total_clients += len([c for c in clients if c.get("enable", True)])
-                total_up += inbound.get("up", 0)
-                total_down += inbound.get("down", 0)
+        """Get server status including clients count and traffic.
 
-            return {
-                "online": True,
-                "clients": total_clients,
-                "upload": total_up,
-                "download": total_down,
-                "inbounds": len([i for i in inbounds if i.get("enable")]),
+        ``inbounds_stats`` maps each inbound id to its client count (all
+        clients, enabled or not: they all live in the inbound's settings),
+        traffic counter (upload + download bytes) and ``enable`` flag.
+
+        Falls back to the last known status while the panel is unavailable.
+        """
+        return await self._shared_read("server_status", lambda api: api._fetch_server_status())
+
+    async def _fetch_server_status(self) -> dict[str, Any]:
+        cache_key = self._cache_key("server_status")
+        try:
+            status, result = await self._call("list_inbounds", "GET", "/api/inbounds/list")
+        except XUIApiError as e:
+            return {**_stale_or_raise(cache_key, e), "online": False}
+
+        if status != 200:
+            raise XUIApiError(f"Get inbounds failed with status {status}")
+        if not result.get("success"):
+            raise XUIApiError(f"Get inbounds failed: {result.get('msg')}")
+
+        inbounds = result.get("obj", [])
+        total_clients = 0
+        total_up = 0
+        total_down = 0
+        inbounds_stats: dict[int, dict[str, Any]] = {}
+
+        for inbound in inbounds:
+            settings_data = json.loads(inbound.get("settings", "{}"))
+            clients = settings_data.get("clients", [])
+            inbounds_stats[inbound["id"]] = {
+                "clients": len(clients),
+                "traffic": inbound.get("up", 0) + inbound.get("down", 0),
+                "enable": bool(inbound.get("enable")),
             }
+            if not inbound.get("enable"):
+                continue
+            total_clients += len([c for c in clients if c.get("enable", True)])
+            total_up += inbound.get("up", 0)
+            total_down += inbound.get("down", 0)
+
+        server_status = {
+            "online": True,
+            "clients": total_clients,
+            "upload": total_up,
+            "download": total_down,
+            "inbounds": len([i for i in inbounds if i.get("enable")]),
+            "inbounds_stats": inbounds_stats,
+        }
+        _last_known[cache_key] = server_status
+        return server_status
 
     async def get_online_clients(self) -> list[dict[str, Any]]:
         """Get list of currently online clients."""
-        if not self._session:
-            raise XUIApiError("Session not initialized")
-
-        url = self._build_url("/api/inbounds/onlines")
+        return await self._shared_read("onlines", lambda api: api._fetch_online_clients())
 
+    async def _fetch_online_clients(self) -> list[dict[str, Any]]:
         try:
-            async with self._session.post(url) as resp:
-                if resp.status != 200:
-                    return []
-
-                result = await resp.json()
-                if result.get("success"):
-                    return result.get("obj", []) or []
-                return []
+            status, result = await self._call("onlines", "POST", "/api/inbounds/onlines")
         except Exception:
             return []
 
+        if status == 200 and result.get("success"):
+            return result.get("obj", []) or []
+        return []
+
     async def get_protocol_settings(self, inbound_id: int) -> dict[str, Any]:
-        """Get protocol-specific settings from an inbound configuration."""
-        inbound = await self.get_inbound(inbound_id)
+        """Get protocol-specific settings from an inbound configuration.
+
+        Falls back to the last known settings while the panel is unavailable.
+        """
+        return await self._shared_read(
+            f"protocol_settings:{inbound_id}",
+            lambda api: api._fetch_protocol_settings(inbound_id),
+        )
+
+    async def _fetch_protocol_settings(self, inbound_id: int) -> dict[str, Any]:
+        cache_key = self._cache_key(f"protocol_settings:{inbound_id}")
+        try:
+            inbound = await self.get_inbound(inbound_id)
+        except XUIApiError as e:
+            return _stale_or_raise(cache_key, e)
+
         protocol = inbound.get("protocol")
 
         settings_data = {"port": inbound["port"], "remark": inbound["remark"]}
@@ -277,20 +498,35 @@ class XUIApi:
                 "password": ss_settings.get("password", ""),
             }
 
+        _last_known[cache_key] = settings_data
         return settings_data
 
 
-async def check_xui_connection() -> tuple[bool, str]:
-    """Check connection to 3X-UI panel. Returns (success, message)."""
+def _stale_or_raise(cache_key: str, error: XUIApiError) -> Any:
+    """Return the last known value for a read call, or re-raise the panel error."""
+    if cache_key in _last_known:
+        logger.warning(f"3X-UI unavailable, serving stale '{cache_key}': {error}")
+        return _last_known[cache_key]
+    raise error
+
+
+async def _check_node(node: Node) -> tuple[bool, str]:
     try:
-        async with XUIApi() as api:
+        async with XUIApi(node) as api:
+            await api._login()
             if await api.health_check():
-                return True, "3X-UI panel is accessible"
-            return False, "3X-UI panel returned error"
+                return True, f"3X-UI panel '{node.name}' is accessible"
+            return False, f"3X-UI panel '{node.name}' returned error"
     except XUIApiError as e:
-        return False, f"3X-UI API error: {e}"
+        return False, f"3X-UI API error ({node.name}): {e}"
     except Exception as e:
-        return False, f"Connection error: {e}"
+        return False, f"Connection error ({node.name}): {e}"
+
+
+async def check_xui_connection() -> tuple[bool, str]:
+    """Check connection to the 3X-UI panels of all nodes. Returns (success, message)."""
+    results = await asyncio.gather(*(_check_node(node) for node in settings.nodes))
+    return all(ok for ok, _ in results), "; ".join(message for _, message in results)
 
 
 def generate_client_name(username: str | None, telegram_id: int) -> str:
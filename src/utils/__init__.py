@@ -1,4 +1,17 @@
+from typing import TYPE_CHECKING
+
 from src.utils.formatters import format_traffic
-from src.utils.qr_generator import generate_qr_code
+
+if TYPE_CHECKING:
+    from src.utils.qr_generator import generate_qr_code
 
 __all__ = ["format_traffic", "generate_qr_code"]
+
+
+def __getattr__(name: str):
+    # QR generation needs qrcode/Pillow; load it only when actually used
+    if name == "generate_qr_code":
+        from src.utils.qr_generator import generate_qr_code
+
+        return generate_qr_code
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -18,6 +18,22 @@ def format_traffic(bytes_count: int) -> str:
     return f"{gb:.2f} GB"
 
 
+def format_speed(bits_per_second: float | None) -> str:
+    """Format throughput in bits per second to human-readable string."""
+    if bits_per_second is None:
+        return "измеряется..."
+
+    kbit = bits_per_second / 1000
+    if kbit < 1000:
+        return f"{kbit:.0f} Кбит/с"
+
+    mbit = kbit / 1000
+    if mbit < 1000:
+        return f"{mbit:.1f} Мбит/с"
+
+    return f"{mbit / 1000:.2f} Гбит/с"
+
+
 def get_dns_instructions() -> str:
     """Get DNS configuration instructions for VPN clients."""
     return (
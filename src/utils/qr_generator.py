@@ -2,8 +2,6 @@
 
 import io
 
-import qrcode
-
 
 def generate_qr_code(data: str) -> io.BytesIO:
     """Generate QR code image from data string.
@@ -14,6 +12,9 @@ def generate_qr_code(data: str) -> io.BytesIO:
     Returns:
         BytesIO buffer containing PNG image
     """
+    # qrcode pulls in Pillow; import on first use to keep startup light
+    import qrcode
+
     qr = qrcode.QRCode(
         version=None,  # Auto-select version based on data length
         error_correction=qrcode.constants.ERROR_CORRECT_M,  # Medium error correction
@@ -0,0 +1,24 @@
+"""Shared fixtures."""
+
+import pytest_asyncio
+
+from src.database.models import Base
+from src.database.session import create_session_maker
+from src.observability.queries import QueryRecorder
+
+
+@pytest_asyncio.fixture
+async def session_maker(tmp_path):
+    """Session maker bound to a fresh SQLite database with all tables."""
+    maker = create_session_maker(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with maker.kw["bind"].begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield maker
+    await maker.kw["bind"].dispose()
+
+
+@pytest_asyncio.fixture
+async def query_recorder(session_maker):
+    """Records statements executed on the ``session_maker`` database."""
+    with QueryRecorder(session_maker.kw["bind"]) as recorder:
+        yield recorder
@@ -0,0 +1,112 @@
+"""Tests for the 3X-UI circuit breaker and stale fallback."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.bot.config import Node
+from src.services import xui_api
+from src.services.circuit_breaker import BreakerState, CircuitBreaker, CircuitOpenError
+from src.services.xui_api import XUIApi, XUIApiError
+
+
+def test_breaker_opens_after_threshold() -> None:
+    """Consecutive failures should open the circuit and reject calls."""
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    assert breaker.state is BreakerState.CLOSED
+    breaker.record_failure()
+    assert breaker.state is BreakerState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_breaker_half_open_allows_single_trial() -> None:
+    """After the reset timeout only one trial call goes through."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.allow_request() is True
+
+
+def test_breaker_half_open_failure_reopens() -> None:
+    """A failed trial call should open the circuit again."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.allow_request()
+
+    breaker.reset_timeout = 60
+    breaker.record_failure()
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.times_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_traffic_served_from_cache_when_panel_fails() -> None:
+    """Read calls should fall back to the last known value on panel errors."""
+    xui_api._last_known.clear()
+    ok_response = (200, {"success": True, "obj": {"up": 10, "down": 20}})
+
+    async with XUIApi() as api:
+        api._logged_in = True
+        with patch.object(api, "_request", AsyncMock(return_value=ok_response)):
+            assert await api.get_client_traffic("user") == {"upload": 10, "download": 20}
+
+        with patch.object(api, "_request", AsyncMock(side_effect=XUIApiError("down"))):
+            assert await api.get_client_traffic("user") == {"upload": 10, "download": 20}
+            with pytest.raises(XUIApiError):
+                await api.get_client_traffic("other-user")
+
+
+@pytest.mark.asyncio
+async def test_request_reads_body_from_real_panel() -> None:
+    """Bodies of real responses are decoded; 5xx and non-JSON responses count as failures."""
+    large = {"success": True, "obj": ["x" * 100] * 1000}
+
+    app = web.Application()
+    app.router.add_get("/small", lambda _: web.json_response({"success": True, "obj": 1}))
+    app.router.add_get("/large", lambda _: web.json_response(large))
+    app.router.add_get("/error", lambda _: web.Response(status=502))
+    app.router.add_get("/html", lambda _: web.Response(text="<html>login</html>"))
+
+    async with TestServer(app) as server:
+        node = Node(
+            name="local",
+            api_url=str(server.make_url("")),
+            username="a",
+            password="b",
+            host="localhost",
+        )
+        breaker = xui_api.node_breaker(node)
+        try:
+            async with XUIApi(node) as api:
+                for _ in range(3):
+                    status, body = await api._request("test", "GET", str(server.make_url("/small")))
+                    assert (status, body) == (200, {"success": True, "obj": 1})
+                assert await api._request("test", "GET", str(server.make_url("/large"))) == (
+                    200,
+                    large,
+                )
+                assert breaker.snapshot()["consecutive_failures"] == 0
+
+                with pytest.raises(XUIApiError, match="502"):
+                    await api._request("test", "GET", str(server.make_url("/error")))
+                assert breaker.snapshot()["consecutive_failures"] == 1
+
+                with pytest.raises(XUIApiError, match="non-JSON"):
+                    await api._request("test", "GET", str(server.make_url("/html")))
+                assert breaker.snapshot()["consecutive_failures"] == 2
+        finally:
+            breaker.record_success()
+            await xui_api.close_pools()
@@ -0,0 +1,152 @@
+"""Tests for preset config renderers."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from src.database.models import User, VpnProfile
+from src.database.repositories import PresetRepository, UserRepository
+from src.services import PresetService, config_renderers
+from src.services.config_renderers import clear_cache, render_config
+
+VLESS_PROFILE = {
+    "client_id": "550e8400-e29b-41d4-a716-446655440000",
+    "email": "testuser",
+    "port": 443,
+    "remark": "VLESS-Reality",
+    "host": "vpn.example.com",
+    "reality": {
+        "public_key": "YekDGkMaw9U8-WkptHVedz7X-ClHRogd6cxzo8ykll0",
+        "fingerprint": "chrome",
+        "sni_options": ["www.google.com", "www.microsoft.com"],
+        "default_sni": "www.google.com",
+        "default_short_id": "1f38d4f5",
+        "spider_x": "/",
+    },
+}
+
+SS_PROFILE = {
+    "email": "testuser",
+    "port": 8388,
+    "remark": "SS",
+    "host": "vpn.example.com",
+    "shadowsocks": {"method": "aes-128-gcm", "password": "pass123"},
+}
+
+
+def test_uri_format_renders_share_link() -> None:
+    """Any *_uri format should produce a plain share link."""
+    config = render_config("vless_uri", "vless", VLESS_PROFILE)
+
+    assert config["type"] == "uri"
+    assert config["value"].startswith("vless://550e8400")
+    assert "sni=www.google.com" in config["value"]
+
+
+def test_singbox_vless_uses_user_sni() -> None:
+    """sing-box config should carry Reality params and the user-selected SNI."""
+    config = render_config(
+        "singbox_json", "vless", VLESS_PROFILE, settings_overrides={"sni": "www.microsoft.com"}
+    )
+
+    assert config["type"] == "json"
+    outbound = json.loads(config["value"])["outbounds"][0]
+    assert outbound["type"] == "vless"
+    assert outbound["server"] == "vpn.example.com"
+    assert outbound["tls"]["server_name"] == "www.microsoft.com"
+    assert outbound["tls"]["reality"]["short_id"] == "1f38d4f5"
+
+
+def test_xray_shadowsocks_outbound() -> None:
+    """Xray config should contain a shadowsocks server entry."""
+    config = render_config("xray_json", "shadowsocks", SS_PROFILE, options={"local_port": 1080})
+
+    data = json.loads(config["value"])
+    server = data["outbounds"][0]["settings"]["servers"][0]
+    assert server == {
+        "address": "vpn.example.com",
+        "port": 8388,
+        "method": "aes-128-gcm",
+        "password": "pass123",
+    }
+    assert data["inbounds"][0]["port"] == 1080
+
+
+def test_clash_vless_yaml() -> None:
+    """Clash Meta YAML should list the proxy and route everything through it."""
+    config = render_config("clash_yaml", "vless", VLESS_PROFILE)
+
+    assert config["type"] == "yaml"
+    value = config["value"]
+    assert 'name: "VLESS-Reality-testuser"' in value
+    assert 'public-key: "YekDGkMaw9U8-WkptHVedz7X-ClHRogd6cxzo8ykll0"' in value
+    assert "MATCH,PROXY" in value
+
+
+def test_preset_sni_option_must_be_allowed() -> None:
+    """A preset may not inject an SNI the inbound does not list."""
+    config = render_config("singbox_json", "vless", VLESS_PROFILE, options={"sni": "evil.com"})
+
+    outbound = json.loads(config["value"])["outbounds"][0]
+    assert outbound["tls"]["server_name"] == "www.google.com"
+
+
+def test_unknown_format_returns_none() -> None:
+    """Unsupported formats should not render anything."""
+    assert render_config("wireguard_conf", "vless", VLESS_PROFILE) is None
+
+
+def test_rendered_config_is_cached(monkeypatch) -> None:
+    """Repeated renders with the same cache key should not call the renderer again."""
+    clear_cache()
+    calls = []
+    original = config_renderers._RENDERERS["singbox_json"]
+
+    def counting_renderer(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setitem(config_renderers._RENDERERS, "singbox_json", counting_renderer)
+
+    first = render_config("singbox_json", "vless", VLESS_PROFILE, cache_key=(1, 1, None))
+    second = render_config("singbox_json", "vless", VLESS_PROFILE, cache_key=(1, 1, None))
+    assert first is second
+    assert len(calls) == 1
+
+    # A profile update changes the key
+    render_config(
+        "singbox_json",
+        "vless",
+        VLESS_PROFILE,
+        settings_overrides={"sni": "x"},
+        cache_key=(1, 1, datetime(2025, 1, 1)),
+    )
+    assert len(calls) == 2
+
+    # Without a key nothing is cached
+    render_config("singbox_json", "vless", VLESS_PROFILE)
+    render_config("singbox_json", "vless", VLESS_PROFILE)
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_preset_config_rerendered_after_profile_update(session_maker) -> None:
+    """Updating the profile changes its version, so the cached config is not reused."""
+    clear_cache()
+    async with session_maker() as session:
+        user = User(telegram_id=1, full_name="User")
+        profile = VpnProfile(user=user, protocol_name="vless", profile_data=VLESS_PROFILE)
+        session.add_all([user, profile])
+        await session.commit()
+        await PresetRepository(session).create(user, profile, "Phone", "v2ray", "vless_uri")
+
+        service = PresetService(session)
+        [(_, first)] = await service.generate_configs(user)
+        assert "sni=www.google.com" in first["value"]
+
+        profile.settings = {"sni": "www.microsoft.com"}
+        await UserRepository(session).update_vpn_profile(profile)
+
+        [(_, second)] = await service.generate_configs(user)
+        assert "sni=www.microsoft.com" in second["value"]
@@ -0,0 +1,108 @@
+"""Tests for the SQL-backed FSM storage."""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import select, update
+
+from src.bot.config import Settings
+from src.bot.storage import SqlStorage
+from src.database.models import Base, FsmRecord
+from src.database.session import create_session_maker
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+class Flow(StatesGroup):
+    waiting = State()
+
+
+@pytest_asyncio.fixture
+async def session_maker(tmp_path):
+    maker = create_session_maker(f"sqlite+aiosqlite:///{tmp_path / 'fsm.db'}")
+    async with maker.kw["bind"].begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield maker
+    await maker.kw["bind"].dispose()
+
+
+async def _rows(maker) -> list[FsmRecord]:
+    async with maker() as session:
+        return list((await session.execute(select(FsmRecord))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_state_survives_restart(session_maker) -> None:
+    """State and data written by one storage are read back by a new one."""
+    storage = SqlStorage(session_maker, flush_interval=60)
+    await storage.set_state(KEY, Flow.waiting)
+    await storage.set_data(KEY, {"target": "all"})
+    await storage.close()
+
+    restarted = SqlStorage(session_maker)
+    assert await restarted.get_state(KEY) == Flow.waiting.state
+    assert await restarted.get_data(KEY) == {"target": "all"}
+    await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched(session_maker) -> None:
+    """Several updates before a flush produce a single write per key."""
+    storage = SqlStorage(session_maker, flush_interval=60)
+    for i in range(5):
+        await storage.set_data(KEY, {"step": i})
+    await storage.set_state(KEY, Flow.waiting)
+
+    assert await _rows(session_maker) == []
+    await storage.flush()
+
+    rows = await _rows(session_maker)
+    assert len(rows) == 1
+    assert rows[0].data == {"step": 4}
+    assert storage.flushes == 1
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_cleared_state_removes_row(session_maker) -> None:
+    """Clearing the FSM (state None, empty data) deletes the record."""
+    storage = SqlStorage(session_maker)
+    await storage.set_state(KEY, Flow.waiting)
+    await storage.flush()
+    await storage.set_state(KEY, None)
+    await storage.set_data(KEY, {})
+    await storage.flush()
+
+    assert await _rows(session_maker) == []
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_records_are_ignored_and_cleaned(session_maker) -> None:
+    """Records past their TTL are not loaded and get deleted on cleanup."""
+    storage = SqlStorage(session_maker, ttl=3600)
+    await storage.set_state(KEY, Flow.waiting)
+    await storage.close()
+
+    async with session_maker() as session, session.begin():
+        await session.execute(
+            update(FsmRecord).values(expires_at=datetime.now() - timedelta(seconds=1))
+        )
+
+    restarted = SqlStorage(session_maker, ttl=3600)
+    assert await restarted.get_state(KEY) is None
+
+    restarted._last_cleanup = datetime.now() - timedelta(hours=2)
+    await restarted.flush()
+    assert await _rows(session_maker) == []
+    await restarted.close()
+
+
+def test_unknown_fsm_storage_is_rejected() -> None:
+    """A typo in FSM_STORAGE fails at startup instead of silently using memory."""
+    assert Settings(fsm_storage="redis").fsm_storage == "redis"
+    with pytest.raises(ValueError, match="FSM_STORAGE"):
+        Settings(fsm_storage="sqll")
@@ -0,0 +1,220 @@
+"""Tests for Prometheus metrics and their instrumentation."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, StatementError
+
+from src.api.main import app
+from src.bot.middlewares.metrics import (
+    HANDLER_CALLS,
+    MetricsMiddleware,
+    event_action,
+    handler_commands,
+)
+from src.database.repositories import UserRepository
+from src.observability.metrics import Counter, Histogram, Registry, counter, histogram
+from src.observability.sql import DB_QUERIES
+
+
+def test_render_counter_and_histogram() -> None:
+    """Samples are rendered in the Prometheus text format with cumulative buckets."""
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ("path",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1)))
+
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/a\\"b"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_sum 3.55" in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_register_returns_existing_metric() -> None:
+    """Registering a name twice yields the same metric; a different kind is rejected."""
+    first = counter("test_repeated_total", "Repeated", ("kind",))
+    assert counter("test_repeated_total", "Repeated", ("kind",)) is first
+
+    with pytest.raises(ValueError):
+        histogram("test_repeated_total", "Repeated", ("kind",))
+    with pytest.raises(ValueError):
+        first.inc(other="x")
+
+
+def test_function_samples_are_read_at_render_time() -> None:
+    """Metrics backed by a function report its current values."""
+    queue = [1, 2]
+    depth = counter("test_function_total", "Function backed", ("queue",))
+    depth.set_function(lambda: [({"queue": "main"}, len(queue))])
+
+    queue.append(3)
+
+    assert 'test_function_total{queue="main"} 3' in depth.render()
+
+
+def test_event_action_labels() -> None:
+    """Callbacks are labelled by their handler, commands by the command."""
+
+    async def approve(callback: CallbackQuery) -> None:
+        pass
+
+    async def start(message: Message) -> None:
+        pass
+
+    router = Router()
+    router.callback_query(F.data.startswith("approve:"))(approve)
+    router.message(Command("start"))(start)
+    [approve_handler] = router.callback_query.handlers
+    [start_handler] = router.message.handlers
+
+    callback = MagicMock(spec=CallbackQuery)
+    callback.data = "approve:42"
+    assert event_action(callback, approve_handler) == "approve"
+    assert event_action(callback) == "callback"
+
+    message = MagicMock(spec=Message)
+    message.text = "/start@vpn_bot ref"
+    assert event_action(message, start_handler) == "/start"
+
+
+def test_unregistered_commands_share_one_label() -> None:
+    """Only commands of the matched handler become labels; anything else is "other"."""
+
+    async def handler(message: Message) -> None:
+        pass
+
+    router = Router()
+    router.message(Command("start", "menu"))(handler)
+    router.message(F.text)(handler)
+    with_command, catch_all = router.message.handlers
+
+    assert handler_commands(with_command) == {"start", "menu"}
+    assert handler_commands(catch_all) == set()
+    assert handler_commands(None) == set()
+
+    message = MagicMock(spec=Message)
+    message.text = "/menu"
+    assert event_action(message, with_command) == "/menu"
+    message.text = "/random_1234"
+    assert event_action(message, catch_all) == "other"
+
+
+@pytest.mark.asyncio
+async def test_callbacks_with_ids_share_one_series() -> None:
+    """reply_to_<user id> callbacks of different users are counted in one series."""
+
+    async def reply_to_user(callback: CallbackQuery) -> None:
+        pass
+
+    router = Router()
+    router.callback_query(F.data.startswith("reply_to_"))(reply_to_user)
+    [handler] = router.callback_query.handlers
+    labels = {"router": "test_metrics", "handler": "reply_to_user", "action": "reply_to_user"}
+    before = HANDLER_CALLS.get(**labels, result="ok")
+
+    for user_id in (101, 202):
+        callback = MagicMock(spec=CallbackQuery)
+        callback.data = f"reply_to_{user_id}"
+        await MetricsMiddleware()(AsyncMock(), callback, {"handler": handler})
+
+    assert HANDLER_CALLS.get(**labels, result="ok") == before + 2
+    assert "reply_to_101" not in HANDLER_CALLS.render()
+
+
+@pytest.mark.asyncio
+async def test_handler_metrics_record_result() -> None:
+    """Handler calls are counted per handler with their outcome."""
+
+    async def admin_requests() -> None:
+        pass
+
+    callback = MagicMock(spec=CallbackQuery)
+    callback.data = "admin_requests"
+    data = {"handler": MagicMock(callback=admin_requests)}
+    labels = {
+        "router": "test_metrics",
+        "handler": "admin_requests",
+        "action": "admin_requests",
+    }
+    middleware = MetricsMiddleware()
+    ok_before = HANDLER_CALLS.get(**labels, result="ok")
+    error_before = HANDLER_CALLS.get(**labels, result="error")
+
+    await middleware(AsyncMock(), callback, data)
+    with pytest.raises(RuntimeError):
+        await middleware(AsyncMock(side_effect=RuntimeError), callback, data)
+
+    assert HANDLER_CALLS.get(**labels, result="ok") == ok_before + 1
+    assert HANDLER_CALLS.get(**labels, result="error") == error_before + 1
+
+
+@pytest.mark.asyncio
+async def test_queries_attributed_to_repository_method(session_maker) -> None:
+    """SQL statements are counted under the repository method that ran them."""
+    labels = {"method": "UserRepository.get_by_telegram_id", "result": "ok"}
+    before = DB_QUERIES.get(**labels)
+
+    async with session_maker() as session:
+        assert await UserRepository(session).get_by_telegram_id(1) is None
+
+    assert DB_QUERIES.get(**labels) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_query_counted_as_error(session_maker) -> None:
+    """A failing statement is counted as an error and its own exception propagates."""
+    labels = {"method": "unscoped", "result": "error"}
+    before = DB_QUERIES.get(**labels)
+
+    async with session_maker() as session:
+        with pytest.raises(OperationalError):
+            await session.execute(text("SELECT * FROM missing_table"))
+
+    assert DB_QUERIES.get(**labels) == before + 1
+
+
+def test_interrupted_query_not_paired_with_later_errors() -> None:
+    """A query that never finished isn't recorded against a later failure."""
+    errors = {"method": "unscoped", "result": "error"}
+    ok = {"method": "unscoped", "result": "ok"}
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        # As a cancelled query: started, but its after_cursor_execute never comes
+        started = type("Context", (), {})()
+        conn.dispatch.before_cursor_execute(conn, None, "SELECT 1", {}, started, False)
+        before = DB_QUERIES.get(**errors), DB_QUERIES.get(**ok)
+
+        # Fails on a missing parameter before reaching the cursor
+        with pytest.raises(StatementError):
+            conn.execute(text("SELECT :value"))
+        conn.execute(text("SELECT 1"))
+
+    assert (DB_QUERIES.get(**errors), DB_QUERIES.get(**ok)) == (before[0], before[1] + 1)
+
+
+def test_api_metrics_use_route_templates() -> None:
+    """API requests are labelled by route template and exposed on /metrics."""
+    client = TestClient(app)
+    client.get("/protocols")
+    client.get("/presets/123/config")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'api_requests_total{method="GET",route="/protocols",status="200"}' in response.text
+    assert 'route="/presets/{preset_id}/config"' in response.text
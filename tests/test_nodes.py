@@ -0,0 +1,130 @@
+"""Tests for nodes: configuration, placement and routing to the owning panel."""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.bot.config import Node, Protocol, Settings, settings
+from src.database.models import RequestStatus, User, VpnProfile, VPNRequest
+from src.database.repositories import UserRepository
+from src.services import VPNService, XUIApi
+from src.services.nodes import node_loads, node_of, pick_node
+from src.services.xui_api import node_breaker
+
+NODES = [
+    Node(name="de", api_url="http://de:2053", username="a", password="b", host="de.example.com"),
+    Node(
+        name="nl",
+        api_url="http://nl:2053/",
+        base_path="/secret/",
+        username="a",
+        password="b",
+        host="nl.example.com",
+        capacity=2,
+    ),
+]
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    monkeypatch.setattr(settings, "nodes", list(NODES))
+    monkeypatch.setattr(
+        settings, "protocols", [Protocol(name="vless", inbound_id=1, label="VLESS", description="")]
+    )
+    return NODES
+
+
+def test_single_panel_settings_become_main_node() -> None:
+    """Without NODES_CONFIG the XUI_* panel is the only node."""
+    assert [node.name for node in settings.nodes] == ["main"]
+    assert settings.default_node.host == settings.xui_host
+
+
+def test_nodes_config_is_parsed_and_validated() -> None:
+    """NODES_CONFIG replaces the single panel; names must be unique."""
+    config = [node.model_dump() for node in NODES]
+    parsed = Settings(nodes_config=json.dumps(config))
+    assert parsed.nodes == NODES
+    assert parsed.get_node("nl") == NODES[1]
+    assert parsed.get_node(None) == parsed.get_node("gone") == NODES[0]
+
+    with pytest.raises(ValueError, match="unique"):
+        Settings(nodes_config=json.dumps([config[0], config[0]]))
+
+
+def test_pick_node_prefers_least_loaded_with_free_capacity(nodes) -> None:
+    """Legacy profiles count on the default node; full nodes are skipped."""
+    assert node_loads({None: 3, "de": 1, "nl": 1}) == {"de": 4, "nl": 1}
+    assert pick_node({None: 3, "de": 1, "nl": 1}) == nodes[1]
+    assert pick_node({"de": 5, "nl": 2}) == nodes[0]
+    assert pick_node({"de": 0, "nl": 0}) == nodes[0]
+
+
+def test_pick_node_returns_none_when_all_full(monkeypatch, nodes) -> None:
+    """No node is picked once every node is at capacity."""
+    monkeypatch.setattr(settings, "nodes", [nodes[1]])
+    assert pick_node({"nl": 2}) is None
+
+
+def test_pick_node_skips_node_with_open_circuit(nodes) -> None:
+    """A node whose panel is failing gets no new users while another is reachable."""
+    breaker = node_breaker(nodes[1])
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    try:
+        assert pick_node({"de": 1, "nl": 0}) == nodes[0]
+    finally:
+        breaker.record_success()
+
+
+@pytest.mark.asyncio
+async def test_clients_route_to_node_and_share_its_session(nodes) -> None:
+    """Clients build URLs for their node and reuse one session per node."""
+    async with XUIApi(nodes[1]) as first, XUIApi(nodes[1]) as second, XUIApi() as default:
+        assert first._build_url("/api/inbounds/list") == "http://nl:2053/secret/api/inbounds/list"
+        assert default._build_url("/x") == "http://de:2053/panel/x"
+        assert first._session is second._session
+        assert first._session is not default._session
+
+        first._logged_in = True
+        assert second._logged_in
+        assert not default._logged_in
+
+
+@pytest.mark.asyncio
+async def test_approve_places_client_on_least_loaded_node(session_maker, nodes) -> None:
+    """The new profile records its node and link host; revoke goes to that node."""
+    async with session_maker() as session:
+        other = User(telegram_id=1, full_name="Other")
+        user = User(telegram_id=2, full_name="User", username="user")
+        request = VPNRequest(user=user, status=RequestStatus.PENDING)
+        session.add_all(
+            [other, user, request, VpnProfile(user=other, protocol_name="vless", profile_data={})]
+        )
+        await session.commit()
+
+        client = {"client_id": "id", "email": "user", "protocol": "vless", "inbound_id": 1}
+        protocol_settings = {"port": 443, "remark": "r", "reality": {"public_key": "k"}}
+        with (
+            patch.object(XUIApi, "create_client", AsyncMock(return_value=client)) as create,
+            patch.object(
+                XUIApi, "get_protocol_settings", AsyncMock(return_value=protocol_settings)
+            ),
+        ):
+            ok, link = await VPNService(session).approve_request(request.id, "vless")
+
+        assert ok, link
+        assert "@nl.example.com:443" in link
+        assert create.await_count == 1
+
+        user = await UserRepository(session).get_by_telegram_id(2)
+        profile_data = user.active_profile.profile_data
+        assert profile_data["node"] == "nl"
+        assert node_of(profile_data) == nodes[1]
+        assert await UserRepository(session).count_active_by_node() == {None: 1, "nl": 1}
+
+        with patch.object(XUIApi, "delete_client", autospec=True) as delete:
+            assert await VPNService(session).revoke_vpn(user)
+        api, inbound_id, email = delete.await_args.args
+        assert (api.node, inbound_id, email) == (nodes[1], 1, "user")
@@ -0,0 +1,140 @@
+"""Tests for the outgoing Telegram message queue."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, SendMessage
+
+from src.bot.outbox import Lane, OutboundQueue, OutboxMiddleware, outbound_lane, send_to_admins
+
+
+def _fake_request(calls: list, delay: float = 0.0):
+    async def make_request(bot, method):
+        calls.append((time.monotonic(), method))
+        await asyncio.sleep(delay)
+        return f"response-{len(calls)}"
+
+    return make_request
+
+
+@pytest.mark.asyncio
+async def test_non_chat_methods_bypass_limits() -> None:
+    """Calls without chat_id (e.g. answerCallbackQuery) are sent immediately."""
+    outbox = OutboxMiddleware(global_rate=1, chat_rate=1, chat_burst=1)
+    calls: list = []
+
+    for _ in range(5):
+        await outbox(_fake_request(calls), MagicMock(), AnswerCallbackQuery(callback_query_id="1"))
+
+    assert len(calls) == 5
+    assert outbox.stats()["sent"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_chat_rate_is_enforced() -> None:
+    """Messages to one chat beyond the burst are spaced by the chat rate."""
+    outbox = OutboxMiddleware(global_rate=1000, chat_rate=20, chat_burst=1)
+    calls: list = []
+
+    for i in range(3):
+        await outbox(_fake_request(calls), MagicMock(), SendMessage(chat_id=1, text=str(i)))
+
+    elapsed = calls[-1][0] - calls[0][0]
+    assert elapsed >= 2 / 20 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_identical_queued_messages_are_coalesced() -> None:
+    """Concurrent identical messages to the same chat result in one request."""
+    outbox = OutboxMiddleware(global_rate=1000, chat_rate=1000, chat_burst=10)
+    calls: list = []
+    make_request = _fake_request(calls, delay=0.05)
+
+    results = await asyncio.gather(
+        *(outbox(make_request, MagicMock(), SendMessage(chat_id=1, text="menu")) for _ in range(3))
+    )
+
+    assert len(calls) == 1
+    assert results == ["response-1"] * 3
+    assert outbox.stats()["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_retried() -> None:
+    """Flood control errors should be retried after the requested delay."""
+    outbox = OutboxMiddleware(global_rate=1000, chat_rate=1000, chat_burst=10)
+    method = SendMessage(chat_id=1, text="hi")
+    attempts = []
+
+    async def make_request(bot, m):
+        attempts.append(m)
+        if len(attempts) == 1:
+            raise TelegramRetryAfter(method=m, message="Too Many Requests", retry_after=0)
+        return "ok"
+
+    assert await outbox(make_request, MagicMock(), method) == "ok"
+    assert len(attempts) == 2
+    assert outbox.stats()["retried"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_overtakes_bulk_backlog() -> None:
+    """Interactive requests should not wait behind a queued broadcast."""
+    queue = OutboundQueue(rate=50)
+    order: list[str] = []
+
+    async def waiter(name: str, lane: Lane) -> None:
+        await queue.wait_turn(lane)
+        order.append(name)
+
+    # The first second's worth of tokens is a burst; the rest is rate limited
+    bulk = [asyncio.create_task(waiter(f"bulk{i}", Lane.BULK)) for i in range(65)]
+    await asyncio.sleep(0.03)
+    interactive = [asyncio.create_task(waiter(f"user{i}", Lane.INTERACTIVE)) for i in range(3)]
+    await asyncio.gather(*bulk, *interactive)
+
+    last_user = max(order.index(f"user{i}") for i in range(3))
+    bulk_after_users = len(order) - last_user - 1
+    assert bulk_after_users >= 8
+    assert queue.released[Lane.BULK] == 65
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_lane_is_taken_from_context() -> None:
+    """Requests made inside outbound_lane() are queued in that lane."""
+    outbox = OutboxMiddleware(global_rate=1000, chat_rate=1000, chat_burst=10)
+    calls: list = []
+
+    with outbound_lane(Lane.BULK):
+        await outbox(_fake_request(calls), MagicMock(), SendMessage(chat_id=1, text="news"))
+    await outbox(_fake_request(calls), MagicMock(), SendMessage(chat_id=1, text="reply"))
+
+    stats = outbox.lane_stats()
+    assert stats["bulk"]["released"] == 1
+    assert stats["interactive"]["released"] == 1
+    assert stats["admin"]["depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_send_to_admins_is_concurrent_and_counts_failures() -> None:
+    """Admin fan-out should not stop on failures and report delivered count."""
+    sent = []
+
+    async def send_message(chat_id, text, **kwargs):
+        if chat_id == 2:
+            raise RuntimeError("blocked")
+        sent.append(chat_id)
+
+    bot = MagicMock()
+    bot.send_message = send_message
+
+    with patch("src.bot.outbox.settings") as mock_settings:
+        mock_settings.admin_ids = [1, 2, 3]
+        delivered = await send_to_admins(bot, "hello")
+
+    assert delivered == 2
+    assert sorted(sent) == [1, 3]
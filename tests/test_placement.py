@@ -0,0 +1,76 @@
+"""Tests for placement of new clients on a protocol's inbound pool."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.bot.config import Protocol
+from src.services import XUIApi
+from src.services.placement import (
+    InboundLoad,
+    choose_inbound,
+    inbound_loads,
+    observe_inbounds,
+    place_client,
+)
+
+
+def _protocol(**kwargs) -> Protocol:
+    return Protocol(name="vless", label="VLESS", description="", **kwargs)
+
+
+def _stats(clients: int, traffic: int = 0, enable: bool = True) -> dict:
+    return {"clients": clients, "traffic": traffic, "enable": enable}
+
+
+def test_single_inbound_becomes_pool_of_one() -> None:
+    """Existing configs with one inbound_id keep working."""
+    assert _protocol(inbound_id=1).inbound_ids == [1]
+    pooled = _protocol(inbound_ids=[3, 4])
+    assert pooled.inbound_id == 3
+    with pytest.raises(ValueError):
+        _protocol()
+    with pytest.raises(ValueError):
+        _protocol(inbound_id=1, placement="random")
+
+
+def test_fewest_clients_policy_respects_capacity() -> None:
+    """The inbound with fewest clients wins; full inbounds are skipped."""
+    protocol = _protocol(inbound_ids=[1, 2, 3], inbound_capacity=10)
+    loads = [InboundLoad(1, 5, 0.0), InboundLoad(2, 3, 0.0), InboundLoad(3, 3, 0.0)]
+    assert choose_inbound(protocol, loads) == 2
+    assert choose_inbound(protocol, [InboundLoad(1, 10, 0.0), InboundLoad(2, 9, 0.0)]) == 2
+    assert choose_inbound(protocol, [InboundLoad(1, 10, 0.0)]) is None
+
+
+def test_lowest_traffic_policy_uses_recent_counters() -> None:
+    """Recent throughput comes from counter deltas, not lifetime totals."""
+    protocol = _protocol(inbound_ids=[11, 12], placement="lowest_traffic")
+    # Inbound 11 has more lifetime traffic but is idle now; 12 is busy
+    observe_inbounds("test-node", {11: _stats(1, 10_000), 12: _stats(1, 0)}, at=0)
+    observe_inbounds("test-node", {11: _stats(1, 10_000), 12: _stats(1, 5_000)}, at=10)
+
+    loads = inbound_loads("test-node", protocol, {11: _stats(8), 12: _stats(1)})
+    assert [(load.inbound_id, load.traffic) for load in loads] == [(11, 0.0), (12, 4_000.0)]
+    assert choose_inbound(protocol, loads) == 11
+
+
+def test_disabled_and_missing_inbounds_are_not_candidates() -> None:
+    """Only enabled inbounds the panel reports are considered."""
+    protocol = _protocol(inbound_ids=[1, 2, 3])
+    loads = inbound_loads("other-node", protocol, {1: _stats(0, enable=False), 2: _stats(7)})
+    assert [load.inbound_id for load in loads] == [2]
+
+
+@pytest.mark.asyncio
+async def test_place_client_reads_inbounds_from_panel() -> None:
+    """A pooled protocol places by the node's current inbound stats."""
+    status = {"online": True, "inbounds_stats": {1: _stats(4), 2: _stats(2)}}
+    async with XUIApi() as api:
+        with patch.object(api, "get_server_status", AsyncMock(return_value=status)) as get:
+            assert await place_client(api, _protocol(inbound_id=1)) == 1
+            assert get.await_count == 0
+
+            assert await place_client(api, _protocol(inbound_ids=[1, 2])) == 2
+            get.return_value = {**status, "online": False}
+            assert await place_client(api, _protocol(inbound_ids=[1, 2])) is None
@@ -0,0 +1,32 @@
+"""Tests for streaming ZIP export of presets."""
+
+import io
+import zipfile
+
+from src.services.preset_export import iter_presets_zip
+
+
+def test_zip_contains_configs_and_qr_codes() -> None:
+    """Each preset gets its config file; URI presets also get a QR image."""
+    configs = [
+        ("Phone", {"type": "uri", "value": "vless://abc@host:443#Phone"}),
+        ("Laptop / sing-box", {"type": "json", "value": '{"outbounds": []}'}),
+    ]
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(iter_presets_zip(configs))))
+
+    assert archive.namelist() == ["01-Phone.txt", "01-Phone.png", "02-Laptop_sing-box.json"]
+    assert archive.read("01-Phone.txt") == b"vless://abc@host:443#Phone"
+    assert archive.read("01-Phone.png").startswith(b"\x89PNG")
+    assert archive.testzip() is None
+
+
+def test_zip_is_streamed_per_entry() -> None:
+    """Archive bytes should be yielded after every preset, not only at the end."""
+    configs = [(f"p{i}", {"type": "json", "value": "{}"}) for i in range(5)]
+
+    chunks = list(iter_presets_zip(configs))
+
+    # One chunk per entry plus the central directory
+    assert len(chunks) == 6
+    assert all(chunks)
@@ -0,0 +1,126 @@
+"""Tests for latency probes and node recommendations."""
+
+import pytest
+
+from src.bot.config import Node, settings
+from src.database.models import User
+from src.services import VPNService
+from src.services.nodes import pick_node
+from src.services.probes import ProbeService, aggregate, fastest, per_user, probe_targets
+
+NODES = [
+    Node(name="de", api_url="http://de:2053", username="a", password="b", host="de.example.com"),
+    Node(
+        name="nl",
+        api_url="http://nl:2053",
+        username="a",
+        password="b",
+        host="nl.example.com",
+        label="Нидерланды",
+        probe_url="https://nl.example.com/ping",
+    ),
+]
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    monkeypatch.setattr(settings, "nodes", list(NODES))
+    monkeypatch.setattr(settings, "probe_min_samples", 2)
+    monkeypatch.setattr(settings, "rebalance_tolerance", 5)
+    return NODES
+
+
+def test_probe_targets_default_to_node_host(nodes) -> None:
+    """Nodes without a probe URL are timed against their host."""
+    assert [(node.name, url) for node, url in probe_targets()] == [
+        ("de", "https://de.example.com/"),
+        ("nl", "https://nl.example.com/ping"),
+    ]
+
+
+def test_fastest_uses_median_and_skips_unreliable_nodes(nodes) -> None:
+    """The lowest median wins among nodes with enough successful probes."""
+    stats = aggregate([("de", 80.0), ("de", 90.0), ("de", 400.0), ("nl", 40.0), ("nl", None)])
+    assert stats["de"].median_ms == 90.0
+    assert (stats["nl"].samples, stats["nl"].failures) == (1, 1)
+
+    # nl fails as often as it answers
+    assert fastest(stats) == (nodes[0], 90.0)
+
+    stats = aggregate([("de", 80.0), ("de", 90.0), ("nl", 40.0), ("gone", 1.0)])
+    assert fastest(stats) == (nodes[1], 40.0)
+    assert fastest(stats, min_samples=2) == (nodes[0], 85.0)
+
+
+@pytest.mark.asyncio
+async def test_one_user_cannot_take_over_region(session_maker, nodes) -> None:
+    """RTTs <= 0 are dropped and repeated runs of one user count once per node."""
+    assert per_user([(1, "nl", 1.0), (1, "nl", 3.0), (1, "nl", None), (2, "nl", None)]) == [
+        ("nl", 2.0),
+        ("nl", None),
+    ]
+
+    async with session_maker() as session:
+        users = [User(telegram_id=i, full_name=f"User {i}") for i in range(1, 5)]
+        session.add_all(users)
+        await session.commit()
+
+        service = ProbeService(session)
+        await service.record(users[0], "Europe/Berlin", {"de": 30.0, "nl": 80.0})
+        await service.record(users[1], "Europe/Berlin", {"de": 40.0, "nl": 90.0})
+        assert await service.record(users[2], "Europe/Berlin", {"nl": 0.0, "de": -5.0}) == 0
+        for _ in range(10):
+            await service.record(users[2], "Europe/Berlin", {"nl": 1.0})
+
+        recommendation = await service.recommend(users[3], "Europe/Berlin")
+        assert (recommendation.node, recommendation.rtt_ms) == (nodes[0], 35.0)
+
+
+@pytest.mark.asyncio
+async def test_recommend_prefers_own_probes_then_region(session_maker, nodes) -> None:
+    """A user without probes gets the fastest node of their region."""
+    async with session_maker() as session:
+        first, second, third = (User(telegram_id=i, full_name=f"User {i}") for i in range(1, 4))
+        session.add_all([first, second, third])
+        await session.commit()
+
+        service = ProbeService(session)
+        assert await service.record(first, "Europe/Moscow", {"de": 30.0, "nl": 70.0}) == 2
+        assert await service.record(second, "Europe/Moscow", {"de": 50.0, "x": 1.0}) == 1
+        assert await service.record(second, "Europe/Moscow", {"nl": 20_000.0}) == 1
+
+        own = await service.recommend(first, "Asia/Tokyo")
+        assert (own.node, own.rtt_ms, own.source) == (nodes[0], 30.0, "user")
+
+        regional = await service.recommend(third, "Europe/Moscow")
+        assert (regional.node, regional.rtt_ms, regional.source) == (nodes[0], 40.0, "region")
+
+        # The timed-out nl probe leaves it one successful result short in Moscow
+        # and nothing was probed from Tokyo
+        assert await service.recommend(third, "Asia/Tokyo") is None
+        assert await service.recommend(third) is None
+
+
+@pytest.mark.asyncio
+async def test_placement_uses_region_user_last_probed_from(session_maker, nodes) -> None:
+    """A new user whose own probes all failed is placed by their region's results."""
+    async with session_maker() as session:
+        users = [User(telegram_id=i, full_name=f"User {i}") for i in range(1, 4)]
+        session.add_all(users)
+        await session.commit()
+
+        service = ProbeService(session)
+        await service.record(users[0], "Asia/Tokyo", {"de": 250.0, "nl": 90.0})
+        await service.record(users[1], "Asia/Tokyo", {"de": 260.0, "nl": 110.0})
+        await service.record(users[2], "Asia/Tokyo", {"de": None, "nl": None})
+
+        recommendation = await service.recommend(users[2])
+        assert (recommendation.node, recommendation.source) == (nodes[1], "region")
+        assert await VPNService(session)._pick_node(users[2]) == nodes[1]
+
+
+def test_pick_node_prefers_recommended_node_within_tolerance(nodes) -> None:
+    """The fastest node is used unless it is much more loaded than the others."""
+    assert pick_node({"de": 3, "nl": 0}, preferred=nodes[0]) == nodes[0]
+    assert pick_node({"de": 6, "nl": 0}, preferred=nodes[0]) == nodes[1]
+    assert pick_node({"de": 3, "nl": 0}) == nodes[1]
@@ -0,0 +1,45 @@
+"""Tests for the on-demand sampling profiler."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.observability.profiler import ProfilerBusyError, profile
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_profile_returns_collapsed_stacks() -> None:
+    """Stacks of the busy thread show up as 'frame;frame count' lines."""
+    worker = asyncio.create_task(asyncio.to_thread(_busy_loop, 0.3))
+    stacks, samples = await profile(0.2, interval=0.002)
+    await worker
+
+    assert samples > 10
+    lines = stacks.splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    busy = [line for line in lines if "test_profiler:_busy_loop:" in line]
+    assert busy
+    # Root frame first, leaf last
+    assert ":_busy_loop:" in busy[0].split(";")[-1]
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in busy) > samples // 2
+
+
+@pytest.mark.asyncio
+async def test_only_one_profile_at_a_time() -> None:
+    """A second profile while one is running is rejected."""
+    first = asyncio.create_task(profile(0.1))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ProfilerBusyError):
+        await profile(0.1)
+
+    await first
+    # The lock is released afterwards
+    await profile(0.01)
@@ -0,0 +1,133 @@
+"""Query budgets for the main bot and Mini App flows.
+
+Each flow runs against a database holding several users, so per-row lazy
+loads (N+1) show up as extra or repeated statements.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+from aiogram.types import CallbackQuery, Message
+from aiogram.types import User as TgUser
+
+from src.api.main import get_me
+from src.database.models import ConnectionPreset, RequestStatus, User, VpnProfile, VPNRequest
+from src.database.repositories import UserRepository
+from src.handlers.admin import admin_requests
+from src.handlers.user import cmd_link, cmd_start
+from src.observability.queries import QueryBudgetExceeded, QueryRecorder
+
+PROFILE_DATA = {
+    "client_id": "550e8400-e29b-41d4-a716-446655440000",
+    "email": "user",
+    "port": 443,
+    "remark": "VLESS-Reality",
+    "reality": {"public_key": "key", "sni": "www.google.com", "short_id": "1f38d4f5"},
+}
+
+
+@pytest_asyncio.fixture
+async def seeded(session_maker):
+    """Five users, each with a VPN profile, two presets and a pending request."""
+    async with session_maker() as session:
+        for i in range(1, 6):
+            user = User(telegram_id=1000 + i, full_name=f"User {i}", username=f"user{i}")
+            profile = VpnProfile(user=user, protocol_name="vless", profile_data=PROFILE_DATA)
+            session.add_all(
+                [
+                    user,
+                    profile,
+                    ConnectionPreset(
+                        user=user, profile=profile, name="a", app_type="x", format="uri"
+                    ),
+                    ConnectionPreset(
+                        user=user, profile=profile, name="b", app_type="x", format="uri"
+                    ),
+                    VPNRequest(user=user, status=RequestStatus.PENDING),
+                ]
+            )
+        await session.commit()
+    return session_maker
+
+
+def _message(telegram_id: int) -> MagicMock:
+    message = MagicMock(spec=Message)
+    message.from_user = TgUser(id=telegram_id, is_bot=False, first_name="User", username="user1")
+    message.answer = AsyncMock()
+    message.answer_photo = AsyncMock()
+    return message
+
+
+@pytest.mark.asyncio
+async def test_start_budget(seeded, query_recorder) -> None:
+    """/start for a returning user whose name changed: load, update, pending check."""
+    query_recorder.reset()
+    async with seeded() as session:
+        await cmd_start(_message(1001), session, AsyncMock())
+
+    query_recorder.check(max_queries=4)
+
+
+@pytest.mark.asyncio
+async def test_link_budget(seeded, query_recorder) -> None:
+    """/link reads the user and the active profile only."""
+    query_recorder.reset()
+    async with seeded() as session:
+        with patch("src.handlers.user.generate_qr_code") as qr:
+            qr.return_value.read.return_value = b"png"
+            await cmd_link(_message(1001), session)
+
+    query_recorder.check(max_queries=2)
+
+
+@pytest.mark.asyncio
+async def test_me_budget(seeded, query_recorder) -> None:
+    """GET /me: authenticated user plus all presets with their profiles."""
+    query_recorder.reset()
+    async with seeded() as session:
+        # What get_current_user does for the request
+        user = await UserRepository(session).get_by_telegram_id(1001)
+        with (
+            patch("src.api.main._load_available_snis", AsyncMock(return_value=[])),
+            patch("src.api.main._load_traffic", AsyncMock(return_value=None)),
+        ):
+            response = await get_me(user=user, session=session)
+
+    assert len(response.presets) == 2
+    query_recorder.check(max_queries=3)
+
+
+@pytest.mark.asyncio
+async def test_admin_requests_budget(seeded, query_recorder) -> None:
+    """Pending requests are joined with their users; profiles come in one batch."""
+    callback = MagicMock(spec=CallbackQuery)
+    callback.answer = AsyncMock()
+    callback.message = MagicMock(spec=Message)
+    callback.message.edit_text = AsyncMock()
+    callback.message.answer = AsyncMock()
+
+    query_recorder.reset()
+    async with seeded() as session:
+        await admin_requests(callback, session)
+
+    assert callback.message.answer.await_count == 5
+    query_recorder.check(max_queries=2)
+
+
+@pytest.mark.asyncio
+async def test_recorder_flags_per_row_lazy_loads(seeded) -> None:
+    """Loading a relationship row by row is reported as repeated statements."""
+    async with seeded() as session:
+        with QueryRecorder(seeded.kw["bind"]) as recorder:
+            requests = (await session.execute(VPNRequest.__table__.select())).all()
+            for row in requests:
+                await session.get(User, row.user_id)
+
+    # One user and one profiles query per request
+    assert recorder.count == 11
+    assert list(recorder.repeated().values()) == [5, 5]
+    with pytest.raises(QueryBudgetExceeded, match="possible N\\+1"):
+        recorder.check()
+    with pytest.raises(QueryBudgetExceeded, match="at most 3 queries, got 11"):
+        recorder.check(max_queries=3, allow_repeated=True)
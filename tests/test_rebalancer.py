@@ -0,0 +1,219 @@
+"""Tests for planning and executing client rebalancing."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.bot.config import Node, Protocol, settings
+from src.database.models import RequestStatus, User, VpnProfile, VPNRequest
+from src.database.repositories import UserRepository
+from src.services import VPNService, XUIApi, xui_api
+from src.services.rebalancer import Migration, Rebalancer, Slot, SlotLoad, plan_rebalance
+
+A, B, C = Slot("de", 1), Slot("de", 2), Slot("nl", 1)
+
+
+def _load(slot: Slot, count: int, start: int = 0, **kwargs) -> SlotLoad:
+    return SlotLoad(slot, list(range(start, start + count)), **kwargs)
+
+
+def test_plan_moves_from_most_to_least_loaded() -> None:
+    """Moves go from the fullest to the emptiest slot until within tolerance."""
+    slots = [_load(A, 10), _load(B, 2, start=100), _load(C, 3, start=200)]
+    migrations = plan_rebalance("vless", slots, tolerance=1, limit=50)
+
+    assert [(m.source, m.target) for m in migrations] == [(A, B), (A, B), (A, C), (A, B), (A, C)]
+    assert migrations[0] == Migration(0, "vless", A, B)
+    # Input is not modified
+    assert len(slots[0].profile_ids) == 10
+
+
+def test_plan_is_empty_when_balanced_or_within_tolerance() -> None:
+    """No moves for balanced slots, or differences within the tolerance."""
+    assert plan_rebalance("vless", [_load(A, 5), _load(B, 5)], tolerance=0, limit=50) == []
+    assert plan_rebalance("vless", [_load(A, 7), _load(B, 3)], tolerance=5, limit=50) == []
+    # One extra client can't be split
+    assert plan_rebalance("vless", [_load(A, 6), _load(B, 5)], tolerance=0, limit=50) == []
+
+
+def test_plan_respects_weight_capacity_and_limit() -> None:
+    """Weights set target shares; full slots and nodes get nothing; limit caps moves."""
+    weighted = plan_rebalance("vless", [_load(A, 9), _load(C, 0, weight=2)], tolerance=0, limit=50)
+    assert len(weighted) == 6
+
+    capped = plan_rebalance("vless", [_load(A, 10), _load(B, 0, capacity=2)], tolerance=0, limit=50)
+    assert len(capped) == 2
+
+    room = {"nl": 1}
+    no_room = plan_rebalance("vless", [_load(A, 10), _load(C, 0)], 0, 50, node_room=room)
+    assert len(no_room) == 1
+    assert room == {"nl": 1}
+
+    assert len(plan_rebalance("vless", [_load(A, 10), _load(B, 0)], 0, limit=3)) == 3
+
+
+def test_plan_prefers_quieter_target_on_ties() -> None:
+    """Between equally loaded targets the one with less recent traffic wins."""
+    slots = [_load(A, 4), _load(B, 0, traffic=5e6), _load(C, 0, traffic=1e3)]
+    [first, *_] = plan_rebalance("vless", slots, tolerance=0, limit=1)
+    assert first.target == C
+
+
+@pytest.mark.asyncio
+async def test_run_once_migrates_and_notifies(session_maker, monkeypatch) -> None:
+    """Clients move to the empty inbound in batches; users get their new link once."""
+    monkeypatch.setattr(
+        settings,
+        "nodes",
+        [Node(name="de", api_url="http://de", username="a", password="b", host="de.example")],
+    )
+    monkeypatch.setattr(
+        settings,
+        "protocols",
+        [Protocol(name="vless", inbound_ids=[1, 2], label="VLESS", description="")],
+    )
+    async with session_maker() as session:
+        for i in range(4):
+            user = User(telegram_id=10 + i, full_name=f"User {i}", username=f"user{i}")
+            data = {"node": "de", "inbound_id": 1, "email": f"user{i}", "client_id": "old"}
+            session.add(
+                VpnProfile(
+                    user=user, protocol_name="vless", profile_data=data, settings={"sni": "a"}
+                )
+            )
+        await session.commit()
+
+    async def create_client(inbound_id, email, protocol):
+        return {"client_id": "new", "email": email, "protocol": protocol, "inbound_id": inbound_id}
+
+    protocol_settings = {"port": 8443, "remark": "r", "reality": {"sni_options": ["b"], "sni": "b"}}
+    notify = AsyncMock()
+    rebalancer = Rebalancer(
+        session_maker, interval=0, tolerance=0, max_migrations=10, batch_size=1, batch_delay=0
+    )
+    with (
+        patch.object(XUIApi, "create_client", AsyncMock(side_effect=create_client)) as create,
+        patch.object(XUIApi, "get_protocol_settings", AsyncMock(return_value=protocol_settings)),
+        patch.object(XUIApi, "delete_client", AsyncMock(return_value=True)) as delete,
+    ):
+        assert await rebalancer.run_once(notify) == 2
+
+    assert create.await_count == delete.await_count == 2
+    # Same panel: the new client needs an email distinct from the old one
+    assert {call.args[1] for call in create.await_args_list} == {"user2-2", "user3-2"}
+    assert {call.args for call in delete.await_args_list} == {(1, "user2"), (1, "user3")}
+    assert sorted(call.args[0] for call in notify.await_args_list) == [12, 13]
+    assert "de.example:8443" in notify.await_args.args[1]
+
+    async with session_maker() as session:
+        profiles = await UserRepository(session).get_active_profiles()
+    moved = [p for p in profiles if p.profile_data["inbound_id"] == 2]
+    assert len(moved) == 2
+    assert all(p.profile_data["client_id"] == "new" and p.settings == {} for p in moved)
+    assert await rebalancer.plan() == []
+
+
+def _fake_panel(clients: dict[str, list[dict]]) -> web.Application:
+    """3X-UI panels ("/de", "/nl") with one VLESS inbound each."""
+    readers: list[dict] = []
+    both_read = asyncio.Event()
+
+    def inbound(name: str) -> dict:
+        return {
+            "id": 1,
+            "port": 443,
+            "remark": name,
+            "protocol": "vless",
+            "settings": json.dumps({"clients": clients[name]}),
+            "streamSettings": json.dumps({"realitySettings": {"serverNames": ["a.com"]}}),
+        }
+
+    async def login(_):
+        return web.json_response({"success": True})
+
+    async def get(request):
+        name = request.match_info["node"]
+        snapshot = inbound(name)
+        if name == "de" and len(readers) < 2:
+            # Hold the first two reads of "de" until both have their snapshot
+            readers.append(snapshot)
+            if len(readers) == 2:
+                both_read.set()
+            await asyncio.wait_for(both_read.wait(), 1)
+        return web.json_response({"success": True, "obj": snapshot})
+
+    async def update(request):
+        # Replaces the whole client list, as the panel does
+        data = await request.json()
+        clients[request.match_info["node"]] = json.loads(data["settings"])["clients"]
+        return web.json_response({"success": True})
+
+    async def add_client(request):
+        data = await request.json()
+        clients[request.match_info["node"]].extend(json.loads(data["settings"])["clients"])
+        return web.json_response({"success": True})
+
+    async def del_client(request):
+        name, client_id = request.match_info["node"], request.match_info["client"]
+        clients[name] = [c for c in clients[name] if c["id"] != client_id]
+        return web.json_response({"success": True})
+
+    app = web.Application()
+    app.router.add_post("/{node}/login", login)
+    app.router.add_get("/{node}/api/inbounds/get/1", get)
+    app.router.add_post("/{node}/api/inbounds/update/1", update)
+    app.router.add_post("/{node}/api/inbounds/addClient", add_client)
+    app.router.add_post("/{node}/api/inbounds/1/delClient/{client}", del_client)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_move_and_approval_on_same_inbound_keep_both_clients(
+    session_maker, monkeypatch
+) -> None:
+    """A migration off an inbound doesn't drop a client added there at the same time."""
+    xui_api._last_known.clear()
+    clients = {"de": [{"id": "old", "email": "mover"}], "nl": []}
+    monkeypatch.setattr(
+        settings,
+        "protocols",
+        [Protocol(name="vless", inbound_id=1, label="VLESS", description="")],
+    )
+
+    async with TestServer(_fake_panel(clients)) as server:
+
+        def node(name: str, **kwargs) -> Node:
+            url = str(server.make_url(f"/{name}"))
+            return Node(name=name, api_url=url, base_path="", username="a", password="b", **kwargs)
+
+        # New users go to "de" (nl only takes overflow), the mover goes to "nl"
+        monkeypatch.setattr(
+            settings, "nodes", [node("de", host="de"), node("nl", host="nl", weight=0)]
+        )
+
+        async with session_maker() as session:
+            mover = User(telegram_id=1, full_name="Mover", username="mover")
+            newcomer = User(telegram_id=2, full_name="New", username="newcomer")
+            data = {"node": "de", "inbound_id": 1, "email": "mover", "client_id": "old"}
+            profile = VpnProfile(user=mover, protocol_name="vless", profile_data=data)
+            request = VPNRequest(user=newcomer, status=RequestStatus.PENDING)
+            session.add_all([mover, newcomer, profile, request])
+            await session.commit()
+
+            rebalancer = Rebalancer(session_maker, 60, 0, 10, 1, 0)
+            migration = Migration(profile.id, "vless", Slot("de", 1), Slot("nl", 1))
+            try:
+                moved, (approved, _) = await asyncio.gather(
+                    rebalancer._move(migration, AsyncMock()),
+                    VPNService(session).approve_request(request.id, "vless"),
+                )
+            finally:
+                await xui_api.close_pools()
+
+    assert moved and approved
+    assert [c["email"] for c in clients["de"]] == ["newcomer"]
+    assert [c["email"] for c in clients["nl"]] == ["mover"]
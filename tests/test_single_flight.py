@@ -0,0 +1,166 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.bot.config import Node
+from src.database.models import User
+from src.database.repositories import UserRepository
+from src.services import xui_api
+from src.services.single_flight import SingleFlight
+from src.services.xui_api import XUIApi
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution() -> None:
+    """Callers with the same key get the result of a single call."""
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == [42] * 5
+    assert calls == 1
+    assert flight.stats() == {"calls": 5, "executed": 1, "merged": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_and_later_calls_run_separately() -> None:
+    """Only calls in flight at the same time with the same key are merged."""
+    flight = SingleFlight("test")
+    fetch = AsyncMock(return_value="ok")
+
+    await asyncio.gather(flight.do("a", fetch), flight.do("b", fetch))
+    await flight.do("a", fetch)
+
+    assert fetch.await_count == 3
+    assert flight.merged == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller() -> None:
+    """A failing call raises in all callers waiting for it."""
+    flight = SingleFlight("test")
+
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("panel down")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others() -> None:
+    """Cancelling the first caller leaves the shared call running."""
+    flight = SingleFlight("test")
+
+    async def fetch() -> str:
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_xui_protocol_settings_are_fetched_once() -> None:
+    """Concurrent get_protocol_settings calls make one panel request."""
+    xui_api._last_known.clear()
+    inbound = {"port": 443, "remark": "main", "protocol": "trojan"}
+    response = (200, {"success": True, "obj": inbound})
+
+    async def slow_request(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return response
+
+    async with XUIApi() as api:
+        api._logged_in = True
+        with patch.object(api, "_request", AsyncMock(side_effect=slow_request)) as request:
+            results = await asyncio.gather(*(api.get_protocol_settings(1) for _ in range(4)))
+
+    assert request.await_count == 1
+    assert results == [{"port": 443, "remark": "main"}] * 4
+
+
+@pytest.mark.asyncio
+async def test_merged_count_does_not_depend_on_first_callers_session(session_maker) -> None:
+    """A joined caller gets the count although the first caller's session is closed."""
+    async with session_maker() as session:
+        session.add_all([User(telegram_id=1, full_name="A"), User(telegram_id=2, full_name="B")])
+        await session.commit()
+
+    first_session = session_maker()
+    async with session_maker() as second_session:
+        first = asyncio.create_task(UserRepository(first_session).count_all())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(UserRepository(second_session).count_all())
+        await asyncio.sleep(0)
+        first.cancel()
+        await first_session.close()
+
+        assert await second == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_read_survives_cancelled_leader() -> None:
+    """A follower gets the result although the caller that started the read timed out."""
+    xui_api._last_known.clear()
+    inbound = {"port": 443, "remark": "main", "protocol": "trojan"}
+
+    async def login(_):
+        await asyncio.sleep(0.05)
+        return web.json_response({"success": True})
+
+    app = web.Application()
+    app.router.add_post("/login", login)
+    app.router.add_get(
+        "/api/inbounds/get/1", lambda _: web.json_response({"success": True, "obj": inbound})
+    )
+
+    async with TestServer(app) as server:
+        node = Node(
+            name="shared",
+            api_url=str(server.make_url("")),
+            base_path="",
+            username="a",
+            password="b",
+            host="localhost",
+        )
+
+        async def leader() -> None:
+            async with XUIApi(node) as api:
+                # Times out while the shared read is still logging in
+                await asyncio.wait_for(api.get_protocol_settings(1), 0.01)
+
+        async def follower() -> dict:
+            async with XUIApi(node) as api:
+                return await api.get_protocol_settings(1)
+
+        try:
+            first = asyncio.create_task(leader())
+            await asyncio.sleep(0)
+            second = asyncio.create_task(follower())
+            with pytest.raises(TimeoutError):
+                await first
+            assert await second == {"port": 443, "remark": "main"}
+        finally:
+            await xui_api.close_pools()
@@ -0,0 +1,85 @@
+"""Tests for queue-based JSON logging."""
+
+import io
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+
+import pytest
+
+from src.observability.logs import ContextQueueHandler, JsonFormatter, log_context
+from src.observability.timing import measure_update
+
+
+class _ThreadRecordingHandler(logging.StreamHandler):
+    def __init__(self, stream: io.StringIO) -> None:
+        super().__init__(stream)
+        self.threads: set[str] = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.threads.add(threading.current_thread().name)
+        super().emit(record)
+
+
+@pytest.fixture
+def json_log():
+    """Logger routed through the queue handler; yields (logger, read_lines, output)."""
+    stream = io.StringIO()
+    output = _ThreadRecordingHandler(stream)
+    output.setFormatter(JsonFormatter())
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = QueueListener(log_queue, output)
+    listener.start()
+
+    logger = logging.getLogger("tests.structured")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = ContextQueueHandler(log_queue)
+    logger.addHandler(handler)
+
+    def read_lines() -> list[dict]:
+        listener.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield logger, read_lines, output
+    logger.removeHandler(handler)
+
+
+def test_records_carry_update_context(json_log) -> None:
+    """Fields of the update being handled are captured when the record is logged."""
+    logger, read_lines, _ = json_log
+
+    logger.info("outside")
+    with measure_update() as timing, log_context(update_id=7, user_id=42):
+        timing.handler = "user.cmd_link"
+        logger.info("link for %s", "user", extra={"protocol": "vless"})
+
+    outside, inside = read_lines()
+    assert outside["msg"] == "outside"
+    assert "update_id" not in outside
+    assert inside["msg"] == "link for user"
+    assert inside["level"] == "INFO"
+    assert inside["logger"] == "tests.structured"
+    assert inside["update_id"] == 7
+    assert inside["user_id"] == 42
+    assert inside["handler"] == "user.cmd_link"
+    assert inside["duration_ms"] >= 0
+    assert inside["protocol"] == "vless"
+
+
+def test_exception_and_formatting_in_listener_thread(json_log) -> None:
+    """Tracebacks are rendered; output is written by the listener, not the caller."""
+    logger, read_lines, output = json_log
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    [line] = read_lines()
+
+    assert line["msg"] == "failed"
+    assert "ValueError: boom" in line["exc"]
+    assert output.threads
+    assert threading.current_thread().name not in output.threads
@@ -0,0 +1,68 @@
+"""Tests for the callback throttling middleware."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import CallbackQuery
+
+from src.bot.middlewares.throttling import ThrottlingMiddleware
+
+
+def _callback(data: str, user_id: int = 1) -> MagicMock:
+    callback = MagicMock(spec=CallbackQuery)
+    callback.data = data
+    callback.from_user = MagicMock(id=user_id)
+    callback.answer = AsyncMock()
+    return callback
+
+
+@pytest.mark.asyncio
+async def test_repeated_press_within_interval_is_dropped() -> None:
+    """A second press inside the action interval is answered, not handled."""
+    middleware = ThrottlingMiddleware(intervals={"refresh_stats": 5.0})
+    handler = AsyncMock(return_value="ok")
+
+    first = _callback("refresh_stats")
+    second = _callback("refresh_stats")
+    assert await middleware(handler, first, {}) == "ok"
+    assert await middleware(handler, second, {}) is None
+
+    handler.assert_awaited_once()
+    second.answer.assert_awaited_once()
+    assert middleware.stats() == {"passed": 1, "coalesced": 0, "dropped": 1}
+
+
+@pytest.mark.asyncio
+async def test_in_flight_duplicates_are_coalesced() -> None:
+    """Presses while the same action is running wait for it instead of rerunning."""
+    middleware = ThrottlingMiddleware(intervals={})
+    calls = 0
+
+    async def handler(event, data):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+
+    callbacks = [_callback("refresh_link") for _ in range(3)]
+    await asyncio.gather(*(middleware(handler, c, {}) for c in callbacks))
+
+    assert calls == 1
+    assert middleware.coalesced == 2
+    for duplicate in callbacks[1:]:
+        duplicate.answer.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_other_users_and_actions_are_not_throttled() -> None:
+    """Throttling is per user and per action."""
+    middleware = ThrottlingMiddleware(intervals={"refresh_stats": 5.0})
+    handler = AsyncMock()
+
+    await middleware(handler, _callback("refresh_stats", user_id=1), {})
+    await middleware(handler, _callback("refresh_stats", user_id=2), {})
+    await middleware(handler, _callback("my_link", user_id=1), {})
+    await middleware(handler, _callback("my_link", user_id=1), {})
+
+    assert handler.await_count == 4
+    assert middleware.dropped == 0
@@ -0,0 +1,53 @@
+"""Tests for throughput measurement from traffic counters."""
+
+from src.services.throughput import ThroughputTracker
+from src.utils.formatters import format_speed
+
+
+def test_first_reading_produces_no_sample() -> None:
+    """A single counter reading is not enough to compute a rate."""
+    tracker = ThroughputTracker()
+    tracker.add_counter(1_000_000, at=0.0)
+
+    assert tracker.current is None
+    assert tracker.stats()["samples"] == 0
+
+
+def test_rate_is_computed_from_counter_delta() -> None:
+    """Bytes delta over elapsed time should become bits per second."""
+    tracker = ThroughputTracker()
+    tracker.add_counter(0, at=0.0)
+    tracker.add_counter(12_500_000, at=10.0)  # 12.5 MB in 10 s
+
+    assert tracker.current == 10_000_000  # 10 Mbit/s
+
+
+def test_counter_reset_is_ignored() -> None:
+    """A counter going backwards (traffic reset) must not create a sample."""
+    tracker = ThroughputTracker()
+    tracker.add_counter(5_000, at=0.0)
+    tracker.add_counter(1_000, at=1.0)
+
+    assert tracker.current is None
+
+
+def test_peak_and_p95_over_window() -> None:
+    """Peak and p95 should be taken over the rolling window only."""
+    tracker = ThroughputTracker(window=20)
+    total = 0
+    tracker.add_counter(total, at=0.0)
+    for second in range(1, 26):
+        total += second * 1000
+        tracker.add_counter(total, at=float(second))
+
+    # Samples 6..25 kB/s remain in the window
+    assert tracker.stats()["samples"] == 20
+    assert tracker.peak == 25_000 * 8
+    assert tracker.p95 == 24_000 * 8
+
+
+def test_format_speed() -> None:
+    """Speeds should be rendered with sensible units."""
+    assert format_speed(None) == "измеряется..."
+    assert format_speed(512_000) == "512 Кбит/с"
+    assert format_speed(85_400_000) == "85.4 Мбит/с"
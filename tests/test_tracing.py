@@ -0,0 +1,137 @@
+"""Tests for tracing spans and OTLP/JSON export."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.observability.tracing import (
+    FileSpanExporter,
+    Span,
+    SpanExporter,
+    SpanKind,
+    configure_tracing,
+    current_span,
+    parse_traceparent,
+    span,
+    traced,
+)
+
+
+class _ListExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+        super().__init__("test", flush_interval=0.01)
+
+    def export(self, request: dict) -> None:
+        self.requests.append(request)
+
+    def spans(self) -> list[dict]:
+        configure_tracing(None)
+        return [
+            s
+            for r in self.requests
+            for rs in r["resourceSpans"]
+            for ss in rs["scopeSpans"]
+            for s in ss["spans"]
+        ]
+
+
+@pytest.fixture
+def exporter():
+    exporter = _ListExporter()
+    configure_tracing(exporter)
+    yield exporter
+    configure_tracing(None)
+
+
+@traced
+class _Service:
+    async def handle(self) -> None:
+        await asyncio.gather(self.load(), self.load())
+
+    async def load(self) -> None:
+        with span("db.query", SpanKind.CLIENT, table="users"):
+            await asyncio.sleep(0)
+
+    def _private(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_spans_form_a_tree_across_await_and_gather(exporter) -> None:
+    """Spans opened inside another (also in gathered tasks) are its children."""
+    with span("update message", SpanKind.SERVER, user_id=1):
+        await _Service().handle()
+
+    spans = {s["spanId"]: s for s in exporter.spans()}
+    by_name: dict[str, list[dict]] = {}
+    for s in spans.values():
+        by_name.setdefault(s["name"], []).append(s)
+
+    [root] = by_name["update message"]
+    [handle] = by_name["_Service.handle"]
+    loads = by_name["_Service.load"]
+    queries = by_name["db.query"]
+    assert "parentSpanId" not in root
+    assert root["kind"] == SpanKind.SERVER.value
+    assert handle["parentSpanId"] == root["spanId"]
+    assert len(loads) == 2 and all(s["parentSpanId"] == handle["spanId"] for s in loads)
+    assert {s["parentSpanId"] for s in queries} == {s["spanId"] for s in loads}
+    assert {s["traceId"] for s in spans.values()} == {root["traceId"]}
+    assert {"key": "table", "value": {"stringValue": "users"}} in queries[0]["attributes"]
+    assert current_span() is None
+
+
+def test_exception_marks_span_as_error(exporter) -> None:
+    """A span left by an exception carries an error status."""
+    with pytest.raises(ValueError), span("xui addClient", SpanKind.CLIENT):
+        raise ValueError("panel down")
+
+    [exported] = exporter.spans()
+    assert exported["status"] == {"code": 2, "message": "ValueError: panel down"}
+
+
+def test_traceparent_joins_caller_trace(exporter) -> None:
+    """A valid traceparent header makes the span a child in the caller's trace."""
+    header = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    parent = parse_traceparent(header)
+    assert parent == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331")
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+    with span("GET /api/me", SpanKind.SERVER, parent) as current:
+        assert isinstance(current, Span)
+        assert current.traceparent.startswith("00-0af7651916cd43dd8448eb211c80319c-")
+
+    [exported] = exporter.spans()
+    assert exported["traceId"] == "0af7651916cd43dd8448eb211c80319c"
+    assert exported["parentSpanId"] == "b7ad6b7169203331"
+
+
+def test_file_exporter_writes_otlp_lines(tmp_path) -> None:
+    """The file exporter appends one OTLP/JSON export request per line."""
+    path = tmp_path / "traces.jsonl"
+    configure_tracing(FileSpanExporter(path, "vpn4friends-bot", flush_interval=0.01))
+    with span("update message"):
+        pass
+    configure_tracing(None)
+
+    [line] = path.read_text().splitlines()
+    [resource_spans] = json.loads(line)["resourceSpans"]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "vpn4friends-bot"}}
+    ]
+    [exported] = resource_spans["scopeSpans"][0]["spans"]
+    assert exported["name"] == "update message"
+    assert int(exported["endTimeUnixNano"]) >= int(exported["startTimeUnixNano"])
+
+
+@pytest.mark.asyncio
+async def test_disabled_tracing_is_a_noop() -> None:
+    """Without an exporter no spans are created."""
+    with span("update message") as current:
+        current.set_attribute("user_id", 1)
+        assert current_span() is None
+    await _Service().handle()
+    assert current_span() is None
@@ -0,0 +1,83 @@
+"""Tests for per-update timing and the slow-update log."""
+
+import asyncio
+import logging
+from datetime import datetime
+
+import pytest
+from aiogram.types import Chat, Message, Update
+from aiogram.types import User as TgUser
+
+from src.bot.middlewares.timing import TimingMiddleware
+from src.observability.timing import current_timing, measure_update, record
+
+USER = TgUser(id=42, is_bot=False, first_name="Test")
+
+
+def _update() -> Update:
+    message = Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=Chat(id=42, type="private"),
+        from_user=USER,
+        text="/stats",
+    )
+    return Update(update_id=7, message=message)
+
+
+def test_record_outside_update_is_ignored() -> None:
+    """Sub-call timings outside an update are dropped."""
+    record("db", 1.0)
+    assert current_timing() is None
+
+    with measure_update() as timing:
+        record("db", 0.5)
+        record("db", 0.25)
+
+    assert timing.spent == {"db": 0.75}
+    assert timing.calls == {"db": 2}
+    assert current_timing() is None
+
+
+@pytest.mark.asyncio
+async def test_slow_update_logged_with_breakdown(caplog) -> None:
+    """An update over the threshold is logged with time per component."""
+    middleware = TimingMiddleware(threshold=0.02)
+
+    async def handler(event, data) -> None:
+        current_timing().handler = "user.cmd_stats"
+
+        async def panel_call() -> None:
+            record("panel", 0.01)
+
+        # Tasks started by the handler report into the same update
+        await asyncio.gather(panel_call(), panel_call())
+        record("db", 0.005)
+        await asyncio.sleep(0.03)
+
+    with caplog.at_level(logging.WARNING, logger="src.bot.middlewares.timing"):
+        await middleware(handler, _update(), {"event_from_user": USER})
+
+    assert middleware.slow == 1
+    [entry] = caplog.records
+    assert "Slow update 7 (message, user.cmd_stats)" in entry.getMessage()
+    slow = entry.slow_update
+    assert slow["user_id"] == 42
+    assert slow["calls"] == {"panel": 2, "db": 1}
+    assert slow["ms"]["panel"] == 20.0
+    assert slow["ms"]["total"] >= 30
+
+
+@pytest.mark.asyncio
+async def test_fast_update_not_logged(caplog) -> None:
+    """Updates under the threshold (or with the log disabled) are not logged."""
+    for threshold in (10.0, 0.0):
+        middleware = TimingMiddleware(threshold=threshold)
+
+        async def handler(event, data) -> str:
+            return "done"
+
+        with caplog.at_level(logging.WARNING, logger="src.bot.middlewares.timing"):
+            assert await middleware(handler, _update(), {}) == "done"
+
+    assert not caplog.records
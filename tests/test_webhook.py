@@ -0,0 +1,86 @@
+"""Tests for webhook mode."""
+
+import asyncio
+import time
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.bot.webhook import create_webhook_app
+
+SECRET = "test-secret"
+
+
+def _update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": update_id, "type": "private"},
+            "text": "hi",
+        },
+    }
+
+
+def _dispatcher(handled: list[int], active: list[int], delay: float = 0.0) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message) -> None:
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        await asyncio.sleep(delay)
+        handled.append(message.message_id)
+        active[0] -= 1
+
+    return dp
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret() -> None:
+    """Requests without the secret token must not reach the dispatcher."""
+    handled: list[int] = []
+    bot = Bot("42:TEST")
+    app = create_webhook_app(bot, _dispatcher(handled, [0, 0]), SECRET, path="/hook")
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post("/hook", json=_update(1))
+        assert response.status == 401
+
+        response = await client.post(
+            "/hook", json=_update(2), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}
+        )
+        assert response.status == 401
+
+    await asyncio.sleep(0.01)
+    assert handled == []
+    await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_limits_concurrent_updates() -> None:
+    """Updates are acknowledged at once but handled at most N at a time."""
+    handled: list[int] = []
+    active = [0, 0]  # current, max
+    bot = Bot("42:TEST")
+    dp = _dispatcher(handled, active, delay=0.02)
+    app = create_webhook_app(bot, dp, SECRET, path="/hook", max_concurrency=2)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+    async with TestClient(TestServer(app)) as client:
+        responses = await asyncio.gather(
+            *(client.post("/hook", json=_update(i), headers=headers) for i in range(1, 7))
+        )
+        assert all(r.status == 200 for r in responses)
+
+        for _ in range(100):
+            if len(handled) == 6:
+                break
+            await asyncio.sleep(0.01)
+
+    assert sorted(handled) == [1, 2, 3, 4, 5, 6]
+    assert active[1] == 2
+    await bot.session.close()
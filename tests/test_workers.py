@@ -0,0 +1,134 @@
+"""Tests for multi-process update partitioning."""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.bot.config import settings
+from src.bot.workers import ChatSerialExecutor, WorkerPool, partition_key
+from src.services.status_monitor import ServerStatusMonitor
+
+
+def test_partition_key_uses_chat_or_sender() -> None:
+    """Messages and callbacks are keyed by chat, other updates by sender."""
+    message = {"update_id": 1, "message": {"chat": {"id": 10}, "from": {"id": 99}}}
+    callback = {
+        "update_id": 2,
+        "callback_query": {"from": {"id": 99}, "message": {"chat": {"id": 10}}},
+    }
+    inline = {"update_id": 3, "inline_query": {"from": {"id": 99}}}
+
+    assert partition_key(message) == 10
+    assert partition_key(callback) == 10
+    assert partition_key(inline) == 99
+    assert partition_key({"update_id": 4}) == 0
+
+
+@pytest.mark.asyncio
+async def test_executor_keeps_per_chat_order() -> None:
+    """Jobs of one chat run in order; other chats are not blocked by them."""
+    executor = ChatSerialExecutor(max_concurrency=10)
+    log: list[str] = []
+
+    def job(name: str, delay: float):
+        async def run() -> None:
+            await asyncio.sleep(delay)
+            log.append(name)
+
+        return run
+
+    executor.submit(1, job("a1", 0.03))
+    executor.submit(1, job("a2", 0.0))
+    executor.submit(2, job("b1", 0.01))
+    await executor.drain()
+
+    assert log.index("a1") < log.index("a2")
+    assert log[0] == "b1"
+    assert executor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_executor_continues_after_failed_job() -> None:
+    """A failing job must not block later jobs of the same chat."""
+    executor = ChatSerialExecutor(max_concurrency=1)
+    done: list[int] = []
+
+    async def fail() -> None:
+        raise RuntimeError("boom")
+
+    async def ok() -> None:
+        done.append(1)
+
+    executor.submit(1, fail)
+    executor.submit(1, ok)
+    await executor.drain()
+
+    assert done == [1]
+
+
+def test_pool_routes_same_chat_to_same_worker() -> None:
+    """Updates are forwarded to the queue of worker chat_id % N."""
+    pool = WorkerPool(workers=3)
+    for update_id, chat_id in enumerate([4, 7, 5, 4], start=1):
+        pool.dispatch({"update_id": update_id, "message": {"chat": {"id": chat_id}}})
+
+    worker1 = [json.loads(pool._queues[1].get(timeout=1))["update_id"] for _ in range(3)]
+    worker2 = json.loads(pool._queues[2].get(timeout=1))["update_id"]
+
+    assert worker1 == [1, 2, 4]
+    assert worker2 == 3
+
+
+@pytest.mark.asyncio
+async def test_status_snapshot_refreshed_on_read_without_loop() -> None:
+    """Workers don't poll the panels; they refresh a stale snapshot when it is read."""
+    monitor = ServerStatusMonitor(interval=60)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        monitor._refreshed_at = time.monotonic()
+        monitor._snapshot = object()
+        return monitor._snapshot
+
+    with patch.object(monitor, "_fetch", fetch):
+        first = await monitor.get()
+        assert await monitor.get() is first
+        assert calls == 1
+
+        monitor._refreshed_at -= 61
+        await monitor.get()
+        assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_process_runs_background_jobs(monkeypatch) -> None:
+    """With workers, the ingest process polls the panels and rebalances; workers don't."""
+    # Imported here: importing the app module sets up its logging
+    from src.bot import app
+
+    monkeypatch.setattr(settings, "bot_mode", "polling")
+    shutdown = asyncio.Event()
+    shutdown.set()
+    bot = MagicMock(delete_webhook=AsyncMock(), session=MagicMock(close=AsyncMock()))
+    dp = MagicMock(storage=MagicMock(close=AsyncMock()))
+
+    with (
+        patch.object(app, "WorkerPool") as pool_class,
+        patch.object(app, "poll_into_pool", AsyncMock()),
+        patch.object(app, "notify_admins_shutdown", AsyncMock()),
+        patch.object(app.status_monitor, "start") as monitor_start,
+        patch.object(app.status_monitor, "stop", AsyncMock()) as monitor_stop,
+        patch.object(app.rebalancer, "start") as rebalancer_start,
+        patch.object(app.rebalancer, "stop", AsyncMock()),
+    ):
+        pool_class.return_value.stop = AsyncMock()
+        await app.run_with_workers(bot, dp, shutdown)
+
+    monitor_start.assert_called_once_with()
+    monitor_stop.assert_awaited_once()
+    rebalancer_start.assert_called_once()